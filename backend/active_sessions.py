@@ -0,0 +1,93 @@
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlmodel import Session, select
+
+from .facilities import FacilityLocal
+from .models import BillingType, ParkingSession, SessionStatus
+
+
+class ActiveSession(NamedTuple):
+    """Lightweight copy of an active session's columns."""
+    id: int
+    vehicle_number_plate: str
+    slot_id: int
+    entry_time: datetime
+    billing_type: BillingType
+    billing_amount: Optional[float]
+
+
+class ActiveSessionMap:
+    """
+    Per-facility map from number plate to its active session.
+
+    Loaded at startup and updated after each committed entry and exit, so the duplicate-entry
+    check and exit by plate are dictionary lookups. Like the free-slot index it mirrors the
+    database and is only updated after a successful commit (in write-behind mode, after the
+    event has been logged). Sessions are also kept by id for exits.
+    """
+
+    def __init__(self):
+        self._by_plate: Dict[str, ActiveSession] = {}
+        self._by_id: Dict[int, ActiveSession] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._by_plate)
+
+    def load(self, db: Session):
+        """Rebuilds the map from every ACTIVE session in the database."""
+        rows = db.exec(
+            select(
+                ParkingSession.id, ParkingSession.vehicle_number_plate, ParkingSession.slot_id,
+                ParkingSession.entry_time, ParkingSession.billing_type, ParkingSession.billing_amount
+            ).where(ParkingSession.status == SessionStatus.ACTIVE)
+        ).all()
+        self.restore(ActiveSession(*row) for row in rows)
+
+    def restore(self, sessions: Iterable[ActiveSession]):
+        """Replaces the map with the given active sessions, e.g. from a state snapshot."""
+        by_plate = {active.vehicle_number_plate: active for active in sessions}
+        with self._lock:
+            self._by_plate = by_plate
+            self._by_id = {active.id: active for active in by_plate.values()}
+
+    def get(self, number_plate: str) -> Optional[ActiveSession]:
+        return self._by_plate.get(number_plate)
+
+    def get_by_id(self, session_id: int) -> Optional[ActiveSession]:
+        return self._by_id.get(session_id)
+
+    def sessions(self) -> List[ActiveSession]:
+        """A copy of every active session, for scans that must not hold the lock."""
+        with self._lock:
+            return list(self._by_id.values())
+
+    def pop(self, session_id: int) -> Optional[ActiveSession]:
+        """Atomically removes and returns an active session, so only one exit can complete it."""
+        with self._lock:
+            active = self._by_id.pop(session_id, None)
+            if active is not None and self._by_plate.get(active.vehicle_number_plate) == active:
+                del self._by_plate[active.vehicle_number_plate]
+            return active
+
+    def sync(self, parking_session: ParkingSession):
+        """Adds or removes a session depending on its current status."""
+        with self._lock:
+            if parking_session.status == SessionStatus.ACTIVE:
+                active = ActiveSession(
+                    parking_session.id, parking_session.vehicle_number_plate, parking_session.slot_id,
+                    parking_session.entry_time, parking_session.billing_type, parking_session.billing_amount
+                )
+                self._by_plate[active.vehicle_number_plate] = active
+                self._by_id[active.id] = active
+            else:
+                self._by_id.pop(parking_session.id, None)
+                current = self._by_plate.get(parking_session.vehicle_number_plate)
+                if current and current.id == parking_session.id:
+                    del self._by_plate[parking_session.vehicle_number_plate]
+
+
+# One instance per facility, loaded during application startup
+active_sessions = FacilityLocal(ActiveSessionMap)
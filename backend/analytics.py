@@ -0,0 +1,216 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import false
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, func, select, update
+
+from .models import BillingType, HourlyRollup, ParkingSession, ParkingSlot, RollupState, SessionStatus, SlotType
+
+# Sessions rolled up per backfill transaction, and the pause between chunks so live exits get the write lock
+ROLLUP_BACKFILL_CHUNK_SIZE = 5000
+ROLLUP_BACKFILL_PAUSE_SECONDS = 0.05
+
+ROLLUP_STATE_ID = 1
+
+RollupKey = Tuple[datetime, SlotType, BillingType]
+ONE_HOUR = timedelta(hours=1)
+
+
+def _hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _accumulate(
+    totals: Dict[RollupKey, List[float]],
+    slot_type: SlotType,
+    billing_type: BillingType,
+    entry_time: datetime,
+    exit_time: datetime,
+    amount: Optional[float]
+):
+    """Adds one completed session to totals: [occupancy_minutes, entries, exits, revenue] per hour."""
+    def bucket(hour: datetime) -> List[float]:
+        return totals.setdefault((hour, slot_type, billing_type), [0.0, 0, 0, 0.0])
+
+    bucket(_hour(entry_time))[1] += 1
+    exit_bucket = bucket(_hour(exit_time))
+    exit_bucket[2] += 1
+    exit_bucket[3] += amount or 0.0
+
+    # Split the stay across the hours it covers
+    hour = _hour(entry_time)
+    while hour < exit_time:
+        start = max(hour, entry_time)
+        end = min(hour + ONE_HOUR, exit_time)
+        bucket(hour)[0] += (end - start).total_seconds() / 60
+        hour += ONE_HOUR
+
+
+def _upsert(db: Session, totals: Dict[RollupKey, List[float]]):
+    """Adds totals onto the rollup rows, creating rows for hours seen for the first time."""
+    if not totals:
+        return
+    rows = [
+        {"hour": hour, "slot_type": slot_type, "billing_type": billing_type,
+         "occupancy_minutes": occupancy, "entries": entries, "exits": exits, "revenue": revenue}
+        for (hour, slot_type, billing_type), (occupancy, entries, exits, revenue) in totals.items()
+    ]
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        statement = insert(HourlyRollup)
+        counters = ("occupancy_minutes", "entries", "exits", "revenue")
+        statement = statement.on_conflict_do_update(
+            index_elements=["hour", "slot_type", "billing_type"],
+            set_={name: getattr(HourlyRollup, name) + statement.excluded[name] for name in counters}
+        )
+        db.connection().execute(statement, rows)
+        return
+
+    for row in rows:
+        rollup = db.get(HourlyRollup, (row["hour"], row["slot_type"], row["billing_type"]))
+        if rollup is None:
+            db.add(HourlyRollup(**row))
+            continue
+        rollup.occupancy_minutes += row["occupancy_minutes"]
+        rollup.entries += row["entries"]
+        rollup.exits += row["exits"]
+        rollup.revenue += row["revenue"]
+        db.add(rollup)
+
+
+def record_exits(db: Session, exits: Iterable[Tuple[ParkingSession, SlotType]]):
+    """
+    Rolls completed sessions into the hourly totals inside the caller's exit transaction.
+    Marks each session rolled_up so the backfill never counts it again.
+    """
+    totals: Dict[RollupKey, List[float]] = {}
+    for parking_session, slot_type in exits:
+        parking_session.rolled_up = True
+        _accumulate(totals, slot_type, parking_session.billing_type,
+                    parking_session.entry_time, parking_session.exit_time, parking_session.billing_amount)
+    _upsert(db, totals)
+
+
+# --- Backfill of sessions completed before the rollups existed ---
+
+def get_rollup_state(db: Session) -> RollupState:
+    """Returns the rollup progress row, creating it (and so starting live rollups) on first use."""
+    state = db.get(RollupState, ROLLUP_STATE_ID)
+    if state is None:
+        state = RollupState(id=ROLLUP_STATE_ID)
+        db.add(state)
+        db.commit()
+        db.refresh(state)
+    return state
+
+
+def backfill_chunk(db: Session, chunk_size: int = ROLLUP_BACKFILL_CHUNK_SIZE) -> int:
+    """
+    Rolls up the next chunk of completed sessions not yet counted, in one transaction that
+    also advances the cursor. Sessions are claimed with a conditional UPDATE on rolled_up, so
+    the backfill is idempotent and never double counts a session rolled up by a live exit.
+    Returns the number of sessions examined; 0 once the backfill is complete.
+    """
+    state = get_rollup_state(db)
+    rows = db.exec(
+        select(ParkingSession.id, ParkingSlot.slot_type, ParkingSession.billing_type,
+               ParkingSession.entry_time, ParkingSession.exit_time, ParkingSession.billing_amount)
+        .join(ParkingSlot, ParkingSlot.id == ParkingSession.slot_id)
+        .where(
+            ParkingSession.id > state.backfill_cursor,
+            ParkingSession.status == SessionStatus.COMPLETED,
+            ParkingSession.rolled_up == false()
+        )
+        .order_by(ParkingSession.id)
+        .limit(chunk_size)
+    ).all()
+    if not rows:
+        if state.backfill_completed_at is None:
+            state.backfill_completed_at = datetime.now()
+            db.add(state)
+            db.commit()
+        return 0
+
+    last_id = rows[-1][0]
+    claimed = set(db.exec(
+        update(ParkingSession)
+        .where(
+            ParkingSession.id > state.backfill_cursor,
+            ParkingSession.id <= last_id,
+            ParkingSession.status == SessionStatus.COMPLETED,
+            ParkingSession.rolled_up == false()
+        )
+        .values(rolled_up=True)
+        .returning(ParkingSession.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all())
+
+    totals: Dict[RollupKey, List[float]] = {}
+    for session_id, slot_type, billing_type, entry_time, exit_time, amount in rows:
+        if session_id in claimed and exit_time is not None:
+            _accumulate(totals, slot_type, billing_type, entry_time, exit_time, amount)
+    _upsert(db, totals)
+
+    state.backfill_cursor = last_id
+    state.backfilled_sessions += len(claimed)
+    db.add(state)
+    db.commit()
+    return len(rows)
+
+
+def _backfill_chunk(engine) -> int:
+    with Session(engine) as session:
+        return backfill_chunk(session)
+
+
+async def run_backfill(engine):
+    """Streams the backfill chunk by chunk, started from the application lifespan."""
+    while await asyncio.to_thread(_backfill_chunk, engine):
+        await asyncio.sleep(ROLLUP_BACKFILL_PAUSE_SECONDS)
+
+
+# --- Queries ---
+
+def hourly_rollups(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    slot_type: Optional[SlotType] = None,
+    billing_type: Optional[BillingType] = None
+) -> List[HourlyRollup]:
+    """Rollup rows for hours in [start, end), oldest first."""
+    query = select(HourlyRollup).where(HourlyRollup.hour >= start, HourlyRollup.hour < end)
+    if slot_type:
+        query = query.where(HourlyRollup.slot_type == slot_type)
+    if billing_type:
+        query = query.where(HourlyRollup.billing_type == billing_type)
+    return db.exec(query.order_by(HourlyRollup.hour, HourlyRollup.slot_type, HourlyRollup.billing_type)).all()
+
+
+def rollup_summary(db: Session, start: datetime, end: datetime) -> dict:
+    """Totals for hours in [start, end), overall, per slot type and per billing type."""
+    rows = db.exec(
+        select(
+            HourlyRollup.slot_type, HourlyRollup.billing_type,
+            func.sum(HourlyRollup.occupancy_minutes), func.sum(HourlyRollup.entries),
+            func.sum(HourlyRollup.exits), func.sum(HourlyRollup.revenue)
+        )
+        .where(HourlyRollup.hour >= start, HourlyRollup.hour < end)
+        .group_by(HourlyRollup.slot_type, HourlyRollup.billing_type)
+    ).all()
+
+    def empty() -> dict:
+        return {"occupancy_minutes": 0.0, "entries": 0, "exits": 0, "revenue": 0.0}
+
+    summary = {"start": start, "end": end, "totals": empty(), "by_slot_type": {}, "by_billing_type": {}}
+    for slot_type, billing_type, occupancy, entries, exits, revenue in rows:
+        for bucket in (summary["totals"], summary["by_slot_type"].setdefault(slot_type, empty()),
+                       summary["by_billing_type"].setdefault(billing_type, empty())):
+            bucket["occupancy_minutes"] += occupancy
+            bucket["entries"] += entries
+            bucket["exits"] += exits
+            bucket["revenue"] += revenue
+    return summary
@@ -0,0 +1,99 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple, Type, Union
+
+from sqlalchemy import Row, delete, insert, true
+from sqlmodel import Session, func, select
+
+from .models import ArchivedSession, ParkingSession, SessionStatus
+
+# Completed sessions move to the archive table once they exited this long ago
+SESSION_ARCHIVE_AFTER_HOURS = float(os.getenv("SESSION_ARCHIVE_AFTER_HOURS", "24"))
+
+# Sessions moved per transaction, the pause between chunks so live writes get the lock,
+# and how long the archiver sleeps once it has caught up
+ARCHIVE_CHUNK_SIZE = 5000
+ARCHIVE_PAUSE_SECONDS = 0.05
+ARCHIVE_INTERVAL_SECONDS = 300
+
+SessionModel = Union[Type[ParkingSession], Type[ArchivedSession]]
+# Whole sessions, or rows of selected columns that include the id
+SessionRow = Union[ParkingSession, ArchivedSession, Row]
+
+
+def session_tables(status: Optional[SessionStatus]) -> List[SessionModel]:
+    """The session tables that can hold sessions with the given status; the archive only has completed ones."""
+    if status == SessionStatus.ACTIVE:
+        return [ParkingSession]
+    return [ParkingSession, ArchivedSession]
+
+
+def newest_sessions(db: Session, queries: Sequence[Tuple[SessionModel, object]], cursor: Optional[int], limit: int) -> List[SessionRow]:
+    """
+    The newest `limit` rows below the cursor across per-table queries, merged by id.
+    Ids stay unique across the tables because archived sessions keep theirs and the newest
+    session is never archived (see archive_chunk).
+    """
+    rows: List[SessionRow] = []
+    for model, query in queries:
+        if cursor is not None:
+            query = query.where(model.id < cursor)
+        rows.extend(db.exec(query.order_by(model.id.desc()).limit(limit)).all())
+    rows.sort(key=lambda row: row.id, reverse=True)
+    return rows[:limit]
+
+
+def archive_chunk(db: Session, cutoff: datetime, chunk_size: int = ARCHIVE_CHUNK_SIZE) -> int:
+    """
+    Moves the oldest chunk of completed sessions that exited before cutoff into the archive
+    table, copying and deleting them in one transaction. Only sessions already counted in the
+    analytics rollups are moved, and never the newest session: SQLite hands out max(id) + 1
+    for new rows, so removing the newest one would let an archived id be reused.
+    Returns the number of sessions moved; 0 once nothing is left to archive.
+    """
+    hot = ParkingSession.__table__
+    archived = ArchivedSession.__table__
+    newest_id = db.exec(select(func.max(ParkingSession.id))).one()
+    if newest_id is None:
+        return 0
+    movable = (
+        hot.c.status == SessionStatus.COMPLETED,
+        hot.c.rolled_up == true(),
+        hot.c.exit_time < cutoff,
+        hot.c.id < newest_id,
+    )
+    ids = db.exec(select(hot.c.id).where(*movable).order_by(hot.c.id).limit(chunk_size)).all()
+    if not ids:
+        return 0
+
+    # Same conditions over the id range, so no id list is bound into the statements
+    in_chunk = (*movable, hot.c.id >= ids[0], hot.c.id <= ids[-1])
+    columns = [column.name for column in archived.columns]
+    connection = db.connection()
+    connection.execute(insert(archived).from_select(columns, select(*(hot.c[name] for name in columns)).where(*in_chunk)))
+    connection.execute(delete(hot).where(*in_chunk))
+    db.commit()
+    return len(ids)
+
+
+def _archive_chunk(engine, cutoff: datetime) -> int:
+    with Session(engine) as session:
+        return archive_chunk(session, cutoff)
+
+
+async def run_archiver(engine, archive_after_hours: float = SESSION_ARCHIVE_AFTER_HOURS):
+    """Moves old completed sessions to the archive chunk by chunk, forever. Started from the application lifespan."""
+    while True:
+        cutoff = datetime.now() - timedelta(hours=archive_after_hours)
+        moved = 0
+        try:
+            while chunk := await asyncio.to_thread(_archive_chunk, engine, cutoff):
+                moved += chunk
+                await asyncio.sleep(ARCHIVE_PAUSE_SECONDS)
+        except Exception as exc:
+            # Typically a busy database; the next round picks up where this one stopped
+            print(f"Session archiver stopped after {moved} sessions: {exc}")
+        if moved:
+            print(f"Archived {moved} completed sessions.")
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
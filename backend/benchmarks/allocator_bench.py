@@ -0,0 +1,115 @@
+"""
+Nearest-slot allocation from an entrance: FreeSlotIndex heaps versus a linear scan.
+
+Provisions a multi-level synthetic lot with several entrances in a temporary database,
+loads the index, then repeatedly claims the nearest slot for a random entrance and
+vehicle type and frees a random occupied slot, so the lot stays partly full. Every claim
+is checked against a brute-force scan over all free slots to confirm it is truly the nearest.
+
+Run from the repository root:
+    python -m backend.benchmarks.allocator_bench --levels 4 --rows 25 --slots-per-row 100
+"""
+import argparse
+import random
+import tempfile
+import time
+
+from sqlmodel import Session
+
+from ..database import populate_default_slots
+from ..models import VehicleType
+from ..routers.vehicles import _get_compatible_slot_types
+from ..schemas import EntranceSpec
+from ..slot_index import slot_distance, slot_index, slot_proximity_key
+from .common import temp_engine
+from .layout_bench import build_layout
+
+
+def _scan_nearest(free_slots, entrance, slot_types, require_charger):
+    """Reference allocator: the same ordering as the index, by scanning every free slot."""
+    for slot_type in slot_types:
+        candidates = [
+            slot for slot in free_slots.values()
+            if slot.slot_type == slot_type and (slot.has_charger or not require_charger)
+        ]
+        if candidates:
+            return min(candidates, key=lambda slot: (slot_distance(entrance, slot), slot_proximity_key(slot.slot_number), slot.id))
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=25, help="Rows per level.")
+    parser.add_argument("--slots-per-row", type=int, default=100)
+    parser.add_argument("--entrances", type=int, default=4, help="Entrances, spread along the ground level.")
+    parser.add_argument("--operations", type=int, default=20000, help="Claim/free pairs to time.")
+    parser.add_argument("--fill", type=float, default=0.7, help="Fraction of slots occupied before timing.")
+    args = parser.parse_args()
+
+    layout = build_layout(args.levels, args.rows, args.slots_per_row)
+    layout.entrances = [
+        EntranceSpec(name=f"Gate {i}", x=i * args.slots_per_row / max(args.entrances - 1, 1), y=(i % 2) * args.rows)
+        for i in range(args.entrances)
+    ]
+    rng = random.Random(7)
+    vehicle_types = list(VehicleType)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = temp_engine(tmp)
+        populate_default_slots(layout, target=engine)
+        with Session(engine) as session:
+            start = time.perf_counter()
+            slot_index.load(session)
+            load_ms = (time.perf_counter() - start) * 1000
+        engine.dispose()
+
+    entrances = list(slot_index._entrances.values())
+    total = len(slot_index)
+    occupied = []
+
+    def claim_random(check: bool):
+        entrance = rng.choice(entrances)
+        vehicle_type = rng.choice(vehicle_types)
+        types = _get_compatible_slot_types(vehicle_type)
+        charger = vehicle_type == VehicleType.EV
+        expected = _scan_nearest(slot_index._slots, entrance, types, charger) if check else None
+        slot = slot_index.claim(types, require_charger=charger, entrance_id=entrance.id)
+        if check and slot != expected:
+            raise AssertionError(f"index returned {slot}, scan found {expected}")
+        if slot:
+            occupied.append(slot)
+
+    def free_random():
+        if occupied:
+            slot_index.add(occupied.pop(rng.randrange(len(occupied))))
+
+    while len(occupied) < total * args.fill:
+        claim_random(check=False)
+
+    # Correctness against the brute-force scan
+    for _ in range(500):
+        claim_random(check=True)
+        free_random()
+
+    start = time.perf_counter()
+    for _ in range(args.operations):
+        claim_random(check=False)
+        free_random()
+    index_us = (time.perf_counter() - start) / args.operations * 1e6
+
+    scans = max(args.operations // 50, 1)
+    start = time.perf_counter()
+    for _ in range(scans):
+        entrance = rng.choice(entrances)
+        _scan_nearest(slot_index._slots, entrance, _get_compatible_slot_types(VehicleType.CAR), False)
+    scan_us = (time.perf_counter() - start) / scans * 1e6
+
+    print(f"{total} slots, {len(entrances)} entrances, index loaded in {load_ms:.1f} ms")
+    print(f"heap index   claim + free  {index_us:10.1f} us")
+    print(f"linear scan  find          {scan_us:10.1f} us")
+    print("500 claims matched the brute-force nearest slot")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Query latency with a large session history, kept in the live table versus archived.
+
+Builds two temporary databases holding the same history of completed sessions plus a few
+hundred active ones: in the first the history sits in ParkingSession (as before archival),
+in the second it has been moved to ArchivedSession. It then times, in each:
+
+  entry check    the active session of a plate (vehicle entry, exit by plate)
+  slot check     the active session of a slot (slot status update)
+  page           the newest page of /dashboard/sessions
+  plate search   /dashboard/sessions?number_plate=...
+  time range     /dashboard/sessions for one day of entries
+  deep page      /dashboard/sessions from a cursor in the middle of the history
+
+and finally how fast the archiver moves sessions out of the live table.
+
+Run from the repository root (10M sessions take a while to generate and several GB of disk):
+    python -m backend.benchmarks.archive_bench --archived 10000000
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Type, Union
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from ..archive import archive_chunk
+from ..models import ArchivedSession, BillingType, ParkingSession, SessionStatus, Vehicle, VehicleType
+from ..plate_search import backfill_plate_index
+from .common import serve_from, temp_engine
+from .concurrent_entry_bench import seed_slots
+
+INSERT_BATCH = 50_000
+HISTORY_DAYS = 365
+
+
+def seed_history(engine, model: Union[Type[ParkingSession], Type[ArchivedSession]], sessions: int, slots: int, plates: int, active: int):
+    """Inserts `sessions` completed sessions into model and `active` active ones into ParkingSession, ids in entry order."""
+    rng = random.Random(1)
+    start = datetime.now() - timedelta(days=HISTORY_DAYS + 2)
+    step = HISTORY_DAYS * 86400 / max(sessions, 1)
+    with Session(engine) as db:
+        connection = db.connection()
+        connection.execute(insert(Vehicle.__table__), [
+            {"number_plate": f"AR{i:06d}", "vehicle_type": VehicleType.CAR} for i in range(plates + active)
+        ])
+        for first in range(0, sessions, INSERT_BATCH):
+            rows = []
+            for i in range(first, min(first + INSERT_BATCH, sessions)):
+                entry_time = start + timedelta(seconds=i * step)
+                rows.append({
+                    "id": i + 1,
+                    "vehicle_number_plate": f"AR{rng.randrange(plates):06d}",
+                    "slot_id": rng.randrange(1, slots + 1),
+                    "entry_time": entry_time,
+                    "exit_time": entry_time + timedelta(minutes=rng.randrange(10, 600)),
+                    "status": SessionStatus.COMPLETED,
+                    "billing_type": BillingType.HOURLY,
+                    "billing_amount": 50.0,
+                    "rolled_up": True,
+                })
+            connection.execute(insert(model.__table__), rows)
+        connection.execute(insert(ParkingSession.__table__), [
+            {"id": sessions + i + 1, "vehicle_number_plate": f"AR{plates + i:06d}", "slot_id": i + 1,
+             "entry_time": datetime.now(), "status": SessionStatus.ACTIVE, "billing_type": BillingType.HOURLY}
+            for i in range(active)
+        ])
+        db.commit()
+        backfill_plate_index(db)
+
+
+def _median_ms(action: Callable[[], object], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        action()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def measure(engine, sessions: int, slots: int, plates: int, repeats: int) -> Dict[str, float]:
+    rng = random.Random(2)
+    day = (datetime.now() - timedelta(days=HISTORY_DAYS // 2)).replace(hour=0, minute=0, second=0, microsecond=0)
+    results = {}
+    with Session(engine) as db:
+        results["entry check"] = _median_ms(lambda: db.exec(select(ParkingSession).where(
+            ParkingSession.vehicle_number_plate == f"AR{rng.randrange(plates):06d}",
+            ParkingSession.status == SessionStatus.ACTIVE
+        )).first(), repeats)
+        results["slot check"] = _median_ms(lambda: db.exec(select(ParkingSession).where(
+            ParkingSession.slot_id == rng.randrange(1, slots + 1),
+            ParkingSession.status == SessionStatus.ACTIVE
+        )).first(), repeats)
+
+    with serve_from(engine) as app:
+        client = TestClient(app)
+        results["page"] = _median_ms(lambda: client.get("/dashboard/sessions"), repeats)
+        results["plate search"] = _median_ms(
+            lambda: client.get("/dashboard/sessions", params={"number_plate": f"AR{rng.randrange(plates):06d}"}), repeats
+        )
+        results["time range"] = _median_ms(lambda: client.get("/dashboard/sessions", params={
+            "entered_after": day.isoformat(), "entered_before": (day + timedelta(days=1)).isoformat()
+        }), repeats)
+        results["deep page"] = _median_ms(
+            lambda: client.get("/dashboard/sessions", params={"cursor": rng.randrange(sessions // 4, sessions // 2)}), repeats
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archived", type=int, default=10_000_000, help="Completed sessions in the history.")
+    parser.add_argument("--active", type=int, default=500, help="Active sessions in the live table.")
+    parser.add_argument("--slots", type=int, default=1000, help="Slots the sessions are spread over.")
+    parser.add_argument("--plates", type=int, default=50_000, help="Distinct number plates in the history.")
+    parser.add_argument("--repeats", type=int, default=50, help="Timed runs per query; the median is reported.")
+    parser.add_argument("--move", type=int, default=200_000, help="Sessions moved when timing the archiver.")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, model in (("live table", ParkingSession), ("archived", ArchivedSession)):
+            directory = tempfile.mkdtemp(dir=tmp)
+            engine = temp_engine(directory, synchronous="OFF")
+            seed_slots(engine, max(args.slots, args.active))
+            start = time.perf_counter()
+            seed_history(engine, model, args.archived, args.slots, args.plates, args.active)
+            print(f"{label}: seeded {args.archived} sessions in {time.perf_counter() - start:.1f} s")
+            results[label] = measure(engine, args.archived, args.slots, args.plates, args.repeats)
+
+            if model is ParkingSession:
+                moved = 0
+                cutoff = datetime.now()
+                start = time.perf_counter()
+                with Session(engine) as db:
+                    while moved < args.move and (chunk := archive_chunk(db, cutoff)):
+                        moved += chunk
+                elapsed = time.perf_counter() - start
+                print(f"archiver: moved {moved} sessions in {elapsed:.2f} s ({moved / elapsed:,.0f} sessions/s)")
+            engine.dispose()
+
+    print(f"\n{args.archived} completed sessions, {args.active} active; median of {args.repeats} runs")
+    print(f"{'query':<14} {'live table':>12} {'archived':>12}")
+    for query in results["live table"]:
+        print(f"{query:<14} {results['live table'][query]:>9.2f} ms {results['archived'][query]:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Events per second for replaying buffered gate events: one request per event through
+/vehicles/entry and /vehicles/exit/{id} versus /vehicles/entry/batch and /vehicles/exit/batch.
+
+Run from the repository root:
+    python -m backend.benchmarks.batch_bench --events 2000 --batch-size 500
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+import httpx
+
+from .common import serve_from, temp_engine
+from .concurrent_entry_bench import seed_slots
+
+
+def _entry_events(prefix: str, count: int):
+    return [{"number_plate": f"{prefix}{i}", "vehicle_type": "Car", "billing_type": "Hourly"} for i in range(count)]
+
+
+async def _single(client: httpx.AsyncClient, events):
+    start = time.perf_counter()
+    session_ids = []
+    for event in events:
+        response = await client.post("/vehicles/entry", json=event)
+        session_ids.append(response.json()["session"]["id"])
+    entry_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for session_id in session_ids:
+        (await client.put(f"/vehicles/exit/{session_id}")).raise_for_status()
+    return entry_seconds, time.perf_counter() - start
+
+
+async def _batched(client: httpx.AsyncClient, events, batch_size: int):
+    start = time.perf_counter()
+    session_ids = []
+    for offset in range(0, len(events), batch_size):
+        response = await client.post("/vehicles/entry/batch", json={"events": events[offset:offset + batch_size]})
+        session_ids += [result["session"]["id"] for result in response.json()["results"] if result["session"]]
+    entry_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for offset in range(0, len(session_ids), batch_size):
+        chunk = [{"session_id": session_id} for session_id in session_ids[offset:offset + batch_size]]
+        (await client.post("/vehicles/exit/batch", json={"events": chunk})).raise_for_status()
+    return entry_seconds, time.perf_counter() - start
+
+
+async def _run(app, events: int, batch_size: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        single = await _single(client, _entry_events("SINGLE", events))
+        batched = await _batched(client, _entry_events("BATCH", events), batch_size)
+    return single, batched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=5000, help="Number of slots in the synthetic lot.")
+    parser.add_argument("--events", type=int, default=2000, help="Entry events (and as many exits) per mode.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Events per batch request.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = temp_engine(tmp)
+        seed_slots(engine, args.slots)
+        with serve_from(engine) as app:
+            single, batched = asyncio.run(_run(app, args.events, args.batch_size))
+        engine.dispose()
+
+    for label, (entry_seconds, exit_seconds) in (("single-item", single), (f"batch of {args.batch_size}", batched)):
+        print(f"{label:<14} entries {args.events / entry_seconds:8.0f} events/s   exits {args.events / exit_seconds:8.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Sessions priced per second by the scalar price_session loop versus the vectorized price_batch.
+
+Generates random sessions (mixed slot types, hourly and day pass, stays up to --max-hours)
+under a tariff with time-of-day bands and a daily cap, checks that both paths agree on a
+sample, then times each.
+
+Run from the repository root:
+    python -m backend.benchmarks.billing_bench --sessions 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from .. import billing
+from ..billing import TariffPlan, TimeBand, price_batch, price_session
+from ..models import BillingType, SlotType
+
+BENCH_TARIFF = TariffPlan(
+    daily_cap=400.0,
+    bands=(TimeBand(start_hour=0, end_hour=7, multiplier=0.5), TimeBand(start_hour=17, end_hour=21, multiplier=1.5)),
+)
+
+
+def _random_sessions(count: int, max_hours: float, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    slot_types = np.array([slot_type.value for slot_type in SlotType])[rng.integers(0, len(SlotType), count)]
+    is_day_pass = rng.random(count) < 0.2
+    entry_times = np.datetime64("2025-01-01T00:00:00", "us") + rng.integers(0, 30 * 86400, count).astype("timedelta64[s]")
+    exit_times = entry_times + (rng.random(count) * max_hours * 3600).astype("timedelta64[s]")
+    return slot_types, is_day_pass, entry_times, exit_times
+
+
+def _price_scalar(slot_types, is_day_pass, entry_times, exit_times):
+    entries = entry_times.astype(object)
+    exits = exit_times.astype(object)
+    return [
+        price_session(
+            billing.tariff_for(SlotType(slot_types[i])),
+            BillingType.DAY_PASS if is_day_pass[i] else BillingType.HOURLY,
+            entries[i], exits[i]
+        )
+        for i in range(len(slot_types))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1_000_000, help="Sessions priced by the vectorized path.")
+    parser.add_argument("--scalar-sessions", type=int, default=50_000, help="Sessions priced by the scalar loop.")
+    parser.add_argument("--max-hours", type=float, default=72.0, help="Longest generated stay.")
+    args = parser.parse_args()
+
+    billing.tariff_plans = {slot_type: BENCH_TARIFF for slot_type in SlotType}
+    sessions = _random_sessions(args.sessions, args.max_hours)
+
+    sample = tuple(column[:args.scalar_sessions] for column in sessions)
+    start = time.perf_counter()
+    scalar_amounts = _price_scalar(*sample)
+    scalar_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_amounts = price_batch(*sessions)
+    batch_seconds = time.perf_counter() - start
+
+    mismatches = int(np.count_nonzero(~np.isclose(batch_amounts[:args.scalar_sessions], scalar_amounts)))
+    print(f"scalar  {args.scalar_sessions:>10} sessions  {args.scalar_sessions / scalar_seconds:12.0f} sessions/s")
+    print(f"batch   {args.sessions:>10} sessions  {args.sessions / batch_seconds:12.0f} sessions/s")
+    print(f"mismatches between scalar and batch on the sample: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
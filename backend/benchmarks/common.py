@@ -0,0 +1,34 @@
+"""Shared helpers for running the app against a throwaway database in benchmarks."""
+import os
+from contextlib import contextmanager
+
+from sqlmodel import Session, SQLModel
+
+from ..active_sessions import active_sessions
+from ..database import create_db_engine, get_session
+from ..main import app
+from ..slot_index import slot_index
+
+
+def temp_engine(directory: str, **engine_settings):
+    """Creates the schema in a new SQLite file under directory, using the app's engine settings."""
+    engine = create_db_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", **engine_settings)
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+@contextmanager
+def serve_from(engine):
+    """Points the app's session dependency and in-memory state at engine for the duration."""
+    async def _bench_session():
+        with Session(engine) as session:
+            yield session
+
+    with Session(engine) as session:
+        slot_index.load(session)
+        active_sessions.load(session)
+    app.dependency_overrides[get_session] = _bench_session
+    try:
+        yield app
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,108 @@
+"""
+Load test for parallel vehicle entry.
+
+Fires hundreds of concurrent POST /vehicles/entry requests at the app through an
+in-process ASGI transport, so the sync handlers run in parallel on FastAPI's threadpool
+against a temporary SQLite database. Afterwards it checks that no slot was handed to two
+active sessions and that slot statuses match the active sessions, then repeats the check
+with every request racing for the same manually chosen slot.
+
+Run from the repository root:
+    python -m backend.benchmarks.concurrent_entry_bench --entries 500 --concurrency 100
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+from sqlmodel import Session, select
+
+from ..main import app
+from ..models import ParkingSession, ParkingSlot, SessionStatus, SlotStatus, SlotType
+from ..slot_index import slot_index
+from .common import serve_from, temp_engine
+
+
+def seed_slots(engine, total_slots: int):
+    with Session(engine) as session:
+        for i in range(total_slots):
+            session.add(ParkingSlot(slot_number=f"A{i + 1}", slot_type=SlotType.REGULAR))
+        session.commit()
+
+
+async def fire_entries(client: httpx.AsyncClient, payloads, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = Counter()
+
+    async def _one(payload):
+        async with semaphore:
+            response = await client.post("/vehicles/entry", json=payload)
+            statuses[response.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_one(payload) for payload in payloads))
+    return time.perf_counter() - start, statuses
+
+
+def verify_occupancy(engine) -> bool:
+    with Session(engine) as session:
+        active_slot_ids = session.exec(
+            select(ParkingSession.slot_id).where(ParkingSession.status == SessionStatus.ACTIVE)
+        ).all()
+        occupied_ids = set(session.exec(
+            select(ParkingSlot.id).where(ParkingSlot.status == SlotStatus.OCCUPIED)
+        ).all())
+        duplicates = [slot_id for slot_id, count in Counter(active_slot_ids).items() if count > 1]
+        index_ok = slot_index.check_consistency(session)["consistent"]
+    print(f"  active sessions: {len(active_slot_ids)}, occupied slots: {len(occupied_ids)}, "
+          f"slots with more than one active session: {len(duplicates)}, index consistent: {index_ok}")
+    return not duplicates and set(active_slot_ids) == occupied_ids and index_ok
+
+
+async def _run(args, engine):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        payloads = [
+            {"number_plate": f"AUTO{i}", "vehicle_type": "Car", "billing_type": "Hourly"}
+            for i in range(args.entries)
+        ]
+        elapsed, statuses = await fire_entries(client, payloads, args.concurrency)
+        print(f"Auto-assigned entries: {args.entries} requests, concurrency {args.concurrency}, "
+              f"{elapsed:.2f} s, {args.entries / elapsed:.0f} entries/s, status codes {dict(statuses)}")
+        ok = verify_occupancy(engine)
+
+        with Session(engine) as session:
+            free_slot = session.exec(select(ParkingSlot).where(ParkingSlot.status == SlotStatus.AVAILABLE)).first()
+        if free_slot:
+            payloads = [
+                {"number_plate": f"MANUAL{i}", "vehicle_type": "Car", "billing_type": "Hourly", "slot_id": free_slot.id}
+                for i in range(args.concurrency)
+            ]
+            elapsed, statuses = await fire_entries(client, payloads, args.concurrency)
+            print(f"Manual entries racing for slot {free_slot.slot_number}: status codes {dict(statuses)}")
+            ok = verify_occupancy(engine) and statuses[201] == 1 and ok
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=1000, help="Number of slots in the synthetic lot.")
+    parser.add_argument("--entries", type=int, default=500, help="Number of concurrent entry requests.")
+    parser.add_argument("--concurrency", type=int, default=100, help="Requests in flight at once.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = temp_engine(tmp)
+        seed_slots(engine, args.slots)
+        with serve_from(engine):
+            ok = asyncio.run(_run(args, engine))
+        engine.dispose()
+
+    print("PASS: no slot was assigned twice" if ok else "FAIL: duplicate or inconsistent slot occupancy")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Throughput comparison of the database engine settings.
+
+Runs the concurrent entry load from concurrent_entry_bench, followed by a concurrent
+dashboard read load, once with the original engine configuration (rollback journal,
+synchronous=FULL, SQL echo on) and once with the current defaults (WAL,
+synchronous=NORMAL, echo off). Echo output is discarded so the comparison measures the
+logging overhead rather than the terminal.
+
+Run from the repository root:
+    python -m backend.benchmarks.engine_bench --entries 500 --concurrency 100
+"""
+import argparse
+import asyncio
+import io
+import logging
+import tempfile
+import time
+
+import httpx
+
+from ..database import DB_ECHO, SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS
+from .common import serve_from, temp_engine
+from .concurrent_entry_bench import fire_entries, seed_slots
+
+CONFIGURATIONS = {
+    "before (DELETE journal, synchronous=FULL, echo on)": {"journal_mode": "DELETE", "synchronous": "FULL", "echo": True},
+    f"after ({SQLITE_JOURNAL_MODE} journal, synchronous={SQLITE_SYNCHRONOUS}, echo {'on' if DB_ECHO else 'off'})": {},
+}
+
+
+async def _drive(app, entries: int, concurrency: int, reads: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        payloads = [{"number_plate": f"ENG{i}", "vehicle_type": "Car", "billing_type": "Hourly"} for i in range(entries)]
+        entry_seconds, statuses = await fire_entries(client, payloads, concurrency)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _read(i):
+            async with semaphore:
+                path = "/dashboard/slots" if i % 2 else "/dashboard/sessions"
+                (await client.get(path)).raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(_read(i) for i in range(reads)))
+        read_seconds = time.perf_counter() - start
+    return entry_seconds, read_seconds, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=1000, help="Number of slots in the synthetic lot.")
+    parser.add_argument("--entries", type=int, default=500, help="Concurrent entry requests per configuration.")
+    parser.add_argument("--reads", type=int, default=200, help="Concurrent dashboard reads per configuration.")
+    parser.add_argument("--concurrency", type=int, default=100, help="Requests in flight at once.")
+    args = parser.parse_args()
+
+    # Keep echoed SQL off the terminal while still paying for formatting it
+    sql_log = logging.getLogger("sqlalchemy.engine.Engine")
+    sql_log.addHandler(logging.StreamHandler(io.StringIO()))
+    sql_log.propagate = False
+
+    for name, settings in CONFIGURATIONS.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = temp_engine(tmp, **settings)
+            seed_slots(engine, args.slots)
+            with serve_from(engine) as app:
+                entry_seconds, read_seconds, statuses = asyncio.run(
+                    _drive(app, args.entries, args.concurrency, args.reads)
+                )
+            engine.dispose()
+        print(f"{name}\n  entries: {args.entries / entry_seconds:7.0f}/s  status codes {dict(statuses)}\n"
+              f"  dashboard reads: {args.reads / read_seconds:7.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
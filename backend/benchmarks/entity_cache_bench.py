@@ -0,0 +1,91 @@
+"""
+Vehicle and slot reads on the entry/exit path, with and without the entity caches.
+
+A pool of regulars enters and exits day after day, so after the first day every plate is
+known. Runs once with the caches disabled (capacity 0) and once enabled, counting the SQL
+statements that read the vehicle or parkingslot tables per entry and exit.
+
+Run from the repository root:
+    python -m backend.benchmarks.entity_cache_bench --vehicles 500 --days 5
+"""
+import argparse
+import re
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from ..entity_cache import ENTITY_CACHE_SIZE, slot_detail_cache, vehicle_cache
+from .common import serve_from, temp_engine
+from .concurrent_entry_bench import seed_slots
+
+ENTITY_READ = re.compile(r"^\s*SELECT\b.*\bFROM (vehicle|parkingslot)\b", re.IGNORECASE | re.DOTALL)
+
+
+def _caches():
+    return vehicle_cache.by_plate, slot_detail_cache.by_id, slot_detail_cache.by_number
+
+
+def _set_capacity(capacity: int):
+    for cache in _caches():
+        cache.capacity = capacity
+        cache.clear()
+
+
+def _run(vehicles: int, days: int, capacity: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = temp_engine(tmp)
+        seed_slots(engine, vehicles)
+        reads = 0
+
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            nonlocal reads
+            if ENTITY_READ.match(statement):
+                reads += 1
+
+        event.listen(engine, "before_cursor_execute", _count)
+        _set_capacity(capacity)
+        with serve_from(engine) as app:
+            client = TestClient(app)
+            plates = [f"REG{i}" for i in range(vehicles)]
+            # The first day creates the vehicles; only the returning days are measured
+            for plate in plates:
+                session_id = client.post("/vehicles/entry", json={"number_plate": plate, "vehicle_type": "Car", "billing_type": "Hourly"}).json()["session"]["id"]
+                client.put(f"/vehicles/exit/{session_id}")
+            reads = 0
+            for cache in _caches():
+                cache.hits = cache.misses = cache.evictions = 0
+            start = time.perf_counter()
+            for _ in range(days - 1):
+                for plate in plates:
+                    response = client.post("/vehicles/entry", json={"number_plate": plate, "vehicle_type": "Car", "billing_type": "Hourly"})
+                    client.put(f"/vehicles/exit/{response.json()['session']['id']}")
+            elapsed = time.perf_counter() - start
+        engine.dispose()
+
+    visits = vehicles * (days - 1)
+    return {
+        "reads_per_visit": reads / visits,
+        "ms_per_visit": elapsed / visits * 1000,
+        "vehicle_hit_rate": vehicle_cache.by_plate.hit_rate,
+        "slot_hit_rate": slot_detail_cache.by_id.hit_rate,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vehicles", type=int, default=500, help="Regulars, and slots in the lot.")
+    parser.add_argument("--days", type=int, default=5, help="Days each regular visits; the first one is not measured.")
+    args = parser.parse_args()
+
+    print(f"{args.vehicles} regulars x {args.days - 1} returning visits (entry + exit)")
+    print(f"{'caches':<10} {'entity reads/visit':>19} {'ms/visit':>9} {'vehicle hits':>13} {'slot hits':>10}")
+    for label, capacity in (("disabled", 0), ("enabled", ENTITY_CACHE_SIZE)):
+        result = _run(args.vehicles, args.days, capacity)
+        print(f"{label:<10} {result['reads_per_visit']:>19.2f} {result['ms_per_visit']:>9.2f} "
+              f"{result['vehicle_hit_rate']:>12.0%} {result['slot_hit_rate']:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
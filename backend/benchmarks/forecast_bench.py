@@ -0,0 +1,92 @@
+"""
+Cost of keeping the demand forecast up to date as the session history grows.
+
+For each history length, seeds that many weeks of completed sessions and times:
+- an hourly update: folding in the hour that just closed, what the background task does;
+- the initial training on FORECAST_HISTORY_WEEKS, run once per process in daily chunks;
+- recounting the whole history per hour and vehicle type, what a model retrained from
+  scratch would need.
+
+Run from the repository root:
+    python -m backend.benchmarks.forecast_bench --weeks 4 16 52 --per-hour 40
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from ..forecast import FORECAST_HISTORY_WEEKS, VEHICLE_TYPES, DemandForecast, _hour, _hourly_counts
+from ..models import BillingType, ParkingSession, SessionStatus, Vehicle
+from .common import temp_engine
+
+PLATES = 5000
+
+
+def _seed(engine, weeks: int, per_hour: int, now: datetime) -> int:
+    rng = np.random.default_rng(3)
+    with Session(engine) as session:
+        session.connection().execute(insert(Vehicle.__table__), [
+            {"number_plate": f"F{i}", "vehicle_type": VEHICLE_TYPES[i % len(VEHICLE_TYPES)].name, "facility_id": "default"}
+            for i in range(PLATES)
+        ])
+        start = _hour(now) - timedelta(weeks=weeks)
+        hours = weeks * 7 * 24
+        total = 0
+        for day in range(0, hours, 24):
+            rows = []
+            for hour in range(day, min(day + 24, hours)):
+                for minute in rng.integers(0, 60, per_hour):
+                    entry = start + timedelta(hours=hour, minutes=int(minute))
+                    rows.append({
+                        "vehicle_number_plate": f"F{rng.integers(PLATES)}", "slot_id": 1, "entry_time": entry,
+                        "exit_time": entry + timedelta(minutes=int(rng.integers(20, 300))),
+                        "status": SessionStatus.COMPLETED.name, "billing_type": BillingType.HOURLY.name,
+                        "billing_amount": 50.0, "rolled_up": True, "facility_id": "default",
+                    })
+            session.connection().execute(insert(ParkingSession.__table__), rows)
+            total += len(rows)
+        session.commit()
+    return total
+
+
+def _time(work) -> float:
+    start = time.perf_counter()
+    work()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weeks", type=int, nargs="+", default=[4, 16, 52], help="History lengths to compare.")
+    parser.add_argument("--per-hour", type=int, default=40, help="Sessions entering per hour.")
+    args = parser.parse_args()
+
+    now = datetime.now()
+    print(f"{args.per_hour} sessions per hour; training window {FORECAST_HISTORY_WEEKS} weeks")
+    print(f"{'weeks':>6} {'sessions':>10} {'hourly update ms':>17} {'training ms':>12} {'full recount ms':>16}")
+    for weeks in args.weeks:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = temp_engine(tmp)
+            sessions = _seed(engine, weeks, args.per_hour, now)
+            with Session(engine) as db:
+                model = DemandForecast()
+
+                def train():
+                    while model.learned_until != _hour(now):
+                        model.learn(db, now)
+
+                training = _time(train)
+                # The next hour closes
+                model.learned_until -= timedelta(hours=1)
+                update = _time(lambda: model.learn(db, now))
+                full = _time(lambda: _hourly_counts(db, "entry_time", _hour(now) - timedelta(weeks=weeks), _hour(now)))
+            engine.dispose()
+        print(f"{weeks:>6} {sessions:>10} {update:>17.2f} {training:>12.0f} {full:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Startup cost of provisioning a large layout.
+
+Times the startup steps that scale with the lot (create tables, populate the layout, load
+the free-slot index and active sessions) on a fresh database and again on the already
+populated one, for the bulk provisioning and for the per-slot SELECT loop it replaced.
+
+Run from the repository root:
+    python -m backend.benchmarks.layout_bench --levels 4 --rows 50 --slots-per-row 100
+"""
+import argparse
+import tempfile
+import time
+
+from sqlmodel import Session, select
+
+from ..active_sessions import active_sessions
+from ..database import populate_default_slots
+from ..layout import expand_layout
+from ..models import ParkingSlot, SlotStatus, SlotType
+from ..schemas import LayoutLevelSpec, LayoutRowSpec, LayoutSpec
+from ..slot_index import slot_index
+from .common import temp_engine
+
+ROW_TYPES = [SlotType.REGULAR, SlotType.REGULAR, SlotType.COMPACT, SlotType.EV, SlotType.HANDICAP, SlotType.BIKE]
+
+
+def build_layout(levels: int, rows: int, slots_per_row: int) -> LayoutSpec:
+    """A multi-level layout with rows R0-..Rn- on each level, cycling through slot types."""
+    return LayoutSpec(levels=[
+        LayoutLevelSpec(prefix=f"L{level}-", rows=[
+            LayoutRowSpec(
+                name=f"R{row}-",
+                slots=slots_per_row,
+                slot_type=ROW_TYPES[row % len(ROW_TYPES)],
+                has_charger=ROW_TYPES[row % len(ROW_TYPES)] == SlotType.EV
+            )
+            for row in range(rows)
+        ])
+        for level in range(levels)
+    ])
+
+
+def _populate_per_slot(engine, layout: LayoutSpec):
+    """The previous populate_default_slots: one SELECT per slot, then an ORM add."""
+    with Session(engine) as session:
+        for slot in expand_layout(layout):
+            existing_slot = session.exec(select(ParkingSlot).where(ParkingSlot.slot_number == slot.slot_number)).first()
+            if not existing_slot:
+                session.add(ParkingSlot(slot_number=slot.slot_number, slot_type=slot.slot_type,
+                                        has_charger=slot.has_charger, status=SlotStatus.AVAILABLE))
+        session.commit()
+
+
+def _boot(directory: str, layout: LayoutSpec, populate) -> float:
+    start = time.perf_counter()
+    engine = temp_engine(directory)
+    populate(engine, layout)
+    with Session(engine) as session:
+        slot_index.load(session)
+        active_sessions.load(session)
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=50, help="Rows per level.")
+    parser.add_argument("--slots-per-row", type=int, default=100)
+    args = parser.parse_args()
+
+    layout = build_layout(args.levels, args.rows, args.slots_per_row)
+    total = args.levels * args.rows * args.slots_per_row
+    variants = (
+        ("bulk", lambda engine, spec: populate_default_slots(spec, target=engine)),
+        ("per-slot", _populate_per_slot),
+    )
+    print(f"{total} slots")
+    for label, populate in variants:
+        with tempfile.TemporaryDirectory() as tmp:
+            first = _boot(tmp, layout, populate)
+            second = _boot(tmp, layout, populate)
+        print(f"{label:<9} first boot {first * 1000:8.1f} ms   later boots {second * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Mixed-workload load test for the parking API.
+
+Starts the app in-process against a temporary SQLite database seeded with a multi-level
+layout and a history of completed sessions, then drives three phases concurrently through
+an ASGI transport:
+
+  opening  a burst of entries as the mall opens
+  steady   entries, exits, dashboard polling (summary, slots with ETag revalidation,
+           session pages) and suggest-slot calls, mixed by weight, for a fixed duration
+  closing  an exit wave for every vehicle still parked
+
+Latency percentiles (p50/p95/p99) and throughput per route and phase are written to a
+JSON file. Pass --baseline with an earlier result to fail when a route's p95 latency or
+throughput regressed by more than --tolerance.
+
+Run from the repository root:
+    python -m backend.benchmarks.load_test --slots 2000 --history 50000 --duration 20 --output load-test.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from ..database import populate_default_slots
+from ..models import BillingType, ParkingSession, SessionStatus, Vehicle, VehicleType
+from ..plate_search import backfill_plate_index
+from ..schemas import EntranceSpec
+from .common import serve_from, temp_engine
+from .layout_bench import build_layout
+
+SLOTS_PER_ROW = 100
+
+# Share of arriving vehicles by type, and the weight of each action in the steady phase
+VEHICLE_MIX = {VehicleType.CAR: 70, VehicleType.BIKE: 15, VehicleType.EV: 10, VehicleType.HANDICAP: 5}
+STEADY_MIX = {"entry": 3, "exit": 3, "summary": 4, "slots": 2, "sessions": 1, "suggest": 2}
+
+
+class Recorder:
+    """Collects latencies and failures per route for one phase."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    async def call(self, route: str, request) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await request
+        except Exception:
+            self.errors[route] += 1
+            return None
+        self.latencies[route].append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 500:
+            self.errors[route] += 1
+        return response
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def report(self) -> dict:
+        routes = {}
+        for route in sorted(set(self.latencies) | set(self.errors)):
+            samples = np.array(self.latencies[route]) if self.latencies[route] else np.zeros(1)
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            routes[route] = {
+                "requests": len(self.latencies[route]),
+                "errors": self.errors[route],
+                "throughput_rps": round(len(self.latencies[route]) / self.elapsed, 1) if self.elapsed else 0.0,
+                "mean_ms": round(float(samples.mean()), 2),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "max_ms": round(float(samples.max()), 2),
+            }
+        return {"elapsed_s": round(self.elapsed, 3), "routes": routes}
+
+
+class Workload:
+    """State shared by the simulated gates and dashboards: parked sessions and known entrances."""
+
+    def __init__(self, client: httpx.AsyncClient, entrance_ids: List[int], seed: int):
+        self.client = client
+        self.entrance_ids = entrance_ids
+        self.active: List[int] = []
+        self.rng = random.Random(seed)
+        self.plates = 0
+        self.slots_etag: Optional[str] = None
+        self.session_cursor: Optional[str] = None
+
+    def _vehicle_type(self) -> VehicleType:
+        return self.rng.choices(list(VEHICLE_MIX), weights=list(VEHICLE_MIX.values()))[0]
+
+    async def entry(self, recorder: Recorder):
+        self.plates += 1
+        payload = {
+            "number_plate": f"LT{self.plates}",
+            "vehicle_type": self._vehicle_type().value,
+            "billing_type": self.rng.choice([BillingType.HOURLY, BillingType.HOURLY, BillingType.DAY_PASS]).value,
+            "entrance_id": self.rng.choice(self.entrance_ids) if self.entrance_ids else None,
+        }
+        response = await recorder.call("POST /vehicles/entry", self.client.post("/vehicles/entry", json=payload))
+        if response is not None and response.status_code == 201:
+            self.active.append(response.json()["session"]["id"])
+
+    async def exit(self, recorder: Recorder):
+        if not self.active:
+            return await self.entry(recorder)
+        session_id = self.active.pop(self.rng.randrange(len(self.active)))
+        await recorder.call("PUT /vehicles/exit/{session_id}", self.client.put(f"/vehicles/exit/{session_id}"))
+
+    async def summary(self, recorder: Recorder):
+        await recorder.call("GET /dashboard/summary", self.client.get("/dashboard/summary"))
+
+    async def slots(self, recorder: Recorder):
+        headers = {"If-None-Match": self.slots_etag} if self.slots_etag else {}
+        response = await recorder.call("GET /dashboard/slots", self.client.get("/dashboard/slots", headers=headers))
+        if response is not None and "etag" in response.headers:
+            self.slots_etag = response.headers["etag"]
+
+    async def sessions(self, recorder: Recorder):
+        # Page through history like an operator scrolling, starting over at the end
+        params = {"cursor": self.session_cursor} if self.session_cursor else {}
+        response = await recorder.call("GET /dashboard/sessions", self.client.get("/dashboard/sessions", params=params))
+        if response is not None:
+            self.session_cursor = response.headers.get("x-next-cursor")
+
+    async def suggest(self, recorder: Recorder):
+        params = {"vehicle_type": self._vehicle_type().value}
+        if self.entrance_ids:
+            params["entrance_id"] = self.rng.choice(self.entrance_ids)
+        await recorder.call("GET /vehicles/suggest-slot", self.client.get("/vehicles/suggest-slot", params=params))
+
+
+async def _run_phase(concurrency: int, worker) -> dict:
+    recorder = Recorder()
+    await asyncio.gather(*(worker(recorder) for _ in range(concurrency)))
+    recorder.finish()
+    return recorder.report()
+
+
+async def _drive(app, args) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=60) as client:
+        entrance_ids = [entrance["id"] for entrance in (await client.get("/slots/entrances")).json()]
+        workload = Workload(client, entrance_ids, args.seed)
+        phases = {}
+
+        remaining = [args.opening_entries]
+
+        async def opening(recorder):
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                await workload.entry(recorder)
+
+        phases["opening"] = await _run_phase(args.concurrency, opening)
+
+        deadline = time.perf_counter() + args.duration
+        actions = list(STEADY_MIX)
+        weights = list(STEADY_MIX.values())
+
+        async def steady(recorder):
+            while time.perf_counter() < deadline:
+                await getattr(workload, workload.rng.choices(actions, weights=weights)[0])(recorder)
+
+        phases["steady"] = await _run_phase(args.concurrency, steady)
+
+        async def closing(recorder):
+            while workload.active:
+                await workload.exit(recorder)
+
+        phases["closing"] = await _run_phase(args.concurrency, closing)
+        return phases
+
+
+def seed(engine, slots: int, history: int, days: int = 30):
+    """Provisions the layout with two entrances and inserts a history of completed sessions."""
+    layout = build_layout(1, math.ceil(slots / SLOTS_PER_ROW), SLOTS_PER_ROW)
+    layout.entrances = [EntranceSpec(name="North"), EntranceSpec(name="South", x=SLOTS_PER_ROW, y=len(layout.levels[0].rows))]
+    populate_default_slots(layout, target=engine)
+
+    rng = random.Random(1)
+    now = datetime.now()
+    vehicles = [{"number_plate": f"HIST{i}", "vehicle_type": VehicleType.CAR} for i in range(max(history // 5, 1))]
+    sessions = []
+    for _ in range(history):
+        entry_time = now - timedelta(days=days) + timedelta(seconds=rng.randrange(days * 86400))
+        sessions.append({
+            "vehicle_number_plate": rng.choice(vehicles)["number_plate"],
+            "slot_id": rng.randrange(1, slots + 1),
+            "entry_time": entry_time,
+            "exit_time": entry_time + timedelta(minutes=rng.randrange(10, 600)),
+            "status": SessionStatus.COMPLETED,
+            "billing_type": BillingType.HOURLY,
+            "billing_amount": 50.0,
+        })
+    with Session(engine) as session:
+        session.connection().execute(insert(Vehicle.__table__), vehicles)
+        if sessions:
+            session.connection().execute(insert(ParkingSession.__table__), sessions)
+        session.commit()
+        backfill_plate_index(session)
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Lists routes whose p95 latency rose, or throughput fell, by more than tolerance against the
+    baseline, and routes with more errors than in the baseline.
+    """
+    regressions = []
+    for phase, report in result["phases"].items():
+        for route, stats in report["routes"].items():
+            before = baseline.get("phases", {}).get(phase, {}).get("routes", {}).get(route)
+            if not before:
+                continue
+            if before["p95_ms"] and stats["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{phase} {route}: p95 {before['p95_ms']} ms -> {stats['p95_ms']} ms")
+            if before["throughput_rps"] and stats["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+                regressions.append(f"{phase} {route}: throughput {before['throughput_rps']} -> {stats['throughput_rps']} req/s")
+            if stats["errors"] > before["errors"]:
+                regressions.append(f"{phase} {route}: errors {before['errors']} -> {stats['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=2000, help="Slots in the synthetic lot.")
+    parser.add_argument("--history", type=int, default=50000, help="Completed sessions seeded as history.")
+    parser.add_argument("--opening-entries", type=int, default=1000, help="Entries in the opening burst.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of steady mixed traffic.")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent simulated clients.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="load-test.json", help="Where to write the JSON report.")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression against the baseline.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = temp_engine(tmp)
+        seed(engine, args.slots, args.history)
+        with serve_from(engine) as app:
+            phases = asyncio.run(_drive(app, args))
+        engine.dispose()
+
+    result = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "phases": phases,
+    }
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+
+    for phase, report in phases.items():
+        print(f"{phase} ({report['elapsed_s']} s)")
+        for route, stats in report["routes"].items():
+            print(f"  {route:<34} {stats['requests']:>6} req  {stats['throughput_rps']:>8} req/s  "
+                  f"p50 {stats['p50_ms']:>7} ms  p95 {stats['p95_ms']:>7} ms  p99 {stats['p99_ms']:>7} ms  errors {stats['errors']}")
+    print(f"Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Per-request cost of the metrics instrumentation: collection off, on, and on with every
+request profiled. Drives the cached summary and the entrance listing, cheap routes where a
+fixed per-request cost shows most.
+
+Run from the repository root:
+    python -m backend.benchmarks.metrics_bench --requests 2000
+"""
+import argparse
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+from ..metrics import metrics
+from .common import serve_from, temp_engine
+from .concurrent_entry_bench import seed_slots
+
+ROUTES = ("/dashboard/summary", "/slots/entrances")
+
+
+def _per_request_us(client: TestClient, route: str, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(route)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=1000, help="Number of slots in the synthetic lot.")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per route and mode.")
+    args = parser.parse_args()
+
+    modes = {
+        "off": (False, 0.0),
+        "on": (True, 0.0),
+        "on + profiler": (True, 1.0),
+    }
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = temp_engine(tmp)
+        seed_slots(engine, args.slots)
+        with serve_from(engine) as app:
+            client = TestClient(app)
+            for route in ROUTES:
+                client.get(route)
+            for mode, (enabled, sample_rate) in modes.items():
+                metrics.enabled, metrics.profile_sample_rate = enabled, sample_rate
+                results[mode] = {route: _per_request_us(client, route, args.requests) for route in ROUTES}
+            metrics.enabled, metrics.profile_sample_rate = False, 0.0
+        engine.dispose()
+
+    print(f"{args.requests} requests per route")
+    for mode, timings in results.items():
+        print(f"{mode:<14} " + "  ".join(f"{route} {us:8.1f} us" for route, us in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
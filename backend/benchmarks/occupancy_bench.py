@@ -0,0 +1,89 @@
+"""
+Payload size and cost of refreshing a grid view: the full /dashboard/slots listing against
+the packed /dashboard/occupancy vector, on a lot where a share of the slots is occupied.
+
+Each mode is measured right after a slot changes, which is what a polling dashboard sees on a
+busy lot: the listing has to be re-serialized, the vector re-encoded from memory.
+
+Run from the repository root:
+    python -m backend.benchmarks.occupancy_bench --slots 100000
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select, update
+
+from ..models import ParkingSlot, SlotStatus
+from ..occupancy_map import occupancy_map
+from ..slot_events import slots_changed
+from .common import serve_from, temp_engine
+from .concurrent_entry_bench import seed_slots
+
+
+def _occupy(engine, share: float, seed: int = 7) -> np.ndarray:
+    """Marks a random share of the slots occupied; returns the ids."""
+    with Session(engine) as session:
+        ids = np.array(session.exec(select(ParkingSlot.id)).all())
+        chosen = np.random.default_rng(seed).choice(ids, size=int(len(ids) * share), replace=False)
+        # In chunks, under SQLite's bound parameter limit
+        for chunk in np.array_split(chosen, max(1, len(chosen) // 10_000)):
+            session.exec(update(ParkingSlot).where(ParkingSlot.id.in_(chunk.tolist())).values(status=SlotStatus.OCCUPIED))
+        session.commit()
+    return ids
+
+
+def _refresh_ms(client: TestClient, engine, ids: np.ndarray, url: str, requests: int) -> float:
+    """Average time of a GET after one slot flipped status."""
+    total = 0.0
+    with Session(engine) as session:
+        for i in range(requests):
+            slot = session.get(ParkingSlot, int(ids[i % len(ids)]))
+            slot.status = SlotStatus.MAINTENANCE if slot.status != SlotStatus.MAINTENANCE else SlotStatus.AVAILABLE
+            session.add(slot)
+            session.commit()
+            session.refresh(slot)
+            slots_changed(slot)
+            start = time.perf_counter()
+            client.get(url)
+            total += time.perf_counter() - start
+    return total / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=100_000, help="Number of slots in the synthetic lot.")
+    parser.add_argument("--occupied", type=float, default=0.6, help="Share of slots occupied.")
+    parser.add_argument("--requests", type=int, default=20, help="Refreshes per mode.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = temp_engine(tmp)
+        seed_slots(engine, args.slots)
+        ids = _occupy(engine, args.occupied)
+        with serve_from(engine) as app:
+            occupancy_map.invalidate()
+            client = TestClient(app)
+            manifest = client.get("/dashboard/occupancy/layout").content
+            sizes = {
+                "listing": len(client.get("/dashboard/slots").content),
+                "bitset": len(client.get("/dashboard/occupancy").content),
+                "rle": len(client.get("/dashboard/occupancy", params={"encoding": "rle"}).content),
+            }
+            timings = {
+                "listing": _refresh_ms(client, engine, ids, "/dashboard/slots", args.requests),
+                "bitset": _refresh_ms(client, engine, ids, "/dashboard/occupancy", args.requests),
+                "rle": _refresh_ms(client, engine, ids, "/dashboard/occupancy?encoding=rle", args.requests),
+            }
+        engine.dispose()
+
+    print(f"{args.slots} slots, {args.occupied:.0%} occupied; layout manifest {len(manifest) / 1024:.0f} KiB, fetched once per layout")
+    print(f"{'mode':<18} {'body KiB':>10} {'ms per refresh':>15}")
+    for mode, label in (("listing", "/dashboard/slots"), ("bitset", "occupancy bitset"), ("rle", "occupancy rle")):
+        print(f"{label:<18} {sizes[mode] / 1024:>10.1f} {timings[mode]:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Cost of the background reconciler: how long a pass over the slot table takes, and how much
+it slows down entries and exits running at the same time.
+
+Seeds a lot, occupies part of it and injects drift (occupied slots without a session). Then
+runs the same entry/exit traffic twice, once alone and once while the reconciler walks the
+slots back to back in another thread (no pause between passes, the worst case), and reports
+per-request latency percentiles and the drift repaired.
+
+Run from the repository root:
+    python -m backend.benchmarks.reconciler_bench --slots 20000 --visits 1000
+"""
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from sqlmodel import Session
+
+from ..models import ParkingSlot, SlotStatus
+from ..reconciler import RECONCILE_CHUNK_SIZE, RECONCILE_PAUSE_SECONDS, SessionReconciler
+from .common import serve_from, temp_engine
+from .concurrent_entry_bench import seed_slots
+
+
+def _traffic(client: TestClient, visits: int, prefix: str) -> list:
+    """Per-request latencies in ms of visits entries, each followed by its exit."""
+    latencies = []
+    for i in range(visits):
+        start = time.perf_counter()
+        response = client.post("/vehicles/entry", json={"number_plate": f"{prefix}{i}", "vehicle_type": "Car", "billing_type": "Hourly"})
+        latencies.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        client.put(f"/vehicles/exit/{response.json()['session']['id']}")
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def _percentiles(latencies: list) -> str:
+    cuts = statistics.quantiles(latencies, n=100)
+    return f"{statistics.median(latencies):>8.2f} {cuts[94]:>8.2f} {cuts[98]:>8.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=20000, help="Slots in the synthetic lot.")
+    parser.add_argument("--visits", type=int, default=1000, help="Entries and exits per run.")
+    parser.add_argument("--drift", type=int, default=200, help="Occupied slots without a session to inject.")
+    parser.add_argument("--chunk-size", type=int, default=RECONCILE_CHUNK_SIZE, help="Slots checked per chunk.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = temp_engine(tmp)
+        seed_slots(engine, args.slots)
+        with Session(engine) as db:
+            db.exec(update(ParkingSlot).where(ParkingSlot.id % (args.slots // args.drift) == 0).values(status=SlotStatus.OCCUPIED))
+            db.commit()
+        with serve_from(engine) as app:
+            client = TestClient(app)
+            # Park vehicles in half the lot so the reconciler has sessions to compare against
+            for i in range(args.slots // 2):
+                client.post("/vehicles/entry", json={"number_plate": f"P{i}", "vehicle_type": "Car", "billing_type": "Hourly"})
+
+            reconciler = SessionReconciler()
+            reconciler.chunk_size = args.chunk_size
+            start = time.perf_counter()
+            reconciler.run_pass(engine)
+            first_pass = time.perf_counter() - start
+            start = time.perf_counter()
+            reconciler.run_pass(engine)
+            clean_pass = time.perf_counter() - start
+
+            alone = _traffic(client, args.visits, "A")
+            stop = threading.Event()
+
+            def reconcile():
+                while not stop.is_set():
+                    reconciler.step(engine)
+                    time.sleep(RECONCILE_PAUSE_SECONDS)
+
+            thread = threading.Thread(target=reconcile)
+            thread.start()
+            passes_before = reconciler.passes
+            during = _traffic(client, args.visits, "B")
+            stop.set()
+            thread.join()
+        engine.dispose()
+
+    print(f"{args.slots} slots, {args.slots // 2} parked, {args.drift} drifted; chunks of {reconciler.chunk_size} slots")
+    print(f"first pass (repairs)   {first_pass * 1000:8.0f} ms, {reconciler.occupied_slots_freed} slots freed")
+    print(f"clean pass             {clean_pass * 1000:8.0f} ms, {clean_pass / args.slots * 1e6:.2f} us per slot")
+    print(f"{'entry/exit latency ms':<26} {'p50':>8} {'p95':>8} {'p99':>8}")
+    print(f"{'reconciler idle':<26} {_percentiles(alone)}")
+    print(f"{'reconciler running':<26} {_percentiles(during)}   ({reconciler.passes - passes_before} passes meanwhile)")
+
+
+if __name__ == "__main__":
+    main()
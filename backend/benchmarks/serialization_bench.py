@@ -0,0 +1,87 @@
+"""
+Per-row cost of listing sessions the way /dashboard/sessions used to and the way it does now.
+
+Seeds a table of completed sessions and, for each method, times reading every row and
+encoding the response body, separately:
+- orm + pydantic: whole ParkingSession objects, validated into ParkingSessionResponse and dumped;
+- tuples + encoder json: the response columns as tuples, encoded by RowEncoder;
+- tuples + encoder columnar: the same rows encoded as one array per field.
+
+Run from the repository root:
+    python -m backend.benchmarks.serialization_bench --rows 100000
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from ..models import BillingType, ParkingSession, SessionStatus
+from ..row_json import RowEncoder, model_columns
+from ..schemas import ExportFormat, ParkingSessionResponse
+from .common import temp_engine
+
+_session_list_adapter = TypeAdapter(List[ParkingSessionResponse])
+
+
+def _seed(engine, rows: int):
+    start = datetime.now() - timedelta(days=30)
+    with Session(engine) as session:
+        for first in range(0, rows, 10000):
+            session.connection().execute(insert(ParkingSession.__table__), [
+                {
+                    "vehicle_number_plate": f"KA{i:06d}", "slot_id": i % 500 + 1,
+                    "entry_time": start + timedelta(seconds=i * 20),
+                    "exit_time": start + timedelta(seconds=i * 20 + 3600),
+                    "status": SessionStatus.COMPLETED.name, "billing_type": BillingType.HOURLY.name,
+                    "billing_amount": 50.0, "facility_id": "default",
+                }
+                for i in range(first, min(first + 10000, rows))
+            ])
+        session.commit()
+
+
+def _time(work):
+    start = time.perf_counter()
+    result = work()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="Sessions to list.")
+    args = parser.parse_args()
+
+    encoder = RowEncoder(ParkingSessionResponse)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = temp_engine(tmp)
+        _seed(engine, args.rows)
+        results = []
+        with Session(engine) as db:
+            sessions, read = _time(lambda: db.exec(select(ParkingSession)).all())
+            body, encode = _time(lambda: _session_list_adapter.dump_json(
+                _session_list_adapter.validate_python(sessions, from_attributes=True)
+            ))
+            results.append(("orm + pydantic", read, encode, len(body)))
+            db.expunge_all()
+
+            rows, read = _time(lambda: db.exec(select(*model_columns(ParkingSession, encoder))).all())
+            for label, export_format in (("tuples + encoder json", ExportFormat.JSON),
+                                         ("tuples + encoder columnar", ExportFormat.COLUMNAR)):
+                body, encode = _time(lambda: encoder.encode(rows, export_format))
+                results.append((label, read, encode, len(body)))
+        engine.dispose()
+
+    print(f"{args.rows} sessions")
+    print(f"{'method':<26} {'read us/row':>12} {'encode us/row':>14} {'total ms':>9} {'body KiB':>9}")
+    for label, read, encode, size in results:
+        print(f"{label:<26} {read / args.rows * 1e6:>12.2f} {encode / args.rows * 1e6:>14.2f} "
+              f"{(read + encode) * 1000:>9.0f} {size / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
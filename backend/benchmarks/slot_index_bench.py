@@ -0,0 +1,110 @@
+"""
+Benchmark for slot assignment with and without the in-memory free-slot index.
+
+Builds a temporary SQLite lot, fills it until only the last few slots of each type are
+free, then times the per-type query loop the entry handler used before the index
+against FreeSlotIndex.find, and finally times full POST /vehicles/entry calls.
+
+Run from the repository root:
+    python -m backend.benchmarks.slot_index_bench --slots 10000
+"""
+import argparse
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from ..main import app
+from ..models import ParkingSlot, SlotStatus, SlotType, VehicleType
+from ..routers.vehicles import _get_compatible_slot_types
+from ..slot_index import slot_index
+from .common import serve_from, temp_engine
+
+SLOT_TYPES = [SlotType.REGULAR, SlotType.COMPACT, SlotType.EV, SlotType.HANDICAP, SlotType.BIKE]
+
+
+def _seed(engine, total_slots: int, free_per_type: int):
+    """Inserts total_slots slots spread across types, leaving free_per_type available at the far end of each type."""
+    per_type = total_slots // len(SLOT_TYPES)
+    with Session(engine) as session:
+        for type_index, slot_type in enumerate(SLOT_TYPES):
+            for i in range(per_type):
+                session.add(ParkingSlot(
+                    slot_number=f"{'ABCDE'[type_index]}{i + 1}",
+                    slot_type=slot_type,
+                    has_charger=slot_type == SlotType.EV,
+                    status=SlotStatus.AVAILABLE if i >= per_type - free_per_type else SlotStatus.OCCUPIED,
+                ))
+        session.commit()
+
+
+def _legacy_find(session: Session, vehicle_type: VehicleType):
+    """The query loop vehicle_entry ran before the free-slot index."""
+    for slot_type in _get_compatible_slot_types(vehicle_type):
+        query = select(ParkingSlot).where(
+            ParkingSlot.slot_type == slot_type,
+            ParkingSlot.status == SlotStatus.AVAILABLE
+        )
+        if vehicle_type == VehicleType.EV:
+            query = query.where(ParkingSlot.has_charger == True)
+        slot = session.exec(query).first()
+        if slot:
+            return slot
+    return None
+
+
+def _time_per_call(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=10000, help="Total number of slots in the synthetic lot.")
+    parser.add_argument("--free-per-type", type=int, default=50, help="Slots left AVAILABLE per slot type.")
+    parser.add_argument("--iterations", type=int, default=500, help="Lookups to time per strategy.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = temp_engine(tmp)
+        _seed(engine, args.slots, args.free_per_type)
+
+        with Session(engine) as session:
+            start = time.perf_counter()
+            slot_index.load(session)
+            load_ms = (time.perf_counter() - start) * 1000
+            print(f"Loaded {len(slot_index)} free slots out of {args.slots} in {load_ms:.1f} ms")
+
+            for vehicle_type in VehicleType:
+                legacy_us = _time_per_call(lambda: _legacy_find(session, vehicle_type), args.iterations)
+                types = _get_compatible_slot_types(vehicle_type)
+                charger = vehicle_type == VehicleType.EV
+                index_us = _time_per_call(lambda: slot_index.find(types, require_charger=charger), args.iterations)
+                print(f"{vehicle_type.value:<20} legacy query loop {legacy_us:9.1f} us   index {index_us:6.2f} us")
+
+            print(slot_index.check_consistency(session)["consistent"] and "Index consistent with database"
+                  or "Index INCONSISTENT with database")
+
+        with serve_from(engine):
+            client = TestClient(app)
+            entries = min(args.iterations, args.free_per_type * 2)
+            start = time.perf_counter()
+            for i in range(entries):
+                response = client.post("/vehicles/entry", json={
+                    "number_plate": f"BENCH{i}", "vehicle_type": VehicleType.CAR.value, "billing_type": "Hourly"
+                })
+                response.raise_for_status()
+            entry_ms = (time.perf_counter() - start) / entries * 1000
+            print(f"POST /vehicles/entry: {entry_ms:.2f} ms per entry over {entries} entries at {args.slots} slots")
+
+        with Session(engine) as session:
+            print(slot_index.check_consistency(session)["consistent"] and "Index consistent after entries"
+                  or "Index INCONSISTENT after entries")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
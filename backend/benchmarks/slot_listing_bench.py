@@ -0,0 +1,52 @@
+"""
+Cost of polling /dashboard/slots on an idle lot: a full query and serialization, a cached
+body, and a 304 answer to If-None-Match.
+
+Run from the repository root:
+    python -m backend.benchmarks.slot_listing_bench --slots 5000
+"""
+import argparse
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+from ..slot_cache import slot_listing_cache
+from .common import serve_from, temp_engine
+from .concurrent_entry_bench import seed_slots
+
+
+def _per_request_ms(client: TestClient, requests: int, headers=None, invalidate=False) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        if invalidate:
+            slot_listing_cache.invalidate()
+        client.get("/dashboard/slots", headers=headers or {})
+    return (time.perf_counter() - start) / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=5000, help="Number of slots in the synthetic lot.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per mode.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = temp_engine(tmp)
+        seed_slots(engine, args.slots)
+        with serve_from(engine) as app:
+            client = TestClient(app)
+            uncached = _per_request_ms(client, args.requests, invalidate=True)
+            cached = _per_request_ms(client, args.requests)
+            etag = client.get("/dashboard/slots").headers["etag"]
+            not_modified = _per_request_ms(client, args.requests, headers={"If-None-Match": etag})
+        engine.dispose()
+
+    print(f"{args.slots} slots")
+    print(f"query + serialize  {uncached:8.2f} ms per request")
+    print(f"cached body        {cached:8.2f} ms per request")
+    print(f"304 Not Modified   {not_modified:8.2f} ms per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Startup cost of loading the in-memory state from the tables versus restoring it from a state
+snapshot, for a large lot.
+
+Seeds the slots and active sessions and times:
+- loading the free-slot index and the active-session map from the database, as a cold start does;
+- writing a snapshot, and its size;
+- restoring from the snapshot (memory map, validation against the database, decode);
+- the cost the change counting triggers add to a committed write.
+
+Run from the repository root:
+    python -m backend.benchmarks.snapshot_bench --slots 100000 --parked 60000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, update
+from sqlmodel import Session
+
+from ..active_sessions import active_sessions
+from ..models import BillingType, ParkingSession, ParkingSlot, SessionStatus, SlotStatus, SlotType
+from ..slot_index import slot_index
+from ..snapshot import StateSnapshot, install_state_version
+from .common import temp_engine
+
+SLOT_TYPES = list(SlotType)
+
+
+def _seed(engine, slots: int, parked: int):
+    now = datetime.now()
+    with Session(engine) as session:
+        connection = session.connection()
+        connection.execute(insert(ParkingSlot.__table__), [
+            {"slot_number": f"L{i // 10000}-{i}", "slot_type": SLOT_TYPES[i % len(SLOT_TYPES)].name,
+             "status": (SlotStatus.OCCUPIED if i < parked else SlotStatus.AVAILABLE).name,
+             "has_charger": i % 7 == 0, "level": i // 10000, "x": float(i % 100), "y": float(i // 100 % 100),
+             "facility_id": "default"}
+            for i in range(slots)
+        ])
+        connection.execute(insert(ParkingSession.__table__), [
+            {"vehicle_number_plate": f"KA{i:07d}", "slot_id": i + 1, "entry_time": now - timedelta(minutes=i % 600),
+             "status": SessionStatus.ACTIVE.name, "billing_type": BillingType.HOURLY.name, "rolled_up": False,
+             "facility_id": "default"}
+            for i in range(parked)
+        ])
+        session.commit()
+
+
+def _time(work):
+    start = time.perf_counter()
+    result = work()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def _commit_ms(engine, writes: int) -> float:
+    """Mean time of a committed one-row slot update."""
+    start = time.perf_counter()
+    with Session(engine) as session:
+        for i in range(writes):
+            session.exec(update(ParkingSlot).where(ParkingSlot.id == i + 1).values(level=i % 3))
+            session.commit()
+    return (time.perf_counter() - start) * 1000 / writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=100000, help="Slots in the synthetic lot.")
+    parser.add_argument("--parked", type=int, default=60000, help="Active sessions, one per occupied slot.")
+    parser.add_argument("--writes", type=int, default=2000, help="Committed writes timed with and without the triggers.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = temp_engine(tmp)
+        _seed(engine, args.slots, args.parked)
+        snapshot = StateSnapshot()
+        snapshot.path = os.path.join(tmp, "state.snapshot")
+        snapshot.start(engine)
+
+        def load():
+            with Session(engine) as db:
+                slot_index.load(db)
+                active_sessions.load(db)
+
+        _, load_ms = _time(load)
+        _, write_ms = _time(lambda: snapshot.write(engine))
+        snapshot.written_mark = None
+
+        def restore():
+            with Session(engine) as db:
+                return snapshot.restore(db)
+
+        restored, restore_ms = _time(restore)
+        assert restored == (args.slots, args.parked) and len(slot_index) == args.slots - args.parked
+
+        install_state_version(engine, False)
+        untracked_ms = _commit_ms(engine, args.writes)
+        install_state_version(engine, True)
+        tracked_ms = _commit_ms(engine, args.writes)
+        engine.dispose()
+
+    print(f"{args.slots} slots, {args.parked} active sessions")
+    print(f"load from database    {load_ms:8.0f} ms")
+    print(f"write snapshot        {write_ms:8.0f} ms, {snapshot.last_size / 1024:.0f} KiB")
+    print(f"restore from snapshot {restore_ms:8.0f} ms")
+    print(f"committed write       {untracked_ms:8.3f} ms without the triggers, {tracked_ms:.3f} ms with them")
+
+
+if __name__ == "__main__":
+    main()
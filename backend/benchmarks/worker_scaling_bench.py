@@ -0,0 +1,186 @@
+"""
+Entry/exit throughput as uvicorn worker processes are added.
+
+For each worker count, starts `uvicorn backend.main:app --workers N` in multi-worker mode on a
+fresh temporary SQLite database and drives it over HTTP from client processes: every vehicle
+enters, then every vehicle exits. A single worker without multi-worker mode runs first as the
+baseline, to show what the change log triggers and polling cost; speedups are relative to it.
+
+After each run the database is checked against what the responses acknowledged (one completed
+session per successful exit, one occupied slot per vehicle still parked, no slot holding two
+active sessions) and every worker's free-slot index is compared with the database.
+
+All writes still go through one SQLite file, so throughput scales with the CPU spent in Python
+per request (routing, validation, serialization, the in-memory indexes) rather than with the
+database. The client processes need cores too: on a machine with C cores, results past about
+C / 2 workers mostly measure contention.
+
+Run from the repository root:
+    python -m backend.benchmarks.worker_scaling_bench --max-workers 4 --vehicles 4000
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+import httpx
+import numpy as np
+from sqlmodel import Session, func, select
+
+from ..models import ParkingSession, ParkingSlot, SessionStatus, SlotStatus
+from .common import temp_engine
+from .concurrent_entry_bench import seed_slots
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+STARTUP_TIMEOUT_SECONDS = 60
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _start_server(tmp: str, port: int, workers: int, multi_worker: bool) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+        MULTI_WORKER="true" if multi_worker else "false",
+        WORKER_LOCK_DIR=tmp,
+        WRITE_BEHIND_LOG=os.path.join(tmp, "events.log"),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/").status_code == 200:
+                # One worker answering doesn't mean all have finished their startup
+                time.sleep(0.5 * workers)
+                return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+async def _drive(base_url: str, plates: List[str], concurrency: int) -> Tuple[List[float], int, int, int]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async def _timed(client: httpx.AsyncClient, method: str, url: str, **kwargs):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                return None
+            latencies.append((time.perf_counter() - start) * 1000)
+            return response
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        entries = await asyncio.gather(*(
+            _timed(client, "POST", "/vehicles/entry", json={"number_plate": plate, "vehicle_type": "Car", "billing_type": "Hourly"})
+            for plate in plates
+        ))
+        session_ids = [response.json()["session"]["id"] for response in entries if response is not None and response.status_code == 201]
+        exits = await asyncio.gather(*(_timed(client, "PUT", f"/vehicles/exit/{session_id}") for session_id in session_ids))
+    exited = sum(1 for response in exits if response is not None and response.status_code == 200)
+    return latencies, len(session_ids), exited, len(entries) + len(exits) - len(session_ids) - exited
+
+
+def _client(args) -> Tuple[List[float], int, int, int]:
+    base_url, plates, concurrency = args
+    return asyncio.run(_drive(base_url, plates, concurrency))
+
+
+def _check_database(engine, entered: int, exited: int) -> bool:
+    with Session(engine) as session:
+        completed = session.exec(
+            select(func.count()).select_from(ParkingSession).where(ParkingSession.status == SessionStatus.COMPLETED)
+        ).one()
+        occupied = session.exec(
+            select(func.count()).select_from(ParkingSlot).where(ParkingSlot.status == SlotStatus.OCCUPIED)
+        ).one()
+        shared_slots = session.exec(
+            select(ParkingSession.slot_id).where(ParkingSession.status == SessionStatus.ACTIVE)
+            .group_by(ParkingSession.slot_id).having(func.count() > 1)
+        ).all()
+    return completed == exited and occupied == entered - exited and not shared_slots
+
+
+def _check_indexes(base_url: str, workers: int) -> bool:
+    """Asks the workers (whichever the kernel hands each connection to) to compare their index with the database."""
+    time.sleep(0.5)
+    return all(
+        httpx.get(f"{base_url}/dashboard/slot-index/check", headers={"Connection": "close"}).json()["consistent"]
+        for _ in range(workers * 4)
+    )
+
+
+def _run(workers: int, multi_worker: bool, vehicles: int, clients: int, concurrency: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = temp_engine(tmp)
+        seed_slots(engine, vehicles)
+        port = _free_port()
+        server = _start_server(tmp, port, workers, multi_worker)
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            plates = [f"MW{i}" for i in range(vehicles)]
+            jobs = [(base_url, plates[client::clients], max(1, concurrency // clients)) for client in range(clients)]
+            start = time.perf_counter()
+            with multiprocessing.get_context("spawn").Pool(clients) as pool:
+                outcomes = pool.map(_client, jobs)
+            elapsed = time.perf_counter() - start
+            indexes_consistent = _check_indexes(base_url, workers)
+        finally:
+            server.terminate()
+            server.wait()
+        latencies = [latency for outcome in outcomes for latency in outcome[0]]
+        entered = sum(outcome[1] for outcome in outcomes)
+        exited = sum(outcome[2] for outcome in outcomes)
+        consistent = _check_database(engine, entered, exited) and indexes_consistent
+        engine.dispose()
+
+    samples = np.array(latencies)
+    return {
+        "ops_per_s": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "errors": sum(outcome[3] for outcome in outcomes),
+        "consistent": consistent,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1, help="Largest worker count; runs 1, 2, ... up to it.")
+    parser.add_argument("--vehicles", type=int, default=4000, help="Vehicles entering and then exiting per run.")
+    parser.add_argument("--clients", type=int, default=2, help="Client processes generating the load.")
+    parser.add_argument("--concurrency", type=int, default=64, help="Requests in flight at once, over all clients.")
+    args = parser.parse_args()
+
+    runs = [("1 (single mode)", 1, False)] + [(str(workers), workers, True) for workers in range(1, args.max_workers + 1)]
+    print(f"{args.vehicles} entries + {args.vehicles} exits, {args.clients} client processes, concurrency {args.concurrency}, "
+          f"{os.cpu_count()} CPU cores")
+    print(f"{'workers':<16} {'ops/s':>8} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}  consistent")
+    baseline = None
+    for label, workers, multi_worker in runs:
+        result = _run(workers, multi_worker, args.vehicles, args.clients, args.concurrency)
+        baseline = baseline or result["ops_per_s"]
+        speedup = result["ops_per_s"] / baseline
+        print(f"{label:<16} {result['ops_per_s']:>8.0f} {speedup:>7.2f}x {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+              f"{result['errors']:>7}  {result['consistent']}")
+
+
+if __name__ == "__main__":
+    main()
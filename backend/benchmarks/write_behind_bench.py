@@ -0,0 +1,142 @@
+"""
+Entry/exit throughput against the durability window.
+
+Runs the same workload (every vehicle enters, then every vehicle exits, with concurrent
+gates) once with a commit per request and then in write-behind mode for each log sync
+policy and group commit interval, each against a fresh temporary SQLite database. After
+each run the database is checked against what the responses acknowledged: one completed
+session per successful exit and one occupied slot per vehicle whose exit failed. Failed
+requests (e.g. SQLite "database is locked" under direct commits) are counted as errors.
+
+The durability window is what a crash can lose of the acknowledged events:
+  direct        nothing (each request commits before it answers)
+  always        nothing (the log is fsynced before each answer)
+  group         nothing on a process crash, up to one interval on power loss
+  none          up to one interval on a process crash
+
+Run from the repository root:
+    python -m backend.benchmarks.write_behind_bench --vehicles 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import List, NamedTuple, Optional
+
+import httpx
+import numpy as np
+from sqlmodel import Session, func, select
+
+from ..models import ParkingSession, ParkingSlot, SessionStatus, SlotStatus
+from ..write_behind import write_behind
+from .common import serve_from, temp_engine
+from .concurrent_entry_bench import seed_slots
+
+
+class Outcome(NamedTuple):
+    latencies: List[float]
+    entered: int
+    exited: int
+    errors: int
+
+
+async def _drive(app, vehicles: int, concurrency: int) -> Outcome:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def _timed(client: httpx.AsyncClient, method: str, url: str, **kwargs) -> httpx.Response:
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append((time.perf_counter() - start) * 1000)
+            return response
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        entries = await asyncio.gather(*(
+            _timed(client, "POST", "/vehicles/entry", json={"number_plate": f"WB{i}", "vehicle_type": "Car", "billing_type": "Hourly"})
+            for i in range(vehicles)
+        ))
+        session_ids = [response.json()["session"]["id"] for response in entries if response.status_code == 201]
+        exits = await asyncio.gather(*(_timed(client, "PUT", f"/vehicles/exit/{session_id}") for session_id in session_ids))
+    exited = sum(1 for response in exits if response.status_code == 200)
+    return Outcome(latencies, len(session_ids), exited, len(entries) + len(exits) - len(session_ids) - exited)
+
+
+async def _drive_write_behind(app, vehicles: int, concurrency: int) -> Outcome:
+    flusher = asyncio.create_task(write_behind.run())
+    try:
+        return await _drive(app, vehicles, concurrency)
+    finally:
+        flusher.cancel()
+
+
+def _check(engine, outcome: Outcome) -> bool:
+    with Session(engine) as session:
+        completed = session.exec(
+            select(func.count()).select_from(ParkingSession).where(ParkingSession.status == SessionStatus.COMPLETED)
+        ).one()
+        occupied = session.exec(
+            select(func.count()).select_from(ParkingSlot).where(ParkingSlot.status != SlotStatus.AVAILABLE)
+        ).one()
+    return completed == outcome.exited and occupied == outcome.entered - outcome.exited
+
+
+def _run(vehicles: int, concurrency: int, log_sync: Optional[str], interval_ms: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = temp_engine(tmp)
+        seed_slots(engine, vehicles)
+        write_behind.configure(
+            enabled=log_sync is not None, path=os.path.join(tmp, "events.log"),
+            flush_interval=interval_ms / 1000, log_sync=log_sync or "group"
+        )
+        write_behind.group_commits = write_behind.committed_events = 0
+        write_behind.start(engine)
+        with serve_from(engine) as app:
+            start = time.perf_counter()
+            if log_sync is None:
+                outcome = asyncio.run(_drive(app, vehicles, concurrency))
+            else:
+                outcome = asyncio.run(_drive_write_behind(app, vehicles, concurrency))
+            write_behind.close()
+            elapsed = time.perf_counter() - start
+        consistent = _check(engine, outcome)
+        engine.dispose()
+
+    samples = np.array(outcome.latencies)
+    return {
+        "ops_per_s": len(outcome.latencies) / elapsed,
+        "errors": outcome.errors,
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "group_commits": write_behind.group_commits,
+        "events_per_commit": write_behind.committed_events / write_behind.group_commits if write_behind.group_commits else 0.0,
+        "consistent": consistent,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vehicles", type=int, default=2000, help="Vehicles entering and then exiting.")
+    parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight at once.")
+    parser.add_argument("--intervals", default="2,5,20", help="Comma-separated group commit intervals in ms.")
+    args = parser.parse_args()
+    intervals = [float(value) for value in args.intervals.split(",")]
+
+    runs = [("direct", None, 0.0)]
+    runs += [(f"{log_sync} / {interval:g} ms", log_sync, interval) for log_sync in ("always", "group", "none") for interval in intervals]
+
+    print(f"{args.vehicles} entries + {args.vehicles} exits, concurrency {args.concurrency}")
+    print(f"{'mode':<18} {'ops/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'commits':>8} {'events/commit':>14}  consistent")
+    try:
+        for label, log_sync, interval in runs:
+            result = _run(args.vehicles, args.concurrency, log_sync, interval)
+            print(f"{label:<18} {result['ops_per_s']:>9.0f} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['errors']:>7} "
+                  f"{result['group_commits']:>8} {result['events_per_commit']:>14.1f}  {result['consistent']}")
+    finally:
+        write_behind.enabled = False
+
+
+if __name__ == "__main__":
+    main()
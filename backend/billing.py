@@ -0,0 +1,241 @@
+import json
+import math
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlmodel import Session, select
+
+from .models import ArchivedSession, BillingType, ParkingSession, ParkingSlot, SessionStatus, SlotType
+
+SECONDS_PER_HOUR = 3600
+HOURS_PER_DAY = 24
+
+
+@dataclass(frozen=True)
+class TimeBand:
+    """Multiplier applied to billed hours that start between start_hour (inclusive) and end_hour (exclusive)."""
+    start_hour: int
+    end_hour: int
+    multiplier: float
+
+
+@dataclass(frozen=True)
+class TariffPlan:
+    """
+    Pricing rules for one slot type.
+
+    Hourly sessions pay first_hour_rate for the first hour and subsequent_hour_rate for every
+    started hour after it, each scaled by the time band the billed hour starts in. daily_cap, if
+    set, caps the hourly charges of each 24 hour period of the stay. Day pass sessions pay
+    day_pass_rate for every started 24 hours.
+    """
+    first_hour_rate: float = 50.0
+    subsequent_hour_rate: float = 30.0
+    day_pass_rate: float = 200.0
+    daily_cap: Optional[float] = None
+    bands: Tuple[TimeBand, ...] = field(default_factory=tuple)
+
+    def hourly_multipliers(self) -> np.ndarray:
+        """Multiplier for each hour of the day; hours outside every band use 1.0."""
+        multipliers = np.ones(HOURS_PER_DAY)
+        for band in self.bands:
+            multipliers[band.start_hour:band.end_hour] = band.multiplier
+        return multipliers
+
+
+DEFAULT_TARIFF = TariffPlan()
+
+# Tariff per slot type. Override with a JSON file named by TARIFF_PLANS_FILE, e.g.
+# {"EV": {"first_hour_rate": 70, "bands": [{"start_hour": 18, "end_hour": 22, "multiplier": 1.5}]}}
+TARIFF_PLANS_FILE = os.getenv("TARIFF_PLANS_FILE")
+
+
+def load_tariff_plans(path: Optional[str] = TARIFF_PLANS_FILE) -> Dict[SlotType, TariffPlan]:
+    """Returns the tariff for every slot type, starting from DEFAULT_TARIFF and applying the file's overrides."""
+    plans = {slot_type: DEFAULT_TARIFF for slot_type in SlotType}
+    if not path:
+        return plans
+    with open(path) as f:
+        overrides = json.load(f)
+    for slot_type_value, settings in overrides.items():
+        bands = tuple(TimeBand(**band) for band in settings.pop("bands", []))
+        plans[SlotType(slot_type_value)] = TariffPlan(bands=bands, **settings)
+    return plans
+
+
+tariff_plans = load_tariff_plans()
+
+
+def tariff_for(slot_type: SlotType) -> TariffPlan:
+    return tariff_plans[slot_type]
+
+
+# Plan used for sessions whose slot row no longer exists, so their exit is still charged
+FALLBACK_SLOT_TYPE = SlotType.REGULAR
+
+
+# --- Single session ---
+
+def price_session(plan: TariffPlan, billing_type: BillingType, entry_time: datetime, exit_time: datetime) -> float:
+    """Prices one session hour by hour. price_sessions is the vectorized equivalent for large batches."""
+    seconds = max((exit_time - entry_time).total_seconds(), 0.0)
+
+    if billing_type == BillingType.DAY_PASS:
+        days = max(1, math.ceil(seconds / (SECONDS_PER_HOUR * HOURS_PER_DAY)))
+        return round(float(days * plan.day_pass_rate), 2)
+
+    billed_hours = max(1, math.ceil(seconds / SECONDS_PER_HOUR))
+    multipliers = plan.hourly_multipliers()
+    total = 0.0
+    day_total = 0.0
+    for hour in range(billed_hours):
+        if hour and hour % HOURS_PER_DAY == 0:
+            total += day_total if plan.daily_cap is None else min(day_total, plan.daily_cap)
+            day_total = 0.0
+        rate = plan.first_hour_rate if hour == 0 else plan.subsequent_hour_rate
+        day_total += rate * multipliers[(entry_time.hour + hour) % HOURS_PER_DAY]
+    total += day_total if plan.daily_cap is None else min(day_total, plan.daily_cap)
+    return round(float(total), 2)
+
+
+# --- Vectorized batches ---
+
+def price_sessions(plan: TariffPlan, is_day_pass: np.ndarray, entry_times: np.ndarray, exit_times: np.ndarray) -> np.ndarray:
+    """
+    Vectorized price_session over arrays of sessions billed under the same plan.
+    entry_times and exit_times are datetime64 arrays. Runs in O(n) numpy operations no matter
+    how long the stays are, by using prefix sums of the hourly multipliers instead of
+    iterating over billed hours.
+    """
+    seconds = np.maximum((exit_times - entry_times) / np.timedelta64(1, "s"), 0.0)
+    entry_hours = (entry_times.astype("datetime64[h]") - entry_times.astype("datetime64[D]")).astype(np.int64)
+
+    # Day passes: one rate per started 24 hours
+    days = np.maximum(1, np.ceil(seconds / (SECONDS_PER_HOUR * HOURS_PER_DAY)))
+    day_pass_amounts = days * plan.day_pass_rate
+
+    # Hourly: billed hour i starts at hour of day (entry_hour + i) % 24
+    billed_hours = np.maximum(1, np.ceil(seconds / SECONDS_PER_HOUR)).astype(np.int64)
+    multipliers = plan.hourly_multipliers()
+    prefix = np.concatenate(([0.0], np.cumsum(multipliers)))
+    full_day = prefix[-1]
+
+    def multiplier_sum(start: np.ndarray, stop: np.ndarray) -> np.ndarray:
+        """Sum of multipliers for hour offsets [start, stop) counted from midnight, over any number of days."""
+        def cumulative(k):
+            return (k // HOURS_PER_DAY) * full_day + prefix[k % HOURS_PER_DAY]
+        return cumulative(stop) - cumulative(start)
+
+    first_charge = plan.first_hour_rate * multipliers[entry_hours]
+    if plan.daily_cap is None:
+        hourly_amounts = first_charge + plan.subsequent_hour_rate * multiplier_sum(entry_hours + 1, entry_hours + billed_hours)
+    else:
+        # First day (holds the first hour), full middle days, and the partial last day, each capped
+        first_day_hours = np.minimum(billed_hours, HOURS_PER_DAY)
+        first_day = first_charge + plan.subsequent_hour_rate * multiplier_sum(entry_hours + 1, entry_hours + first_day_hours)
+        remaining = billed_hours - first_day_hours
+        full_days = remaining // HOURS_PER_DAY
+        last_day_hours = remaining % HOURS_PER_DAY
+        last_day_start = entry_hours + first_day_hours + full_days * HOURS_PER_DAY
+        last_day = plan.subsequent_hour_rate * multiplier_sum(last_day_start, last_day_start + last_day_hours)
+        hourly_amounts = (
+            np.minimum(first_day, plan.daily_cap)
+            + full_days * min(plan.subsequent_hour_rate * full_day, plan.daily_cap)
+            + np.minimum(last_day, plan.daily_cap)
+        )
+
+    return np.round(np.where(is_day_pass, day_pass_amounts, hourly_amounts), 2)
+
+
+def price_batch(slot_types: np.ndarray, is_day_pass: np.ndarray, entry_times: np.ndarray, exit_times: np.ndarray) -> np.ndarray:
+    """
+    Prices sessions across slot types, applying each slot type's plan to its own rows.
+    slot_types is a string array of SlotType values.
+    """
+    amounts = np.zeros(len(slot_types))
+    for slot_type in np.unique(slot_types):
+        rows = slot_types == slot_type
+        amounts[rows] = price_sessions(tariff_for(SlotType(slot_type)), is_day_pass[rows], entry_times[rows], exit_times[rows])
+    return amounts
+
+
+# --- Reconciliation over stored sessions ---
+
+# Rows read per query when re-pricing stored sessions
+REPRICE_CHUNK_SIZE = 100_000
+
+
+def _session_chunks(db: Session, query, id_column, chunk_size: int):
+    """Yields (slot_types, is_day_pass, entry_times, exit_times, billed_amounts) arrays, keyset-paginated on the session id."""
+    cursor = 0
+    while True:
+        rows = db.exec(query.where(id_column > cursor).order_by(id_column).limit(chunk_size)).all()
+        if not rows:
+            return
+        ids, slot_types, billing_types, entry_times, exit_times, amounts = zip(*rows)
+        yield (
+            np.array([slot_type.value for slot_type in slot_types]),
+            np.array([billing_type == BillingType.DAY_PASS for billing_type in billing_types]),
+            np.array(entry_times, dtype="datetime64[us]"),
+            np.array(exit_times, dtype="datetime64[us]"),
+            np.array([amount or 0.0 for amount in amounts]),
+        )
+        cursor = ids[-1]
+
+
+def _session_query(model):
+    return (
+        select(model.id, ParkingSlot.slot_type, model.billing_type, model.entry_time, model.exit_time, model.billing_amount)
+        .join(ParkingSlot, ParkingSlot.id == model.slot_id)
+    )
+
+
+def _reconcile(db: Session, queries: List[Tuple[object, object]], exit_time: Optional[datetime], chunk_size: int) -> dict:
+    """Re-prices the rows of (query, id column) pairs; exit_time, if given, replaces their exit times."""
+    totals = {"sessions": 0, "billed_amount": 0.0, "repriced_amount": 0.0, "by_slot_type": {}}
+    chunks = (chunk for query, id_column in queries for chunk in _session_chunks(db, query, id_column, chunk_size))
+    for slot_types, is_day_pass, entry_times, exit_times, billed in chunks:
+        if exit_time is not None:
+            exit_times = np.full(len(entry_times), np.datetime64(exit_time, "us"))
+        repriced = price_batch(slot_types, is_day_pass, entry_times, exit_times)
+        totals["sessions"] += len(repriced)
+        totals["billed_amount"] += float(billed.sum())
+        totals["repriced_amount"] += float(repriced.sum())
+        for slot_type in np.unique(slot_types):
+            by_type = totals["by_slot_type"].setdefault(SlotType(slot_type), 0.0)
+            totals["by_slot_type"][SlotType(slot_type)] = by_type + float(repriced[slot_types == slot_type].sum())
+    totals["billed_amount"] = round(totals["billed_amount"], 2)
+    totals["repriced_amount"] = round(totals["repriced_amount"], 2)
+    totals["difference"] = round(totals["repriced_amount"] - totals["billed_amount"], 2)
+    totals["by_slot_type"] = {slot_type: round(amount, 2) for slot_type, amount in totals["by_slot_type"].items()}
+    return totals
+
+
+def reprice_completed_sessions(
+    db: Session,
+    exited_after: Optional[datetime] = None,
+    exited_before: Optional[datetime] = None,
+    chunk_size: int = REPRICE_CHUNK_SIZE
+) -> dict:
+    """
+    Re-prices completed sessions, live and archived, under the current tariffs and compares
+    them with what was billed.
+    """
+    queries = []
+    for model in (ParkingSession, ArchivedSession):
+        query = _session_query(model).where(model.status == SessionStatus.COMPLETED)
+        if exited_after:
+            query = query.where(model.exit_time >= exited_after)
+        if exited_before:
+            query = query.where(model.exit_time < exited_before)
+        queries.append((query, model.id))
+    return _reconcile(db, queries, None, chunk_size)
+
+
+def forecast_active_sessions(db: Session, as_of: datetime, chunk_size: int = REPRICE_CHUNK_SIZE) -> dict:
+    """Prices every active session as if it exited at as_of. billed_amount is what was collected at entry."""
+    query = _session_query(ParkingSession).where(ParkingSession.status == SessionStatus.ACTIVE)
+    return _reconcile(db, [(query, ParkingSession.id)], as_of, chunk_size)
@@ -0,0 +1,213 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Generic, Iterable, List, NamedTuple, Optional, Set, TypeVar
+
+from sqlmodel import Session, select
+
+from .facilities import FACILITY_IDS, FacilityLocal
+from .models import ParkingSlot, SlotStatus, Vehicle, VehicleType
+from .slot_index import IndexedSlot
+
+# Entries kept per cache and facility; beyond it the least recently used are evicted.
+# A lot's slots should fit, and enough plates to cover the regulars of a few weeks.
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "50000"))
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """Bounded mapping that evicts its least recently used entry, counting hits, misses and evictions."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[K, V]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: K) -> Optional[V]:
+        """Like get, without counting the lookup or refreshing the entry."""
+        return self._entries.get(key)
+
+    def put(self, key: K, value: V):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key: K):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CachedVehicle(NamedTuple):
+    """Lightweight copy of a vehicle's columns."""
+    id: int
+    number_plate: str
+    vehicle_type: VehicleType
+
+
+class VehicleCache:
+    """
+    Read-through cache of vehicles by number plate, so a returning vehicle enters without a
+    Vehicle lookup. Vehicles are only ever inserted, never updated or deleted, so an entry can't
+    go stale; entries are added on the first lookup of a plate and when a vehicle is created.
+    """
+
+    def __init__(self, capacity: int = ENTITY_CACHE_SIZE):
+        self.by_plate: LRUCache[str, CachedVehicle] = LRUCache(capacity)
+
+    def get(self, db: Session, number_plate: str) -> Optional[CachedVehicle]:
+        vehicle = self.by_plate.get(number_plate)
+        if vehicle is None:
+            row = db.exec(
+                select(Vehicle.id, Vehicle.number_plate, Vehicle.vehicle_type).where(Vehicle.number_plate == number_plate)
+            ).first()
+            if row is not None:
+                vehicle = CachedVehicle(*row)
+                self.by_plate.put(number_plate, vehicle)
+        return vehicle
+
+    def known_plates(self, db: Session, number_plates: Iterable[str]) -> Set[str]:
+        """The plates that have a vehicle, reading those not cached with one query."""
+        number_plates = set(number_plates)
+        known = {plate for plate in number_plates if self.by_plate.get(plate) is not None}
+        if len(known) < len(number_plates):
+            for row in db.exec(
+                select(Vehicle.id, Vehicle.number_plate, Vehicle.vehicle_type).where(Vehicle.number_plate.in_(number_plates - known))
+            ).all():
+                self.by_plate.put(row[1], CachedVehicle(*row))
+                known.add(row[1])
+        return known
+
+    def add(self, vehicle: Vehicle) -> CachedVehicle:
+        """Caches a vehicle after the transaction creating it has been committed."""
+        cached = CachedVehicle(vehicle.id, vehicle.number_plate, vehicle.vehicle_type)
+        self.by_plate.put(cached.number_plate, cached)
+        return cached
+
+
+class SlotDetailCache:
+    """
+    Read-through cache of slots' static columns (number, type, charger, position) by id and by
+    slot number. Status is deliberately not cached: it changes on every entry and exit, and the
+    conditional UPDATEs claiming and freeing slots already decide it in the database.
+
+    Write-through from slot_events.slots_changed, which every handler creating or updating
+    slots (create_parking_slot, update_slot_status, the bulk endpoint) and the multi-worker sync
+    call after committing; cleared when slots may have changed without it, e.g. a layout
+    re-provisioning existing slots.
+    """
+
+    def __init__(self, capacity: int = ENTITY_CACHE_SIZE):
+        self.by_id: LRUCache[int, IndexedSlot] = LRUCache(capacity)
+        self.by_number: LRUCache[str, IndexedSlot] = LRUCache(capacity)
+
+    def _remember(self, slot: IndexedSlot):
+        self.by_id.put(slot.id, slot)
+        self.by_number.put(slot.slot_number, slot)
+
+    def get(self, db: Session, slot_id: int) -> Optional[IndexedSlot]:
+        slot = self.by_id.get(slot_id)
+        if slot is None:
+            row = db.get(ParkingSlot, slot_id)
+            if row is not None:
+                slot = _indexed(row)
+                self._remember(slot)
+        return slot
+
+    def find_number(self, db: Session, slot_number: str) -> Optional[IndexedSlot]:
+        slot = self.by_number.get(slot_number)
+        if slot is None:
+            row = db.exec(select(ParkingSlot).where(ParkingSlot.slot_number == slot_number)).first()
+            if row is not None:
+                slot = _indexed(row)
+                self._remember(slot)
+        return slot
+
+    def sync(self, slot: ParkingSlot):
+        """Stores the committed columns of a slot, replacing whatever was cached for it."""
+        previous = self.by_id.peek(slot.id)
+        if previous is not None and previous.slot_number != slot.slot_number:
+            self.by_number.discard(previous.slot_number)
+        self._remember(_indexed(slot))
+
+    def clear(self):
+        self.by_id.clear()
+        self.by_number.clear()
+
+
+def _indexed(slot: ParkingSlot) -> IndexedSlot:
+    return IndexedSlot(slot.id, slot.slot_number, slot.slot_type, slot.has_charger, slot.level, slot.x, slot.y)
+
+
+def slot_row(slot: IndexedSlot, status: SlotStatus) -> ParkingSlot:
+    """
+    A detached ParkingSlot built from cached columns and a status the caller just committed,
+    for the post-commit hooks and responses, instead of reading the row back.
+    """
+    return ParkingSlot(**slot._asdict(), status=status)
+
+
+# One instance of each per facility
+vehicle_cache = FacilityLocal(VehicleCache)
+slot_detail_cache = FacilityLocal(SlotDetailCache)
+
+
+def cache_stats() -> List[dict]:
+    """Counters of every cache of every facility served by this process."""
+    stats = []
+    for facility_id in FACILITY_IDS:
+        for name, cache in (
+            ("vehicle_by_plate", vehicle_cache.instance(facility_id).by_plate),
+            ("slot_by_id", slot_detail_cache.instance(facility_id).by_id),
+            ("slot_by_number", slot_detail_cache.instance(facility_id).by_number),
+        ):
+            stats.append({
+                "facility": facility_id, "cache": name, "size": len(cache), "capacity": cache.capacity,
+                "hits": cache.hits, "misses": cache.misses, "evictions": cache.evictions, "hit_rate": cache.hit_rate,
+            })
+    return stats
+
+
+def render_cache_metrics() -> str:
+    """The cache counters in the Prometheus text format, appended to /metrics."""
+    stats = cache_stats()
+    lines = []
+    for name, kind, help_text, field in (
+        ("parking_entity_cache_hits_total", "counter", "Lookups answered from the entity cache.", "hits"),
+        ("parking_entity_cache_misses_total", "counter", "Lookups that read the database.", "misses"),
+        ("parking_entity_cache_evictions_total", "counter", "Entries evicted to stay within capacity.", "evictions"),
+        ("parking_entity_cache_entries", "gauge", "Entries currently cached.", "size"),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for entry in stats:
+            lines.append(f'{name}{{facility="{entry["facility"]}",cache="{entry["cache"]}"}} {entry[field]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,171 @@
+import asyncio
+import os
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Generic, Iterator, List, Optional, TypeVar
+
+from starlette.responses import JSONResponse
+from starlette.routing import get_route_path
+from starlette.websockets import WebSocketClose
+
+# Facilities (malls) served by this process, comma-separated. Each one has its own database and
+# its own in-memory state, so a deployment can split its facilities across processes by giving
+# each a different FACILITIES list and routing /facilities/<id>/... to the process that owns it.
+# Requests without a facility prefix or X-Facility-Id header go to the first one listed.
+FACILITIES = os.getenv("FACILITIES", "default")
+
+# Database of every facility except "default", which keeps DATABASE_URL (the single-site parking.db)
+FACILITY_DATABASE_URL = os.getenv("FACILITY_DATABASE_URL", "sqlite:///./parking-{facility}.db")
+
+FACILITY_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,49}$")
+LEGACY_FACILITY = "default"
+# Cross-facility routes under /facilities (routers/facilities.py), which a facility id must not shadow
+RESERVED_FACILITY_IDS = {"summary", "analytics"}
+
+FACILITY_PATH_PREFIX = "/facilities/"
+FACILITY_HEADER = b"x-facility-id"
+
+
+def parse_facilities(value: str) -> List[str]:
+    facility_ids = [facility_id.strip() for facility_id in value.split(",") if facility_id.strip()]
+    if not facility_ids:
+        raise ValueError("FACILITIES must name at least one facility")
+    for facility_id in facility_ids:
+        if not FACILITY_ID_PATTERN.match(facility_id):
+            raise ValueError(f"Invalid facility id '{facility_id}': use lowercase letters, digits, '-' and '_'")
+        if facility_id in RESERVED_FACILITY_IDS:
+            raise ValueError(f"'{facility_id}' is reserved and can't be a facility id")
+    if len(set(facility_ids)) != len(facility_ids):
+        raise ValueError("FACILITIES lists a facility twice")
+    return facility_ids
+
+
+FACILITY_IDS = parse_facilities(FACILITIES)
+DEFAULT_FACILITY = FACILITY_IDS[0]
+
+_current_facility: ContextVar[str] = ContextVar("current_facility", default=DEFAULT_FACILITY)
+
+
+def current_facility() -> str:
+    """The facility the current request or background task works on."""
+    return _current_facility.get()
+
+
+@contextmanager
+def use_facility(facility_id: str) -> Iterator[str]:
+    """
+    Makes facility_id the current facility for the block. Tasks created and threadpool calls
+    made inside it inherit the facility, as they copy the current context.
+    """
+    token = _current_facility.set(facility_id)
+    try:
+        yield facility_id
+    finally:
+        _current_facility.reset(token)
+
+
+def facility_file(path: str, facility_id: Optional[str] = None) -> str:
+    """Per-facility variant of a file path: 'events.log' becomes 'events-<facility>.log', except for "default"."""
+    facility_id = facility_id or current_facility()
+    if facility_id == LEGACY_FACILITY:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}-{facility_id}{extension}"
+
+
+T = TypeVar("T")
+
+
+class FacilityLocal(Generic[T]):
+    """
+    One instance of an in-memory singleton per facility, behind a single module-level name.
+
+    Attribute access, len() and `in` go to the instance of the current facility, created by
+    factory (inside use_facility, so it can read current_facility()) the first time that facility
+    uses it. Code written against the singleton therefore works unchanged for every facility.
+    """
+
+    __slots__ = ("_factory", "_instances", "_lock")
+
+    def __init__(self, factory: Callable[[], T]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instances", {})
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def instance(self, facility_id: Optional[str] = None) -> T:
+        facility_id = facility_id or current_facility()
+        instances: Dict[str, T] = self._instances
+        instance = instances.get(facility_id)
+        if instance is None:
+            with self._lock:
+                instance = instances.get(facility_id)
+                if instance is None:
+                    with use_facility(facility_id):
+                        instance = instances[facility_id] = self._factory()
+        return instance
+
+    def __getattr__(self, name: str):
+        return getattr(self.instance(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(self.instance(), name, value)
+
+    def __len__(self) -> int:
+        return len(self.instance())
+
+    def __contains__(self, item) -> bool:
+        return item in self.instance()
+
+
+async def for_each_facility(work: Callable[..., T], *args) -> Dict[str, T]:
+    """
+    Runs work(*args) once per facility, in parallel worker threads, each inside its facility's
+    context. Used by the cross-facility dashboards; returns the results by facility id.
+    """
+    def _run(facility_id: str) -> T:
+        with use_facility(facility_id):
+            return work(*args)
+
+    results = await asyncio.gather(*(asyncio.to_thread(_run, facility_id) for facility_id in FACILITY_IDS))
+    return dict(zip(FACILITY_IDS, results))
+
+
+class FacilityMiddleware:
+    """
+    Pure ASGI middleware choosing the facility each request works on: the <id> of a
+    /facilities/<id>/... path, which is moved into root_path so every facility shares the same
+    routers (/facilities/mall-a/vehicles/entry is served by /vehicles/entry), otherwise the
+    X-Facility-Id header, otherwise the default facility. Unknown facilities get a 404.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        facility_id = None
+        route_path = get_route_path(scope)
+        if route_path.startswith(FACILITY_PATH_PREFIX):
+            prefix_id, slash, _ = route_path[len(FACILITY_PATH_PREFIX):].partition("/")
+            if slash and prefix_id not in RESERVED_FACILITY_IDS:
+                facility_id = prefix_id
+                # Updated in place, like Mount does, so outer middleware sees the matched route
+                scope["root_path"] = scope.get("root_path", "") + FACILITY_PATH_PREFIX + prefix_id
+        if facility_id is None:
+            header = dict(scope["headers"]).get(FACILITY_HEADER)
+            facility_id = header.decode("latin-1") if header else DEFAULT_FACILITY
+
+        if facility_id not in FACILITY_IDS:
+            if scope["type"] == "websocket":
+                await WebSocketClose(code=1008, reason="Unknown facility")(scope, receive, send)
+            else:
+                await JSONResponse({"detail": f"Unknown facility '{facility_id}'."}, status_code=404)(scope, receive, send)
+            return
+
+        with use_facility(facility_id):
+            await self.app(scope, receive, send)
@@ -0,0 +1,271 @@
+import asyncio
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from .facilities import FacilityLocal
+from .models import ArchivedSession, ParkingSession, SlotType, Vehicle, VehicleType
+from .slot_index import COMPATIBLE_SLOT_TYPES, slot_index
+
+# Weeks of session history the model is first trained on; after that it only folds in each hour as it closes
+FORECAST_HISTORY_WEEKS = int(os.getenv("FORECAST_HISTORY_WEEKS", "4"))
+
+# Hours ahead covered by the per-type reserves and the run-out warnings
+FORECAST_HORIZON_HOURS = int(os.getenv("FORECAST_HORIZON_HOURS", "3"))
+
+# Weight of the newest week in an hour's rates (exponential smoothing); higher adapts faster
+FORECAST_SMOOTHING = float(os.getenv("FORECAST_SMOOTHING", "0.3"))
+
+# Whether entries steer clear of slot types reserved for other vehicle types. The reserves only
+# reorder the compatible slot types; a vehicle is never refused a slot that is free.
+FORECAST_POOLS = os.getenv("FORECAST_POOLS", "true").lower() in ("1", "true", "yes")
+
+# How often the model catches up and the reserves are re-planned, and how many hours one refresh
+# folds in at most, so a refresh costs the same however long the session history is
+FORECAST_REFRESH_SECONDS = 60
+FORECAST_HOURS_PER_REFRESH = 24
+FORECAST_CATCH_UP_PAUSE_SECONDS = 0.05
+
+VEHICLE_TYPES = list(VehicleType)
+_TYPE_INDEX = {vehicle_type: i for i, vehicle_type in enumerate(VEHICLE_TYPES)}
+# Vehicle types with the fewest alternatives get their reserves first
+_PLANNING_ORDER = sorted(VEHICLE_TYPES, key=lambda vehicle_type: len(COMPATIBLE_SLOT_TYPES[vehicle_type]))
+HOURS_PER_WEEK = 7 * 24
+ONE_HOUR = timedelta(hours=1)
+
+Reserves = Dict[VehicleType, Dict[SlotType, int]]
+
+
+def _hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _hourly_counts(db: Session, column: str, start: datetime, end: datetime) -> np.ndarray:
+    """Sessions per vehicle type and hour whose entry_time or exit_time falls in [start, end)."""
+    counts = np.zeros((len(VEHICLE_TYPES), int((end - start) / ONE_HOUR)), dtype=np.int64)
+    for model in (ParkingSession, ArchivedSession):
+        moment_column = getattr(model, column)
+        rows = db.exec(
+            select(moment_column, Vehicle.vehicle_type)
+            .join(Vehicle, Vehicle.number_plate == model.vehicle_number_plate)
+            .where(moment_column >= start, moment_column < end)
+        ).all()
+        for moment, vehicle_type in rows:
+            counts[_TYPE_INDEX[vehicle_type], int((moment - start) / ONE_HOUR)] += 1
+    return counts
+
+
+class DemandForecast:
+    """
+    Per-facility forecast of arrivals and departures per hour and vehicle type, learned from the
+    session history, and the slot reserves planned from it.
+
+    Rates are kept per hour of the week (Saturday 15:00 is its own hour) with a per-hour-of-day
+    fallback for hours not seen yet, each an exponentially smoothed count. A background task
+    folds in every hour once it has closed, at most FORECAST_HOURS_PER_REFRESH per refresh, so
+    an update reads the sessions of a bounded time window through the entry_time and exit_time
+    indexes and never scans the history; the first FORECAST_HISTORY_WEEKS are learned the same
+    way, a day per refresh.
+
+    Each refresh also re-plans the reserves: the peak net demand of each vehicle type over the
+    horizon is set aside from the free slots of its compatible types, types with the fewest
+    alternatives first, and a warning is raised for any type expected to run out. Entries then
+    prefer slot types whose free slots are not all reserved for other vehicle types.
+    """
+
+    def __init__(self):
+        self.pools_enabled = FORECAST_POOLS
+        self.horizon_hours = FORECAST_HORIZON_HOURS
+        self.learned_until: Optional[datetime] = None
+        self.hours_learned = 0
+        shape = (len(VEHICLE_TYPES), HOURS_PER_WEEK)
+        self._arrivals = np.zeros(shape)
+        self._departures = np.zeros(shape)
+        self._weeks_seen = np.zeros(HOURS_PER_WEEK, dtype=np.int64)
+        self._daily_arrivals = np.zeros((len(VEHICLE_TYPES), 24))
+        self._daily_departures = np.zeros((len(VEHICLE_TYPES), 24))
+        self._days_seen = np.zeros(24, dtype=np.int64)
+        self._reserves: Reserves = {}
+        self._warned: Set[VehicleType] = set()
+        self._lock = threading.Lock()
+
+    # --- Learning ---
+
+    def _fold(self, hour: datetime, arrivals: np.ndarray, departures: np.ndarray):
+        for rates_in, rates_out, seen, slot in (
+            (self._arrivals, self._departures, self._weeks_seen, hour.weekday() * 24 + hour.hour),
+            (self._daily_arrivals, self._daily_departures, self._days_seen, hour.hour),
+        ):
+            weight = FORECAST_SMOOTHING if seen[slot] else 1.0
+            rates_in[:, slot] += weight * (arrivals - rates_in[:, slot])
+            rates_out[:, slot] += weight * (departures - rates_out[:, slot])
+            seen[slot] += 1
+
+    def learn(self, db: Session, now: datetime) -> int:
+        """Folds in the next closed hours, at most FORECAST_HOURS_PER_REFRESH. Returns how many."""
+        current_hour = _hour(now)
+        previous = self.learned_until
+        start = previous or current_hour - timedelta(weeks=FORECAST_HISTORY_WEEKS)
+        end = min(start + FORECAST_HOURS_PER_REFRESH * ONE_HOUR, current_hour)
+        if start >= end:
+            return 0
+        arrivals = _hourly_counts(db, "entry_time", start, end)
+        departures = _hourly_counts(db, "exit_time", start, end)
+        with self._lock:
+            if self.learned_until != previous:
+                # Another refresh folded these hours in meanwhile
+                return 0
+            for offset in range(arrivals.shape[1]):
+                self._fold(start + offset * ONE_HOUR, arrivals[:, offset], departures[:, offset])
+            self.learned_until = end
+            self.hours_learned += arrivals.shape[1]
+        return arrivals.shape[1]
+
+    # --- Forecasting ---
+
+    def _expected(self, hour: datetime) -> Tuple[np.ndarray, np.ndarray]:
+        week_slot = hour.weekday() * 24 + hour.hour
+        if self._weeks_seen[week_slot]:
+            return self._arrivals[:, week_slot], self._departures[:, week_slot]
+        return self._daily_arrivals[:, hour.hour], self._daily_departures[:, hour.hour]
+
+    def hourly(self, now: datetime, hours: int) -> List[Tuple[datetime, np.ndarray, np.ndarray]]:
+        """Expected (hour, arrivals, departures) per vehicle type from now; the current hour only counts its remainder."""
+        current_hour = _hour(now)
+        forecast = []
+        with self._lock:
+            for offset in range(hours):
+                hour = current_hour + offset * ONE_HOUR
+                arrivals, departures = self._expected(hour)
+                share = 1 - (now - current_hour) / ONE_HOUR if offset == 0 else 1.0
+                forecast.append((hour, arrivals * share, departures * share))
+        return forecast
+
+    def plan(self, now: datetime) -> dict:
+        """
+        Works out the reserves and warnings for the horizon from the current free-slot counts.
+        Pure: replan() is what installs the reserves for the allocator.
+        """
+        hours = self.hourly(now, self.horizon_hours)
+        cumulative = np.cumsum([arrivals - departures for _, arrivals, departures in hours], axis=0)
+        demand = np.ceil(np.maximum(cumulative.max(axis=0), 0)).astype(int)
+
+        free = {slot_type: slot_index.free_count(slot_type) for slot_type in SlotType}
+        unreserved = dict(free)
+        reserves: Reserves = {}
+        for vehicle_type in _PLANNING_ORDER:
+            remaining = int(demand[_TYPE_INDEX[vehicle_type]])
+            pool = reserves[vehicle_type] = {}
+            for slot_type in COMPATIBLE_SLOT_TYPES[vehicle_type]:
+                taken = min(remaining, unreserved[slot_type])
+                if taken:
+                    pool[slot_type] = taken
+                    unreserved[slot_type] -= taken
+                    remaining -= taken
+
+        warnings = []
+        for vehicle_type in VEHICLE_TYPES:
+            i = _TYPE_INDEX[vehicle_type]
+            available = sum(reserves[vehicle_type].values()) + sum(
+                unreserved[slot_type] for slot_type in COMPATIBLE_SLOT_TYPES[vehicle_type]
+            )
+            short = np.flatnonzero(cumulative[:, i] > available)
+            if len(short):
+                runs_out_at = max(hours[short[0]][0], now)
+                warnings.append({
+                    "vehicle_type": vehicle_type,
+                    "expected_demand": int(demand[i]),
+                    "available_slots": available,
+                    "runs_out_at": runs_out_at,
+                    "message": f"{vehicle_type.value} slots are expected to run out around {runs_out_at:%H:%M}: "
+                               f"{int(demand[i])} more vehicles expected within {self.horizon_hours} h, {available} slots free.",
+                })
+
+        return {
+            "generated_at": now,
+            "learned_until": self.learned_until,
+            "hours_learned": self.hours_learned,
+            "horizon_hours": self.horizon_hours,
+            "pools_enabled": self.pools_enabled,
+            "hours": [
+                {"hour": hour,
+                 "arrivals": dict(zip(VEHICLE_TYPES, arrivals.round(2).tolist())),
+                 "departures": dict(zip(VEHICLE_TYPES, departures.round(2).tolist()))}
+                for hour, arrivals, departures in hours
+            ],
+            "free_slots": free,
+            "expected_demand": dict(zip(VEHICLE_TYPES, demand.tolist())),
+            "reserves": reserves,
+            "warnings": warnings,
+        }
+
+    def replan(self, now: datetime) -> dict:
+        """Installs fresh reserves for the allocator and logs newly raised warnings."""
+        plan = self.plan(now)
+        with self._lock:
+            self._reserves = plan["reserves"]
+        warned = {warning["vehicle_type"] for warning in plan["warnings"]}
+        for warning in plan["warnings"]:
+            if warning["vehicle_type"] not in self._warned:
+                print(f"Forecast: {warning['message']}")
+        self._warned = warned
+        return plan
+
+    # --- Allocation ---
+
+    def slot_type_order(self, vehicle_type: VehicleType, slot_types: List[SlotType]) -> List[SlotType]:
+        """
+        The compatible slot types in the order an entry should try them: types with a free slot
+        not reserved for another vehicle type first, in their usual order, then the rest.
+        """
+        if not self.pools_enabled or not self._reserves:
+            return slot_types
+        with self._lock:
+            open_types, reserved_types = [], []
+            for slot_type in slot_types:
+                own = self._reserves.get(vehicle_type, {}).get(slot_type, 0)
+                others = sum(pool.get(slot_type, 0) for other, pool in self._reserves.items() if other != vehicle_type)
+                if own > 0 or slot_index.free_count(slot_type) > others:
+                    open_types.append(slot_type)
+                else:
+                    reserved_types.append(slot_type)
+            return open_types + reserved_types
+
+    def consume(self, vehicle_type: VehicleType, slot_type: SlotType):
+        """Counts a claimed slot against the vehicle type's reserve until the next re-plan."""
+        with self._lock:
+            pool = self._reserves.get(vehicle_type)
+            if pool and pool.get(slot_type):
+                pool[slot_type] -= 1
+
+    # --- Background task ---
+
+    def refresh(self, engine: Engine) -> int:
+        """Learns the next closed hours and re-plans the reserves. Returns the hours learned."""
+        now = datetime.now()
+        with Session(engine) as db:
+            learned = self.learn(db, now)
+        self.replan(now)
+        return learned
+
+    async def run(self, engine: Engine):
+        """Refreshes forever, quickly while catching up on history. Started from the application lifespan."""
+        while True:
+            try:
+                learned = await asyncio.to_thread(self.refresh, engine)
+            except Exception as exc:
+                # Typically a busy database; the next refresh picks up from learned_until
+                print(f"Demand forecast refresh failed: {exc}")
+                learned = 0
+            await asyncio.sleep(
+                FORECAST_CATCH_UP_PAUSE_SECONDS if learned == FORECAST_HOURS_PER_REFRESH else FORECAST_REFRESH_SECONDS
+            )
+
+
+# One instance per facility, refreshed by a background task
+demand_forecast = FacilityLocal(DemandForecast)
@@ -0,0 +1,120 @@
+import json
+import os
+from typing import Iterable, List, NamedTuple, Optional, Union
+
+from sqlalchemy import bindparam, insert, update
+from sqlmodel import Session, select
+
+from .facilities import current_facility
+from .models import Entrance, ParkingSlot, SlotStatus, SlotType
+from .schemas import EntranceSpec, LayoutLevelSpec, LayoutRowSpec, LayoutSpec, SlotCreateRequest
+
+# Layout created at startup. Override with a JSON file in the LayoutSpec format named by SLOT_LAYOUT_FILE;
+# a "{facility}" in the name is replaced by the facility id, to give each facility its own layout.
+SLOT_LAYOUT_FILE = os.getenv("SLOT_LAYOUT_FILE")
+
+# The original 8x12 demo grid: rows A-E regular, F EV with chargers, G handicap accessible, H bikes.
+# Rows are one unit apart with slot 1 of each row next to the main entrance.
+DEFAULT_LAYOUT = LayoutSpec(
+    levels=[LayoutLevelSpec(rows=[
+        *(LayoutRowSpec(name=row, slots=12, slot_type=SlotType.REGULAR, x=1.0) for row in "ABCDE"),
+        LayoutRowSpec(name="F", slots=12, slot_type=SlotType.EV, has_charger=True, x=1.0),
+        LayoutRowSpec(name="G", slots=12, slot_type=SlotType.HANDICAP, x=1.0),
+        LayoutRowSpec(name="H", slots=12, slot_type=SlotType.BIKE, x=1.0),
+    ])],
+    entrances=[EntranceSpec(name="Main")]
+)
+
+# Must match ParkingSlot.slot_number
+SLOT_NUMBER_MAX_LENGTH = 10
+
+
+def load_layout(path: Optional[str] = SLOT_LAYOUT_FILE) -> LayoutSpec:
+    if not path:
+        return DEFAULT_LAYOUT
+    with open(path.replace("{facility}", current_facility())) as f:
+        return LayoutSpec.model_validate(json.load(f))
+
+
+class LayoutSlot(NamedTuple):
+    """One slot of an expanded layout, with the same fields as SlotCreateRequest."""
+    slot_number: str
+    slot_type: SlotType
+    has_charger: bool
+    level: int
+    x: float
+    y: float
+
+
+def expand_layout(layout: LayoutSpec) -> List[LayoutSlot]:
+    """Lists every slot described by a layout. Raises ValueError for slot numbers that are too long."""
+    slots = []
+    for level_position, level in enumerate(layout.levels):
+        level_number = level_position if level.level is None else level.level
+        for row_position, row in enumerate(level.rows):
+            y = float(row_position) if row.y is None else row.y
+            for offset in range(row.slots):
+                slot_number = f"{level.prefix}{row.name}{row.first_number + offset}"
+                if len(slot_number) > SLOT_NUMBER_MAX_LENGTH:
+                    raise ValueError(f"Slot number '{slot_number}' is longer than {SLOT_NUMBER_MAX_LENGTH} characters.")
+                slots.append(LayoutSlot(slot_number, row.slot_type, row.has_charger, level_number, row.x + offset * row.spacing, y))
+    return slots
+
+
+class ProvisionResult(NamedTuple):
+    created_ids: List[int]
+    skipped: int # Slot numbers that already existed
+    located: int # Existing slots without coordinates that were given the spec's coordinates
+
+
+def provision_slots(db: Session, slots: Iterable[Union[SlotCreateRequest, LayoutSlot]]) -> ProvisionResult:
+    """
+    Inserts the slots whose numbers don't exist yet, with one query for the existing numbers
+    and one multi-row INSERT. Existing slots that have no coordinates yet, e.g. created before
+    slots had any, take the coordinates from the spec. Does not commit.
+    """
+    existing = dict(db.exec(select(ParkingSlot.slot_number, ParkingSlot.x)).all())
+    rows = []
+    locations = []
+    skipped = 0
+    for slot in slots:
+        if slot.slot_number in existing:
+            skipped += 1
+            if existing[slot.slot_number] is None and slot.x is not None:
+                locations.append({"b_slot_number": slot.slot_number, "b_level": slot.level, "b_x": slot.x, "b_y": slot.y})
+            continue
+        existing[slot.slot_number] = slot.x
+        rows.append({
+            "slot_number": slot.slot_number,
+            "slot_type": slot.slot_type,
+            "has_charger": slot.has_charger,
+            "status": SlotStatus.AVAILABLE,
+            "level": slot.level,
+            "x": slot.x,
+            "y": slot.y
+        })
+
+    table = ParkingSlot.__table__
+    if locations:
+        db.connection().execute(
+            update(table).where(table.c.slot_number == bindparam("b_slot_number"))
+            .values(level=bindparam("b_level"), x=bindparam("b_x"), y=bindparam("b_y")),
+            locations
+        )
+    created_ids = []
+    if rows:
+        # Core insert: building ORM objects for tens of thousands of rows would cost more than the insert itself
+        created_ids = db.connection().execute(insert(table).returning(table.c.id), rows).scalars().all()
+    return ProvisionResult(list(created_ids), skipped, len(locations))
+
+
+def provision_entrances(db: Session, entrances: Iterable[EntranceSpec]) -> int:
+    """Inserts the entrances whose names don't exist yet. Returns how many were created. Does not commit."""
+    existing = set(db.exec(select(Entrance.name)).all())
+    created = 0
+    for entrance in entrances:
+        if entrance.name not in existing:
+            existing.add(entrance.name)
+            db.add(Entrance(**entrance.model_dump()))
+            created += 1
+    return created
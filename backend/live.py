@@ -0,0 +1,114 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlmodel import Session, select
+
+from .facilities import FacilityLocal
+from .models import ParkingSlot
+from .schemas import ParkingSlotResponse
+from .summary import summary_cache
+
+# Changes published within one interval are coalesced into a single frame
+STREAM_FLUSH_INTERVAL_SECONDS = 0.2
+# Number of recent delta frames kept so reconnecting clients can resume
+STREAM_HISTORY_FRAMES = 512
+# Frames buffered per subscriber before it is considered too slow and dropped
+STREAM_SUBSCRIBER_QUEUE_SIZE = 64
+
+
+class OccupancyStream:
+    """
+    Fan-out of slot status changes to live dashboard subscribers.
+
+    Handlers publish changed slots after their commit. A background task flushes the
+    pending changes every STREAM_FLUSH_INTERVAL_SECONDS as one sequence-numbered delta
+    frame carrying the latest state of each changed slot plus the summary counters, so a
+    burst of entries becomes a handful of frames. Deltas hold absolute slot states, which
+    makes re-applying a frame harmless.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self._pending: Dict[int, dict] = {}
+        self._pending_lock = threading.Lock()
+        self._history: Deque[Tuple[int, dict]] = deque(maxlen=STREAM_HISTORY_FRAMES)
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    def publish(self, slots: Iterable[ParkingSlot]):
+        """Queues the current state of the given slots for the next frame. Safe to call from any thread."""
+        states = [ParkingSlotResponse.model_validate(slot).model_dump(mode="json") for slot in slots]
+        with self._pending_lock:
+            for state in states:
+                self._pending[state["id"]] = state
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=STREAM_SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def frames_since(self, seq: int) -> Optional[List[dict]]:
+        """
+        Returns the delta frames after seq, or None if they are no longer in the history
+        and the client needs a fresh snapshot.
+        """
+        if seq > self.seq or seq < 0:
+            return None
+        if seq == self.seq:
+            return []
+        if not self._history or self._history[0][0] > seq + 1:
+            return None
+        return [frame for frame_seq, frame in self._history if frame_seq > seq]
+
+    def snapshot(self, db: Session) -> dict:
+        """Builds a full snapshot frame of every slot and the summary counters."""
+        seq = self.seq
+        slots = db.exec(select(ParkingSlot)).all()
+        return {
+            "type": "snapshot",
+            "seq": seq,
+            "slots": [ParkingSlotResponse.model_validate(slot).model_dump(mode="json") for slot in slots],
+            "summary": summary_cache.get(db).model_dump(mode="json"),
+        }
+
+    def _take_pending(self) -> List[dict]:
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        return list(pending.values())
+
+    def _broadcast(self, frame: dict):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Slow consumer; replace its backlog with a close marker so it reconnects and resumes
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def run(self, engine):
+        """Flush loop, started from the application lifespan."""
+        while True:
+            await asyncio.sleep(STREAM_FLUSH_INTERVAL_SECONDS)
+            slots = self._take_pending()
+            if not slots:
+                continue
+            summary = await asyncio.to_thread(self._read_summary, engine)
+            self.seq += 1
+            frame = {"type": "delta", "seq": self.seq, "slots": slots, "summary": summary}
+            self._history.append((self.seq, frame))
+            self._broadcast(frame)
+
+    @staticmethod
+    def _read_summary(engine) -> dict:
+        with Session(engine) as session:
+            return summary_cache.get(session).model_dump(mode="json")
+
+
+# One instance per facility, fed by the slot mutation handlers
+occupancy_stream = FacilityLocal(OccupancyStream)
@@ -1,11 +1,95 @@
 # Main FastAPI application entry point
 
+import asyncio
+from typing import List
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from .database import create_db_and_tables, engine, populate_default_slots
-from .routers import vehicles, slots, dashboard 
+from sqlmodel import Session
+
+from .database import create_db_and_tables, get_engine, populate_default_slots
+from .active_sessions import active_sessions
+from .analytics import get_rollup_state, run_backfill
+from .archive import run_archiver
+from .facilities import DEFAULT_FACILITY, FACILITY_IDS, FacilityMiddleware, use_facility
+from .forecast import demand_forecast
+from .live import occupancy_stream
+from .metrics import MetricsMiddleware, metrics
+from .plate_search import backfill_plate_index
+from .reconciler import session_reconciler
+from .slot_index import slot_index
+from .snapshot import state_snapshot
+from .workers import startup_lock, worker_sync
+from .write_behind import write_behind
+from .routers import vehicles, slots, dashboard, facilities, metrics as metrics_router
+
+async def run_maintenance(engine):
+    """Analytics backfill, session archiving, reconciliation and state snapshots, run by a single worker in multi-worker mode."""
+    await worker_sync.wait_for_maintenance()
+    await asyncio.gather(
+        run_backfill(engine), run_archiver(engine), session_reconciler.run(engine), state_snapshot.run(engine)
+    )
+
+async def start_facility(facility_id: str) -> List[asyncio.Task]:
+    """
+    Prepares one facility's database shard and in-memory state and starts its background tasks.
+    Runs inside use_facility, so the tasks created here keep working on this facility.
+    """
+    label = f"[{facility_id}] " if len(FACILITY_IDS) > 1 else ""
+    if worker_sync.enabled and write_behind.enabled:
+        raise RuntimeError("WRITE_BEHIND keeps entries and exits in one process's memory and can't be combined with MULTI_WORKER")
+
+    engine = get_engine()
+    # With several workers, the first one to get here creates the tables and replays the log
+    with startup_lock(worker_sync.enabled):
+        print(f"{label}Creating tables...")
+        create_db_and_tables()
+        print(f"{label}Tables created!")
+
+        print(f"{label}Populating default parking slots...") # <--- New log message
+        created_slots = populate_default_slots() # <--- Called the new function
+        print(f"{label}Default slots populated! ({created_slots} created)") # <--- New log message
+
+        # Replay logged entries and exits a crash kept from the database, before loading the indexes
+        replayed_events = write_behind.start(engine)
+        if replayed_events:
+            print(f"{label}Replayed {replayed_events} events from the write-behind log.")
+
+        worker_sync.start(engine)
+        state_snapshot.start(engine)
+
+    with Session(engine) as session:
+        # A snapshot matching the database saves scanning the slots and sessions
+        restored = state_snapshot.restore(session)
+        if restored:
+            print(f"{label}Restored {restored[0]} slots and {restored[1]} active sessions from the state snapshot "
+                  f"in {state_snapshot.last_restore_ms:.0f} ms ({len(slot_index)} available slots).")
+        else:
+            slot_index.load(session)
+            print(f"{label}Free-slot index loaded ({len(slot_index)} available slots).")
+            active_sessions.load(session)
+            print(f"{label}Active sessions loaded ({len(active_sessions)} vehicles parked).")
+        indexed_plates = backfill_plate_index(session)
+        if indexed_plates:
+            print(f"{label}Indexed {indexed_plates} number plates for search.")
+        rollup_state = get_rollup_state(session)
+        if rollup_state.backfill_completed_at is None:
+            print(f"{label}Backfilling analytics rollups from session {rollup_state.backfill_cursor} in the background.")
+
+    tasks = [
+        asyncio.create_task(occupancy_stream.run(engine)),
+        asyncio.create_task(run_maintenance(engine)),
+        asyncio.create_task(demand_forecast.run(engine)),
+    ]
+    if worker_sync.enabled:
+        print(f"{label}Multi-worker mode: syncing with other workers every {worker_sync.sync_interval * 1000:g} ms.")
+        tasks.append(asyncio.create_task(worker_sync.run(engine)))
+    if write_behind.enabled:
+        print(f"{label}Write-behind mode: group commits every {write_behind.flush_interval * 1000:g} ms, log sync '{write_behind.log_sync}'.")
+        tasks.append(asyncio.create_task(write_behind.run()))
+    return tasks
 
 # Define lifespan context for database initialization
 @asynccontextmanager
@@ -14,16 +98,30 @@ async def lifespan(app: FastAPI):
     Context manager for application startup and shutdown events.
     Used to create database tables on startup.
     """
-    print("Creating tables...")
-    create_db_and_tables()
-    print("Tables created!")
+    tasks: List[asyncio.Task] = []
+    for facility_id in FACILITY_IDS:
+        with use_facility(facility_id):
+            tasks += await start_facility(facility_id)
+    if len(FACILITY_IDS) > 1:
+        print(f"Serving {len(FACILITY_IDS)} facilities under /facilities/<id>; default '{DEFAULT_FACILITY}'.")
 
-    print("Populating default parking slots...") # <--- New log message
-    populate_default_slots() # <--- Called the new function
-    print("Default slots populated!") # <--- New log message
+    if metrics.enabled:
+        print("Request metrics enabled at /metrics.")
 
     yield
     print("Shutting down...")
+    for task in tasks:
+        task.cancel()
+    for facility_id in FACILITY_IDS:
+        with use_facility(facility_id):
+            write_behind.close()
+            # After the last write-behind commit, so the next start can restore from it
+            if worker_sync.is_maintenance_worker:
+                try:
+                    if state_snapshot.write(get_engine()):
+                        print(f"State snapshot written to {state_snapshot.path} ({state_snapshot.last_size / 1024:.0f} KiB).")
+                except Exception as exc:
+                    print(f"State snapshot failed: {exc}")
 
 app = FastAPI(
     title="Mall Parking Management System API",
@@ -38,18 +136,27 @@ origins = [
     "http://127.0.0.1:5173",
 ]
 
+# Innermost, so it runs after CORS and inside the metrics timing
+app.add_middleware(FacilityMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Outermost, so request timings include CORS handling
+app.add_middleware(MetricsMiddleware)
+
 # Including the routers
 app.include_router(vehicles.router)
 app.include_router(slots.router)
 app.include_router(dashboard.router)
+app.include_router(facilities.router)
+app.include_router(metrics_router.router)
 
 # Root endpoint
 @app.get("/")
@@ -0,0 +1,334 @@
+import cProfile
+import functools
+import inspect
+import io
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Collection is off unless METRICS_ENABLED is set; while off, requests and queries skip
+# everything here after a single flag check
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Sampling profiler: profile this fraction of requests and keep the profiles of those slower than
+# PROFILER_SLOW_REQUEST_MS. Only sync handlers are profiled, in the threadpool thread running them.
+PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))
+PROFILER_SLOW_REQUEST_MS = float(os.getenv("PROFILER_SLOW_REQUEST_MS", "500"))
+PROFILER_KEEP = 20
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+RouteKey = Tuple[str, str]  # (method, route path)
+
+
+class RequestStats:
+    """Measurements of one request, shared through a context variable with its handler thread."""
+    __slots__ = ("queries", "db_seconds", "endpoint_seconds", "handler_seconds", "profile", "profiler")
+
+    def __init__(self, profile: bool):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.endpoint_seconds = 0.0
+        self.handler_seconds = 0.0
+        self.profile = profile
+        self.profiler: Optional[cProfile.Profile] = None
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus model."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide request and database metrics, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.enabled = METRICS_ENABLED
+        self.profile_sample_rate = PROFILER_SAMPLE_RATE
+        self.slow_request_ms = PROFILER_SLOW_REQUEST_MS
+        self.slow_requests: Deque[dict] = deque(maxlen=PROFILER_KEEP)
+        self.in_flight = 0
+        self.queries_total = 0
+        self.query_errors_total = 0
+        self.db_seconds_total = 0.0
+        self._requests: Dict[Tuple[str, str, int], int] = {}
+        self._latency: Dict[RouteKey, Histogram] = {}
+        self._queries: Dict[RouteKey, Histogram] = {}
+        self._db_seconds: Dict[RouteKey, float] = {}
+        self._endpoint_seconds: Dict[RouteKey, float] = {}
+        self._serialization_seconds: Dict[RouteKey, float] = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.queries_total = 0
+            self.query_errors_total = 0
+            self.db_seconds_total = 0.0
+            for series in (self._requests, self._latency, self._queries, self._db_seconds,
+                           self._endpoint_seconds, self._serialization_seconds):
+                series.clear()
+            self.slow_requests.clear()
+
+    def record_query(self, seconds: float, failed: bool = False):
+        with self._lock:
+            self.queries_total += 1
+            self.query_errors_total += failed
+            self.db_seconds_total += seconds
+
+    def record_request(self, method: str, route: str, status_code: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            self._requests[(method, route, status_code)] = self._requests.get((method, route, status_code), 0) + 1
+            self._latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self._queries.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(stats.queries)
+            self._db_seconds[key] = self._db_seconds.get(key, 0.0) + stats.db_seconds
+            self._endpoint_seconds[key] = self._endpoint_seconds.get(key, 0.0) + stats.endpoint_seconds
+            # Time in the route handler outside the endpoint: request validation, dependencies and response serialization
+            if stats.handler_seconds:
+                self._serialization_seconds[key] = (
+                    self._serialization_seconds.get(key, 0.0) + max(stats.handler_seconds - stats.endpoint_seconds, 0.0)
+                )
+
+    def record_profile(self, method: str, route: str, seconds: float, profiler: cProfile.Profile):
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(25)
+        self.slow_requests.append({
+            "method": method,
+            "route": route,
+            "duration_ms": round(seconds * 1000, 2),
+            "captured_at": datetime.now().isoformat(timespec="seconds"),
+            "profile": output.getvalue(),
+        })
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format."""
+        def labels(method: str, route: str) -> str:
+            return f'method="{method}",route="{route}"'
+
+        with self._lock:
+            lines = [
+                "# HELP parking_http_requests_in_flight Requests currently being served.",
+                "# TYPE parking_http_requests_in_flight gauge",
+                f"parking_http_requests_in_flight {self.in_flight}",
+                "# HELP parking_http_requests_total Requests served, by route and status code.",
+                "# TYPE parking_http_requests_total counter",
+            ]
+            for (method, route, status_code), count in sorted(self._requests.items()):
+                lines.append(f'parking_http_requests_total{{{labels(method, route)},status="{status_code}"}} {count}')
+
+            lines += [
+                "# HELP parking_http_request_duration_seconds Request latency, by route.",
+                "# TYPE parking_http_request_duration_seconds histogram",
+            ]
+            for (method, route), histogram in sorted(self._latency.items()):
+                lines += histogram.render("parking_http_request_duration_seconds", labels(method, route))
+
+            lines += [
+                "# HELP parking_db_queries_per_request SQL statements executed per request, by route.",
+                "# TYPE parking_db_queries_per_request histogram",
+            ]
+            for (method, route), histogram in sorted(self._queries.items()):
+                lines += histogram.render("parking_db_queries_per_request", labels(method, route))
+
+            for name, help_text, series in (
+                ("parking_request_db_seconds_total", "Time spent executing SQL, by route.", self._db_seconds),
+                ("parking_request_endpoint_seconds_total", "Time spent in endpoint functions including SQL, by route.", self._endpoint_seconds),
+                ("parking_request_serialization_seconds_total", "Time spent validating requests and serializing responses, by route.", self._serialization_seconds),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (method, route), seconds in sorted(series.items()):
+                    lines.append(f"{name}{{{labels(method, route)}}} {seconds}")
+
+            lines += [
+                "# HELP parking_db_queries_total SQL statements executed, including background tasks.",
+                "# TYPE parking_db_queries_total counter",
+                f"parking_db_queries_total {self.queries_total}",
+                "# HELP parking_db_query_errors_total SQL statements that raised, including background tasks.",
+                "# TYPE parking_db_query_errors_total counter",
+                f"parking_db_query_errors_total {self.query_errors_total}",
+                "# HELP parking_db_seconds_total Time spent executing SQL, including background tasks.",
+                "# TYPE parking_db_seconds_total counter",
+                f"parking_db_seconds_total {self.db_seconds_total}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+# --- SQLAlchemy hooks, installed for every engine ---
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if metrics.enabled:
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _finish_query(conn, failed=False)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # after_cursor_execute doesn't fire for a statement that raises, so its start is popped here
+    if exception_context.connection is not None:
+        _finish_query(exception_context.connection, failed=True)
+
+
+def _finish_query(conn, failed: bool):
+    starts = conn.info.get("metrics_query_start")
+    if not starts:
+        return
+    seconds = time.perf_counter() - starts.pop()
+    metrics.record_query(seconds, failed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += seconds
+
+
+# --- Request instrumentation ---
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request and tracking the number in flight."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics.enabled:
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(profile=metrics.profile_sample_rate > 0 and random.random() < metrics.profile_sample_rate)
+        token = _request_stats.set(stats)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.in_flight -= 1
+            seconds = time.perf_counter() - start
+            _request_stats.reset(token)
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            metrics.record_request(scope["method"], route_path, status_code, seconds, stats)
+            if stats.profiler is not None and seconds * 1000 >= metrics.slow_request_ms:
+                metrics.record_profile(scope["method"], route_path, seconds, stats.profiler)
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    """Wraps an endpoint to record its own run time and, for sampled requests, profile it."""
+    if getattr(endpoint, "_metrics_timed", False):
+        # include_router rebuilds routes with the same route class
+        return endpoint
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed_async(*args, **kwargs):
+            stats = _request_stats.get()
+            if stats is None:
+                return await endpoint(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                stats.endpoint_seconds += time.perf_counter() - start
+        timed_async._metrics_timed = True
+        return timed_async
+
+    @functools.wraps(endpoint)
+    def timed(*args, **kwargs):
+        stats = _request_stats.get()
+        if stats is None:
+            return endpoint(*args, **kwargs)
+        profiler = None
+        if stats.profile:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is active in this interpreter
+                profiler = None
+        start = time.perf_counter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            stats.endpoint_seconds += time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                # Kept by the middleware if the whole request turns out slow
+                stats.profiler = profiler
+    timed._metrics_timed = True
+    return timed
+
+
+class MetricsRoute(APIRoute):
+    """
+    Route class for the API routers. Splits each request's time into endpoint time (which
+    includes SQL, recorded by the engine hooks) and the validation and serialization FastAPI
+    does around it.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            stats = _request_stats.get()
+            if stats is None:
+                return await handler(request)
+            start = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                stats.handler_seconds = time.perf_counter() - start
+        return timed_handler
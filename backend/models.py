@@ -1,8 +1,11 @@
 from typing import Optional
+from sqlalchemy import Index, false, text, true
 from sqlmodel import Field, SQLModel, Relationship
 from datetime import datetime
 from enum import Enum
 
+from .facilities import LEGACY_FACILITY, current_facility
+
 # --- Enums ---
 class VehicleType(str, Enum):
     """Defines the types of vehicles supported by the system."""
@@ -37,11 +40,21 @@ class BillingType(str, Enum):
 
 # --- Models ---
 
+def facility_field():
+    """
+    The facility owning a row. Each facility has its own database shard, so within a shard the
+    column is constant; it is filled from the current facility on every insert (ORM and Core)
+    and lets rows be told apart once they leave their shard, e.g. in exports and aggregates.
+    Rows that predate facilities belong to "default", the facility that keeps DATABASE_URL.
+    """
+    return Field(default_factory=current_facility, max_length=50, sa_column_kwargs={"server_default": LEGACY_FACILITY})
+
 class Vehicle(SQLModel, table=True):
     """Represents a vehicle in the parking system."""
     id: Optional[int] = Field(default=None, primary_key=True)
     number_plate: str = Field(unique=True, index=True, max_length=20)
     vehicle_type: VehicleType
+    facility_id: str = facility_field()
 
 
 class ParkingSlot(SQLModel, table=True):
@@ -51,14 +64,107 @@ class ParkingSlot(SQLModel, table=True):
     slot_type: SlotType
     status: SlotStatus = SlotStatus.AVAILABLE
     has_charger: bool = Field(default=False)
+    # Position in the lot, used to find the slot nearest an entrance. Slots without coordinates rank last.
+    level: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    x: Optional[float] = None
+    y: Optional[float] = None
+    facility_id: str = facility_field()
+
+class Entrance(SQLModel, table=True):
+    """Represents a vehicle entrance (gate) of the mall, positioned in the same coordinates as the slots."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = Field(unique=True, max_length=50)
+    level: int = 0
+    x: float = 0.0
+    y: float = 0.0
 
 class ParkingSession(SQLModel, table=True):
     """Represents an active or completed parking session."""
+    __table_args__ = (
+        # Serves "active session for this plate" with a single index lookup
+        Index("ix_parkingsession_plate_status", "vehicle_number_plate", "status"),
+        # At most one active session per plate, enforced by the database so entries through
+        # different worker processes can't both succeed (enum columns store member names)
+        Index(
+            "ux_parkingsession_active_plate", "vehicle_number_plate", unique=True,
+            sqlite_where=text("status = 'ACTIVE'"), postgresql_where=text("status = 'ACTIVE'")
+        ),
+        # Serves the reconciler's "active sessions on these slots" from the index alone (reconciler.py)
+        Index("ix_parkingsession_slot_status", "slot_id", "status"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     vehicle_number_plate: str = Field(index=True, max_length=20) # Reference to Vehicle.number_plate
     slot_id: int = Field(index=True) # Reference to ParkingSlot.id
-    entry_time: datetime = Field(default_factory=datetime.now)
-    exit_time: Optional[datetime] = None
+    entry_time: datetime = Field(default_factory=datetime.now, index=True)
+    exit_time: Optional[datetime] = Field(default=None, index=True) # Indexed for the forecaster's departures per hour
     status: SessionStatus = SessionStatus.ACTIVE
     billing_type: BillingType
-    billing_amount: Optional[float] = None 
\ No newline at end of file
+    billing_amount: Optional[float] = None
+    # Set once the completed session has been counted in the hourly analytics rollups
+    rolled_up: bool = Field(default=False, sa_column_kwargs={"server_default": false()})
+    facility_id: str = facility_field()
+
+class ArchivedSession(SQLModel, table=True):
+    """
+    A completed session moved out of ParkingSession by the archiver (archive.py), keeping its id.
+    Same columns as ParkingSession, so the hot table only holds active and recent sessions.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    vehicle_number_plate: str = Field(index=True, max_length=20)
+    slot_id: int = Field(index=True)
+    entry_time: datetime = Field(index=True)
+    exit_time: Optional[datetime] = Field(default=None, index=True)
+    status: SessionStatus = SessionStatus.COMPLETED
+    billing_type: BillingType
+    billing_amount: Optional[float] = None
+    rolled_up: bool = Field(default=True, sa_column_kwargs={"server_default": true()})
+    facility_id: str = facility_field()
+
+class PlateTrigram(SQLModel, table=True):
+    """Trigram of an upper-cased number plate, used for fast substring search on plates."""
+    trigram: str = Field(primary_key=True, max_length=3)
+    number_plate: str = Field(primary_key=True, max_length=20)
+
+class HourlyRollup(SQLModel, table=True):
+    """Completed-session totals for one hour, slot type and billing type, maintained by analytics.py."""
+    hour: datetime = Field(primary_key=True)
+    slot_type: SlotType = Field(primary_key=True)
+    billing_type: BillingType = Field(primary_key=True)
+    occupancy_minutes: float = 0.0 # Minutes of this hour spent parked
+    entries: int = 0 # Sessions that entered during this hour
+    exits: int = 0 # Sessions that exited during this hour
+    revenue: float = 0.0 # Amounts billed for sessions that exited during this hour
+
+class RollupState(SQLModel, table=True):
+    """Single-row progress of the hourly rollups: when live updates began and how far the backfill got."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    live_since: datetime = Field(default_factory=datetime.now)
+    backfill_cursor: int = 0 # Highest session id examined by the backfill
+    backfilled_sessions: int = 0
+    backfill_completed_at: Optional[datetime] = None
+
+class WriteBehindState(SQLModel, table=True):
+    """Single-row watermark of the write-behind event log: the last logged event committed to the database."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    applied_seq: int = 0
+
+class StateChange(SQLModel, table=True):
+    """
+    A slot or session changed by a committed transaction, written by database triggers in
+    multi-worker mode so every worker can catch up its in-memory state (see workers.py).
+    A row with neither id set means the entrances changed and the state must be reloaded.
+    """
+    seq: Optional[int] = Field(default=None, primary_key=True)
+    slot_id: Optional[int] = None
+    session_id: Optional[int] = None
+
+class StateVersion(SQLModel, table=True):
+    """
+    Single-row count of committed changes to the slots and active sessions, bumped by database
+    triggers (see snapshot.py). A state snapshot is current while the epoch and version it was
+    taken at still match; the epoch is renewed whenever changes may have gone uncounted.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    epoch: str = Field(max_length=32)
+    version: int = 0
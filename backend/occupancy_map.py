@@ -0,0 +1,150 @@
+import base64
+import hashlib
+import secrets
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from pydantic import TypeAdapter
+from sqlmodel import Session, select
+
+from .facilities import FacilityLocal
+from .models import ParkingSlot, SlotStatus
+from .schemas import OccupancyEncoding, OccupancyLayoutResponse, OccupancyLayoutSlot, OccupancyVectorResponse
+
+# Status codes used in the vector; the order is part of the API
+STATUS_CODES = {SlotStatus.AVAILABLE: 0, SlotStatus.OCCUPIED: 1, SlotStatus.MAINTENANCE: 2}
+
+_layout_slots_adapter = TypeAdapter(List[OccupancyLayoutSlot])
+
+
+def encode_bitsets(statuses: np.ndarray) -> Tuple[str, str]:
+    """The occupied and maintenance bitsets of a status vector, base64 encoded."""
+    occupied = np.packbits(statuses == STATUS_CODES[SlotStatus.OCCUPIED])
+    maintenance = np.packbits(statuses == STATUS_CODES[SlotStatus.MAINTENANCE])
+    return base64.b64encode(occupied.tobytes()).decode(), base64.b64encode(maintenance.tobytes()).decode()
+
+
+def encode_runs(statuses: np.ndarray) -> List[int]:
+    """Run-length encoding of a status vector as [code, length, code, length, ...]."""
+    if not len(statuses):
+        return []
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(statuses)) + 1))
+    lengths = np.diff(np.concatenate((starts, [len(statuses)])))
+    runs = np.empty(2 * len(starts), dtype=np.int64)
+    runs[0::2] = statuses[starts]
+    runs[1::2] = lengths
+    return runs.tolist()
+
+
+class OccupancyMap:
+    """
+    Slot statuses as a vector indexed by slot ordinal, for grid views that only need colours.
+
+    The layout manifest lists every slot's static fields in ordinal order (by id) and is
+    versioned by a hash of its content, so a client downloads it once per layout and caches it
+    forever. Statuses live in a numpy array that committed slot changes update in place (see
+    slot_events.slot_views_changed) and are served packed, two bits or a few runs per slot
+    instead of a JSON object. Encoded vectors are cached per generation like the slot listing.
+
+    A change to a slot the map doesn't know, or to a slot's static fields, marks the layout
+    stale; it is reloaded from the database on the next request.
+    """
+
+    def __init__(self):
+        self.layout_version: Optional[str] = None
+        self.generation = 0
+        self._boot_id = secrets.token_hex(4)
+        self._stale = True
+        self._ordinals: Dict[int, int] = {}
+        self._layout: List[OccupancyLayoutSlot] = []
+        self._statuses = np.zeros(0, dtype=np.uint8)
+        self._manifest = b""
+        self._vectors: Dict[OccupancyEncoding, Tuple[int, bytes]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def etag(self) -> Optional[str]:
+        """ETag of the current vector; None while the layout is stale, so no client copy matches."""
+        if self._stale:
+            return None
+        return f'"{self._boot_id}-{self.generation}"'
+
+    def invalidate(self):
+        """Forces a reload from the database, e.g. after slots were moved in bulk."""
+        with self._lock:
+            self._stale = True
+
+    def _load(self, db: Session):
+        """Reads the layout and statuses. Called with the lock held, so changes wait for it."""
+        slots = db.exec(select(ParkingSlot).order_by(ParkingSlot.id)).all()
+        layout = _layout_slots_adapter.validate_python(slots, from_attributes=True)
+        version = hashlib.sha256(_layout_slots_adapter.dump_json(layout)).hexdigest()[:16]
+        self._layout = layout
+        self._ordinals = {slot.id: ordinal for ordinal, slot in enumerate(layout)}
+        self._statuses = np.array([STATUS_CODES[slot.status] for slot in slots], dtype=np.uint8)
+        self._manifest = OccupancyLayoutResponse(version=version, slots=layout).model_dump_json().encode()
+        self.layout_version = version
+        self.generation += 1
+        self._vectors.clear()
+        self._stale = False
+
+    def _ensure_loaded(self, db: Session):
+        if self._stale:
+            with self._lock:
+                if self._stale:
+                    self._load(db)
+
+    def update(self, slots: Iterable[ParkingSlot]):
+        """Applies committed status changes; anything that changes the layout marks it stale instead."""
+        with self._lock:
+            if self._stale:
+                return
+            for slot in slots:
+                ordinal = self._ordinals.get(slot.id)
+                if ordinal is None or OccupancyLayoutSlot.model_validate(slot) != self._layout[ordinal]:
+                    self._stale = True
+                    return
+                self._statuses[ordinal] = STATUS_CODES[slot.status]
+            self.generation += 1
+            self._vectors.clear()
+
+    def manifest(self, db: Session) -> Tuple[str, bytes]:
+        """The current layout version and its manifest body."""
+        self._ensure_loaded(db)
+        with self._lock:
+            return self.layout_version, self._manifest
+
+    def lookup(self, encoding: OccupancyEncoding) -> Optional[Tuple[bytes, str]]:
+        """Returns the cached vector body and its ETag for an encoding, or None if it must be encoded."""
+        with self._lock:
+            cached = self._vectors.get(encoding)
+            if cached and cached[0] == self.generation and not self._stale:
+                return cached[1], self.etag
+        return None
+
+    def vector(self, db: Session, encoding: OccupancyEncoding) -> Tuple[bytes, str]:
+        """The status vector body in the given encoding and its ETag."""
+        cached = self.lookup(encoding)
+        if cached:
+            return cached
+        while True:
+            self._ensure_loaded(db)
+            with self._lock:
+                if self._stale:
+                    # The layout changed again since it was loaded
+                    continue
+                response = OccupancyVectorResponse(
+                    layout_version=self.layout_version, generation=self.generation, count=len(self._statuses), encoding=encoding
+                )
+                if encoding == OccupancyEncoding.BITSET:
+                    response.occupied, response.maintenance = encode_bitsets(self._statuses)
+                else:
+                    response.runs = encode_runs(self._statuses)
+                body = response.model_dump_json(exclude_none=True).encode()
+                self._vectors[encoding] = (self.generation, body)
+                return body, self.etag
+
+
+# One instance per facility, updated by the slot mutation handlers
+occupancy_map = FacilityLocal(OccupancyMap)
@@ -0,0 +1,50 @@
+from typing import List, Set
+
+from sqlalchemy import func
+from sqlalchemy.sql import Select
+from sqlmodel import Session, select
+
+from .models import PlateTrigram, Vehicle
+
+
+def plate_trigrams(text: str) -> Set[str]:
+    """Returns the distinct trigrams of the upper-cased text."""
+    text = text.upper()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def index_plate(db: Session, number_plate: str):
+    """Adds the trigrams of a new plate to the session; committed with the caller's transaction."""
+    db.add_all(PlateTrigram(trigram=trigram, number_plate=number_plate) for trigram in plate_trigrams(number_plate))
+
+
+def backfill_plate_index(db: Session) -> int:
+    """Indexes every vehicle plate that has no trigrams yet. Returns the number of plates indexed."""
+    plates: List[str] = db.exec(
+        select(Vehicle.number_plate)
+        .outerjoin(PlateTrigram, PlateTrigram.number_plate == Vehicle.number_plate)
+        .where(PlateTrigram.trigram == None)
+        .where(func.length(Vehicle.number_plate) >= 3)
+    ).all()
+    for plate in plates:
+        index_plate(db, plate)
+    db.commit()
+    return len(plates)
+
+
+def matching_plates(search: str) -> Select:
+    """
+    Subquery of plates that may contain search (case-insensitive).
+    For searches of three or more characters it only touches the trigram index; the caller
+    still applies the ILIKE to drop plates that contain every trigram but not the substring.
+    """
+    trigrams = plate_trigrams(search)
+    if not trigrams:
+        # Too short for trigrams; scanning vehicles is still far cheaper than scanning sessions
+        return select(Vehicle.number_plate).where(Vehicle.number_plate.ilike(f"%{search}%"))
+    return (
+        select(PlateTrigram.number_plate)
+        .where(PlateTrigram.trigram.in_(trigrams))
+        .group_by(PlateTrigram.number_plate)
+        .having(func.count() == len(trigrams))
+    )
@@ -0,0 +1,321 @@
+import asyncio
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+
+from sqlalchemy import exists, not_, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from .active_sessions import ActiveSession, active_sessions
+from .analytics import record_exits
+from .billing import price_session, tariff_for
+from .entity_cache import slot_detail_cache, slot_row
+from .facilities import FACILITY_IDS, FacilityLocal
+from .models import BillingType, ParkingSession, ParkingSlot, SessionStatus, SlotStatus
+from .slot_events import sessions_changed, slots_changed
+from .write_behind import write_behind
+
+# Sessions still active after this many hours are overstays: most likely a missed exit
+OVERSTAY_HOURS = float(os.getenv("OVERSTAY_HOURS", "72"))
+
+# What happens to overstays: "flag" only lists them on /dashboard/reconciler, "close" completes
+# them, billed under the day-pass rules (one day-pass rate per started 24 hours) up to now
+OVERSTAY_ACTION = os.getenv("OVERSTAY_ACTION", "flag").lower()
+OVERSTAY_ACTIONS = ("flag", "close")
+
+# Pause between two reconciliation passes over the slot table
+RECONCILE_INTERVAL_SECONDS = float(os.getenv("RECONCILE_INTERVAL_SECONDS", "300"))
+
+# Slots checked per chunk and the pause between chunks, so entries and exits get the database in between
+RECONCILE_CHUNK_SIZE = 250
+RECONCILE_PAUSE_SECONDS = 0.05
+
+# Overstays listed on the status endpoint, oldest first; the count covers all of them
+OVERSTAYS_LISTED = 100
+
+_has_active_session = exists().where(
+    ParkingSession.slot_id == ParkingSlot.id, ParkingSession.status == SessionStatus.ACTIVE
+)
+
+
+class SessionReconciler:
+    """
+    Per-facility background check of the slot table against the active sessions, and of
+    sessions left active for days.
+
+    A pass walks the slots in id order, RECONCILE_CHUNK_SIZE at a time, comparing each chunk
+    with the active sessions on those slots. Only reads run while nothing is wrong, and reads
+    don't block writers in WAL mode. A drifted slot (occupied with no active session, or
+    available with one) is repaired by a conditional UPDATE that re-checks the sessions in the
+    same statement, so an entry or exit committing meanwhile is never undone. Slots under
+    maintenance are only counted.
+
+    Once the slots are done, the active sessions older than OVERSTAY_HOURS are picked from the
+    in-memory map and flagged or, with OVERSTAY_ACTION "close", completed.
+
+    In write-behind mode repairs and closes run inside write_behind.exclusive(), which commits
+    the logged events first, so they act on what the gates actually did.
+    """
+
+    def __init__(self):
+        if OVERSTAY_ACTION not in OVERSTAY_ACTIONS:
+            raise ValueError(f"OVERSTAY_ACTION must be one of {', '.join(OVERSTAY_ACTIONS)}")
+        self.overstay_action = OVERSTAY_ACTION
+        self.overstay_hours = OVERSTAY_HOURS
+        self.interval = RECONCILE_INTERVAL_SECONDS
+        self.chunk_size = RECONCILE_CHUNK_SIZE
+        # Progress of the current pass
+        self.cursor = 0
+        self.pass_started_at: Optional[datetime] = None
+        self.slots_checked = 0
+        # Last completed pass
+        self.passes = 0
+        self.last_pass_started_at: Optional[datetime] = None
+        self.last_pass_completed_at: Optional[datetime] = None
+        self.last_pass_seconds: Optional[float] = None
+        self.slots_in_last_pass = 0
+        self.last_chunk_ms = 0.0
+        # Findings
+        self.occupied_slots_freed = 0
+        self.available_slots_occupied = 0
+        self.maintenance_slots_in_use = 0
+        self.overstays: List[dict] = []
+        self.overstay_count = 0
+        self.overstays_closed = 0
+        self.last_error: Optional[str] = None
+        self._maintenance_in_use = 0
+        self._lock = threading.Lock()
+
+    # --- Slot drift ---
+
+    def check_chunk(self, db: Session) -> bool:
+        """Checks and repairs the next chunk of slots. Returns whether the pass reached the last slot."""
+        slots = db.exec(
+            select(ParkingSlot.id, ParkingSlot.status)
+            .where(ParkingSlot.id > self.cursor).order_by(ParkingSlot.id).limit(self.chunk_size)
+        ).all()
+        if not slots:
+            return True
+        first_id, last_id = slots[0][0], slots[-1][0]
+        in_use = set(db.exec(
+            select(ParkingSession.slot_id).where(
+                ParkingSession.status == SessionStatus.ACTIVE,
+                ParkingSession.slot_id >= first_id, ParkingSession.slot_id <= last_id
+            )
+        ).all())
+        # End the read transaction before writing, so the repair starts from a fresh snapshot
+        db.rollback()
+
+        to_free = [slot_id for slot_id, slot_status in slots if slot_status == SlotStatus.OCCUPIED and slot_id not in in_use]
+        to_occupy = [slot_id for slot_id, slot_status in slots if slot_status == SlotStatus.AVAILABLE and slot_id in in_use]
+        self._maintenance_in_use += sum(
+            1 for slot_id, slot_status in slots if slot_status == SlotStatus.MAINTENANCE and slot_id in in_use
+        )
+        if to_free or to_occupy:
+            self._repair(db, to_free, to_occupy)
+
+        self.cursor = last_id
+        self.slots_checked += len(slots)
+        return len(slots) < self.chunk_size
+
+    def _repair(self, db: Session, to_free: List[int], to_occupy: List[int]):
+        with write_behind.exclusive():
+            freed = db.exec(
+                update(ParkingSlot)
+                .where(ParkingSlot.id.in_(to_free), ParkingSlot.status == SlotStatus.OCCUPIED, not_(_has_active_session))
+                .values(status=SlotStatus.AVAILABLE)
+                .returning(ParkingSlot.id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all() if to_free else []
+            occupied = db.exec(
+                update(ParkingSlot)
+                .where(ParkingSlot.id.in_(to_occupy), ParkingSlot.status == SlotStatus.AVAILABLE, _has_active_session)
+                .values(status=SlotStatus.OCCUPIED)
+                .returning(ParkingSlot.id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all() if to_occupy else []
+            db.commit()
+            repaired = db.exec(select(ParkingSlot).where(ParkingSlot.id.in_(freed + occupied))).all()
+            if repaired:
+                slots_changed(*repaired)
+        with self._lock:
+            self.occupied_slots_freed += len(freed)
+            self.available_slots_occupied += len(occupied)
+        if freed or occupied:
+            print(f"Reconciler: freed {len(freed)} slots without an active session {freed[:10]}, "
+                  f"marked {len(occupied)} slots with an active session occupied {occupied[:10]}.")
+
+    # --- Overstays ---
+
+    def _amount_due(self, db: Session, active: ActiveSession, now: datetime) -> Optional[float]:
+        """What the session costs if it ends now, under the day-pass rules."""
+        slot = slot_detail_cache.get(db, active.slot_id)
+        if slot is None:
+            return None
+        return price_session(tariff_for(slot.slot_type), BillingType.DAY_PASS, active.entry_time, now)
+
+    def check_overstays(self, db: Session, now: datetime) -> List[dict]:
+        """Flags the active sessions older than overstay_hours, closing them if overstay_action is "close"."""
+        cutoff = now - timedelta(hours=self.overstay_hours)
+        overstaying = sorted(
+            (active for active in active_sessions.sessions() if active.entry_time < cutoff),
+            key=lambda active: active.entry_time
+        )
+        if self.overstay_action == "close" and overstaying:
+            for first in range(0, len(overstaying), self.chunk_size):
+                self.close_overstays(db, overstaying[first:first + self.chunk_size], now)
+            overstaying = []
+
+        overstays = [
+            {
+                "session_id": active.id,
+                "vehicle_number_plate": active.vehicle_number_plate,
+                "slot_id": active.slot_id,
+                "entry_time": active.entry_time,
+                "hours_parked": round((now - active.entry_time) / timedelta(hours=1), 1),
+                "billing_type": active.billing_type,
+                "amount_due": self._amount_due(db, active, now),
+            }
+            for active in overstaying[:OVERSTAYS_LISTED]
+        ]
+        with self._lock:
+            self.overstays = overstays
+            self.overstay_count = len(overstaying)
+        return overstays
+
+    def close_overstays(self, db: Session, overstaying: Sequence[ActiveSession], now: datetime) -> int:
+        """
+        Completes overstaying sessions as if they exited now, billed under the day-pass rules,
+        and frees their slots, in one transaction. Returns how many were still active to close.
+        """
+        closed, freed = [], []
+        with write_behind.exclusive():
+            for active in overstaying:
+                slot = slot_detail_cache.get(db, active.slot_id)
+                amount = price_session(tariff_for(slot.slot_type), BillingType.DAY_PASS, active.entry_time, now) if slot else None
+                result = db.exec(
+                    update(ParkingSession)
+                    .where(ParkingSession.id == active.id, ParkingSession.status == SessionStatus.ACTIVE)
+                    .values(status=SessionStatus.COMPLETED, exit_time=now, billing_amount=amount, rolled_up=True)
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount != 1:
+                    # Exited meanwhile
+                    continue
+                completed = ParkingSession(
+                    **{**active._asdict(), "billing_amount": amount}, status=SessionStatus.COMPLETED, exit_time=now
+                )
+                closed.append(completed)
+                if slot:
+                    db.exec(update(ParkingSlot).where(ParkingSlot.id == slot.id).values(status=SlotStatus.AVAILABLE))
+                    record_exits(db, [(completed, slot.slot_type)])
+                    freed.append(slot_row(slot, SlotStatus.AVAILABLE))
+            db.commit()
+            if freed:
+                slots_changed(*freed)
+            if closed:
+                sessions_changed(*closed)
+        with self._lock:
+            self.overstays_closed += len(closed)
+        if closed:
+            print(f"Reconciler: closed {len(closed)} sessions active for more than {self.overstay_hours:g} hours.")
+        return len(closed)
+
+    # --- Passes ---
+
+    def step(self, engine: Engine) -> bool:
+        """Runs one chunk of the current pass, starting a pass if none is running. Returns whether the pass finished."""
+        now = datetime.now()
+        if self.pass_started_at is None:
+            self.pass_started_at = now
+            self.cursor = 0
+            self.slots_checked = 0
+            self._maintenance_in_use = 0
+        with Session(engine) as db:
+            finished = self.check_chunk(db)
+            if finished:
+                self.check_overstays(db, datetime.now())
+        self.last_chunk_ms = (datetime.now() - now) / timedelta(milliseconds=1)
+        if finished:
+            completed_at = datetime.now()
+            with self._lock:
+                self.passes += 1
+                self.last_pass_started_at = self.pass_started_at
+                self.last_pass_completed_at = completed_at
+                self.last_pass_seconds = (completed_at - self.pass_started_at).total_seconds()
+                self.slots_in_last_pass = self.slots_checked
+                self.maintenance_slots_in_use = self._maintenance_in_use
+                self.pass_started_at = None
+        return finished
+
+    def run_pass(self, engine: Engine):
+        """Runs a whole pass synchronously, without pauses; for scripts and benchmarks."""
+        while not self.step(engine):
+            pass
+
+    def status(self) -> dict:
+        """Progress of the current pass, the last completed one and what was found."""
+        now = datetime.now()
+        with self._lock:
+            return {
+                "overstay_action": self.overstay_action,
+                "overstay_hours": self.overstay_hours,
+                "passes": self.passes,
+                "pass_running": self.pass_started_at is not None,
+                "pass_started_at": self.pass_started_at,
+                "cursor": self.cursor,
+                "slots_checked": self.slots_checked if self.pass_started_at else 0,
+                "slots_in_last_pass": self.slots_in_last_pass,
+                "last_pass_started_at": self.last_pass_started_at,
+                "last_pass_completed_at": self.last_pass_completed_at,
+                "last_pass_seconds": self.last_pass_seconds,
+                # Every slot was checked at most this long ago
+                "lag_seconds": (now - self.last_pass_started_at).total_seconds() if self.last_pass_started_at else None,
+                "last_chunk_ms": round(self.last_chunk_ms, 2),
+                "occupied_slots_freed": self.occupied_slots_freed,
+                "available_slots_occupied": self.available_slots_occupied,
+                "maintenance_slots_in_use": self.maintenance_slots_in_use,
+                "overstay_count": self.overstay_count,
+                "overstays_closed": self.overstays_closed,
+                "overstays": self.overstays,
+                "last_error": self.last_error,
+            }
+
+    async def run(self, engine: Engine):
+        """Reconciles forever, a chunk at a time. Started from the application lifespan."""
+        while True:
+            try:
+                finished = await asyncio.to_thread(self.step, engine)
+            except Exception as exc:
+                # Typically a busy database; the pass resumes from the cursor after the interval
+                self.last_error = f"{datetime.now():%Y-%m-%d %H:%M:%S} {exc}"
+                print(f"Reconciler stopped at slot {self.cursor}: {exc}")
+                finished = True
+            await asyncio.sleep(self.interval if finished else RECONCILE_PAUSE_SECONDS)
+
+
+# One instance per facility, run by the maintenance worker
+session_reconciler = FacilityLocal(SessionReconciler)
+
+
+def render_reconciler_metrics() -> str:
+    """Reconciler progress and findings of every facility in the Prometheus text format, appended to /metrics."""
+    stats = {facility_id: session_reconciler.instance(facility_id).status() for facility_id in FACILITY_IDS}
+    lines = []
+    for name, kind, help_text, field in (
+        ("parking_reconciler_passes_total", "counter", "Completed passes over the slot table.", "passes"),
+        ("parking_reconciler_lag_seconds", "gauge", "Age of the oldest slot check: since the last completed pass started.", "lag_seconds"),
+        ("parking_reconciler_last_pass_seconds", "gauge", "Duration of the last completed pass.", "last_pass_seconds"),
+        ("parking_reconciler_slots_checked", "gauge", "Slots checked so far in the running pass.", "slots_checked"),
+        ("parking_reconciler_occupied_slots_freed_total", "counter", "Occupied slots without an active session made available.", "occupied_slots_freed"),
+        ("parking_reconciler_available_slots_occupied_total", "counter", "Available slots with an active session marked occupied.", "available_slots_occupied"),
+        ("parking_reconciler_overstays", "gauge", "Sessions active for longer than the overstay limit.", "overstay_count"),
+        ("parking_reconciler_overstays_closed_total", "counter", "Overstaying sessions closed automatically.", "overstays_closed"),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for facility_id, status in stats.items():
+            value = status[field]
+            lines.append(f'{name}{{facility="{facility_id}"}} {"NaN" if value is None else value}')
+    return "\n".join(lines) + "\n"
@@ -1,65 +1,329 @@
-from fastapi import APIRouter, Depends, Query
-from sqlmodel import Session, select # <--- Removed func
-from typing import List, Optional
+import asyncio
+from datetime import datetime
 
-from ..database import get_session
-from ..models import ParkingSlot, ParkingSession, SlotStatus, SlotType, SessionStatus
-from ..schemas import DashboardSummaryResponse, ParkingSlotResponse, ParkingSessionResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select
+from typing import List, Optional, Tuple
 
-router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+from ..analytics import get_rollup_state, hourly_rollups, rollup_summary
+from ..archive import SessionModel, newest_sessions, session_tables
+from ..billing import forecast_active_sessions, reprice_completed_sessions
+from ..database import get_engine, get_session
+from ..forecast import demand_forecast
+from ..live import occupancy_stream
+from ..metrics import MetricsRoute
+from ..occupancy_map import occupancy_map
+from ..plate_search import matching_plates
+from ..reconciler import session_reconciler
+from ..row_json import MEDIA_TYPES, RowEncoder, model_columns
+from ..slot_cache import slot_listing_cache
+from ..slot_index import slot_index
+from ..summary import summary_cache
+from ..models import BillingType, SlotStatus, SlotType, SessionStatus
+from ..schemas import (
+    AnalyticsSummaryResponse, BillingReconciliationResponse, DashboardSummaryResponse, DemandForecastResponse, ExportFormat,
+    HourlyRollupResponse,
+    OccupancyEncoding, OccupancyLayoutResponse, OccupancyVectorResponse, ParkingSlotResponse, ParkingSessionResponse,
+    ReconcilerStatusResponse, RollupStatusResponse, SlotIndexCheckResponse
+)
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"], route_class=MetricsRoute)
+
+# Session listing page sizes and the batch size used when streaming exports
+SESSION_PAGE_SIZE = 100
+SESSION_PAGE_SIZE_MAX = 1000
+EXPORT_BATCH_SIZE = 1000
+
+session_encoder = RowEncoder(ParkingSessionResponse)
 
 @router.get("/summary", response_model=DashboardSummaryResponse)
-async def get_dashboard_summary(db: Session = Depends(get_session)):
+def get_dashboard_summary(db: Session = Depends(get_session)):
     """
-    Returns a summary of parking slot counts (total, available, occupied, maintenance).
+    Returns a summary of parking slot counts (total, available, occupied, maintenance),
+    overall and per slot type. Served from a short-TTL cache shared by all pollers.
     """
-    # Corrected way to get counts from SQLModel/SQLAlchemy results
-    total_slots = len(db.exec(select(ParkingSlot)).all())
-    available_slots = len(db.exec(select(ParkingSlot).where(ParkingSlot.status == SlotStatus.AVAILABLE)).all())
-    occupied_slots = len(db.exec(select(ParkingSlot).where(ParkingSlot.status == SlotStatus.OCCUPIED)).all())
-    maintenance_slots = len(db.exec(select(ParkingSlot).where(ParkingSlot.status == SlotStatus.MAINTENANCE)).all())
-
-    return DashboardSummaryResponse(
-        total_slots=total_slots,
-        available_slots=available_slots,
-        occupied_slots=occupied_slots,
-        maintenance_slots=maintenance_slots
-    )
+    return summary_cache.get(db)
 
 @router.get("/slots", response_model=List[ParkingSlotResponse])
 async def get_all_slots(
+    request: Request,
     slot_type: Optional[SlotType] = Query(None, description="Filter by slot type"),
     status: Optional[SlotStatus] = Query(None, description="Filter by slot status"),
+    format: ExportFormat = Query(ExportFormat.JSON, description="json, columnar (one array per field), ndjson or csv"),
     db: Session = Depends(get_session)
 ):
     """
     Returns a list of all parking slots, with optional filters.
+    Served from pre-serialized bodies that are rebuilt only after a slot changes. Responses carry
+    an ETag; sending it back in If-None-Match returns 304 Not Modified while nothing changed.
+    """
+    headers = {"Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), slot_listing_cache.etag):
+        return Response(status_code=304, headers={**headers, "ETag": slot_listing_cache.etag})
+
+    cached = slot_listing_cache.lookup(slot_type, status, format)
+    if cached is None:
+        cached = await run_in_threadpool(slot_listing_cache.get, db, slot_type, status, format)
+    body, etag = cached
+    return Response(content=body, media_type=MEDIA_TYPES[format], headers={**headers, "ETag": etag})
+
+@router.get("/occupancy/layout", response_model=OccupancyLayoutResponse)
+async def get_occupancy_layout(request: Request, db: Session = Depends(get_session)):
+    """
+    Returns the slot layout manifest: every slot's static fields in ordinal order, which is the
+    order of the /dashboard/occupancy status vector. Its version is a hash of the content; the
+    same manifest is served forever-cacheable at /dashboard/occupancy/layout/{version}.
+    """
+    version, body = await run_in_threadpool(occupancy_map.manifest, db)
+    etag = f'"{version}"'
+    headers = {"Cache-Control": "no-cache", "ETag": etag}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/occupancy/layout/{version}", response_model=OccupancyLayoutResponse)
+async def get_occupancy_layout_version(version: str, db: Session = Depends(get_session)):
+    """
+    Returns the layout manifest with the given version. A version never changes content, so the
+    response may be cached forever; versions other than the current one are gone (404).
+    """
+    current_version, body = await run_in_threadpool(occupancy_map.manifest, db)
+    if version != current_version:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Layout version '{version}' is not current; fetch /dashboard/occupancy/layout."
+        )
+    return Response(content=body, media_type="application/json", headers={
+        "Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{version}"'
+    })
+
+@router.get("/occupancy", response_model=OccupancyVectorResponse)
+async def get_occupancy(
+    request: Request,
+    encoding: OccupancyEncoding = Query(OccupancyEncoding.BITSET, description="bitset (2 bits per slot) or rle (runs of equal status)"),
+    db: Session = Depends(get_session)
+):
     """
-    query = select(ParkingSlot)
-    if slot_type:
-        query = query.where(ParkingSlot.slot_type == slot_type)
-    if status:
-        query = query.where(ParkingSlot.status == status)
+    Returns the status of every slot as a packed vector indexed by slot ordinal, for grid views.
+    Fetch the layout manifest named by layout_version once to map ordinals to slots, and again
+    only when layout_version changes. Responses carry an ETag for If-None-Match polling.
+    """
+    headers = {"Cache-Control": "no-cache"}
+    etag = occupancy_map.etag
+    if etag and _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={**headers, "ETag": etag})
+
+    cached = occupancy_map.lookup(encoding)
+    if cached is None:
+        cached = await run_in_threadpool(occupancy_map.vector, db, encoding)
+    body, etag = cached
+    return Response(content=body, media_type="application/json", headers={**headers, "ETag": etag})
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def _session_queries(
+    status: Optional[SessionStatus],
+    number_plate: Optional[str],
+    entered_after: Optional[datetime],
+    entered_before: Optional[datetime]
+) -> List[Tuple[SessionModel, object]]:
+    """
+    The filtered query for each session table that can match: the hot table and the archive.
+    The queries select the columns of session_encoder as plain tuples.
+    """
+    queries = []
+    for model in session_tables(status):
+        query = select(*model_columns(model, session_encoder))
+        if status:
+            query = query.where(model.status == status)
+        if number_plate:
+            # Case-insensitive substring search, narrowed through the plate trigram index first
+            query = query.where(
+                model.vehicle_number_plate.in_(matching_plates(number_plate)),
+                model.vehicle_number_plate.ilike(f"%{number_plate}%")
+            )
+        if entered_after:
+            query = query.where(model.entry_time >= entered_after)
+        if entered_before:
+            query = query.where(model.entry_time < entered_before)
+        queries.append((model, query))
+    return queries
 
-    slots = db.exec(query).all()
-    return slots
+def _export_sessions(queries: List[Tuple[SessionModel, object]], export_format: ExportFormat):
+    """Yields the matching sessions newest first, reading EXPORT_BATCH_SIZE rows per table and query."""
+    with Session(get_engine()) as session:
+        if export_format == ExportFormat.CSV:
+            yield ",".join(session_encoder.columns) + "\n"
+        cursor = None
+        while True:
+            rows = newest_sessions(session, queries, cursor, EXPORT_BATCH_SIZE)
+            if not rows:
+                return
+            if export_format == ExportFormat.CSV:
+                yield session_encoder.csv(rows)
+            else:
+                yield session_encoder.ndjson(rows)
+            cursor = rows[-1].id
 
 @router.get("/sessions", response_model=List[ParkingSessionResponse])
-async def get_all_sessions(
+def get_all_sessions(
     status: Optional[SessionStatus] = Query(None, description="Filter by session status"),
     number_plate: Optional[str] = Query(None, description="Search by vehicle number plate"),
+    entered_after: Optional[datetime] = Query(None, description="Only sessions that entered at or after this time"),
+    entered_before: Optional[datetime] = Query(None, description="Only sessions that entered before this time"),
+    cursor: Optional[int] = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: int = Query(SESSION_PAGE_SIZE, ge=1, le=SESSION_PAGE_SIZE_MAX, description="Page size"),
+    format: ExportFormat = Query(ExportFormat.JSON, description="json or columnar for a page, ndjson or csv to stream every match"),
+    db: Session = Depends(get_session)
+):
+    """
+    Returns parking sessions newest first, with optional filters and search, from both the
+    live table and the archive of older completed sessions.
+    JSON and columnar responses are paginated by keyset on the session id: when more sessions
+    remain, the X-Next-Cursor header holds the cursor for the next page. The ndjson and csv
+    formats stream every matching session in batches and ignore cursor and limit.
+    Rows are read as column tuples and encoded directly, without ORM objects or response models.
+    """
+    queries = _session_queries(status, number_plate, entered_after, entered_before)
+
+    if format in (ExportFormat.NDJSON, ExportFormat.CSV):
+        return StreamingResponse(
+            _export_sessions(queries, format),
+            media_type=MEDIA_TYPES[format],
+            headers={"Content-Disposition": f"attachment; filename=sessions.{format.value}"}
+        )
+
+    sessions = newest_sessions(db, queries, cursor, limit)
+    headers = {}
+    if len(sessions) == limit:
+        headers["X-Next-Cursor"] = str(sessions[-1].id)
+    return Response(content=session_encoder.encode(sessions, format), media_type=MEDIA_TYPES[format], headers=headers)
+
+@router.get("/billing/reprice", response_model=BillingReconciliationResponse)
+def reprice_sessions(
+    exited_after: Optional[datetime] = Query(None, description="Only sessions that exited at or after this time"),
+    exited_before: Optional[datetime] = Query(None, description="Only sessions that exited before this time"),
+    db: Session = Depends(get_session)
+):
+    """
+    Re-prices completed sessions under the current tariff plans, e.g. for end-of-month
+    reconciliation, and compares the result with the amounts that were billed.
+    """
+    return reprice_completed_sessions(db, exited_after, exited_before)
+
+@router.get("/billing/forecast", response_model=BillingReconciliationResponse)
+def forecast_revenue(
+    as_of: Optional[datetime] = Query(None, description="Price active sessions as if they exited at this time, defaulting to now"),
     db: Session = Depends(get_session)
 ):
     """
-    Returns a list of parking sessions, with optional filters and search.
+    Prices every active session as if it exited at as_of.
+    billed_amount is what was already collected at entry (day passes).
+    """
+    return forecast_active_sessions(db, as_of or datetime.now())
+
+@router.get("/analytics/hourly", response_model=List[HourlyRollupResponse])
+def get_hourly_analytics(
+    start: datetime = Query(..., description="First hour to include"),
+    end: datetime = Query(..., description="Include hours before this time"),
+    slot_type: Optional[SlotType] = Query(None, description="Filter by slot type"),
+    billing_type: Optional[BillingType] = Query(None, description="Filter by billing type"),
+    db: Session = Depends(get_session)
+):
+    """
+    Returns hourly occupancy minutes, entries, exits and revenue per slot type and billing type,
+    read from the precomputed rollups. Only completed sessions are counted.
+    """
+    return hourly_rollups(db, start, end, slot_type, billing_type)
+
+@router.get("/analytics/summary", response_model=AnalyticsSummaryResponse)
+def get_analytics_summary(
+    start: datetime = Query(..., description="First hour to include"),
+    end: datetime = Query(..., description="Include hours before this time"),
+    db: Session = Depends(get_session)
+):
+    """
+    Returns rollup totals for a time range, e.g. a month, overall and per slot type and billing type.
+    """
+    return rollup_summary(db, start, end)
+
+@router.get("/analytics/status", response_model=RollupStatusResponse)
+def get_analytics_status(db: Session = Depends(get_session)):
+    """
+    Returns when live rollups started and how far the backfill of older sessions has got.
+    """
+    return get_rollup_state(db)
+
+@router.get("/forecast", response_model=DemandForecastResponse)
+def get_demand_forecast():
+    """
+    Returns the expected arrivals and departures per vehicle type for the next hours, the free
+    slots each vehicle type has reserved to cover them, and warnings for types expected to run out.
+    Computed from the in-memory model, which a background task keeps learning from the sessions.
+    """
+    return demand_forecast.plan(datetime.now())
+
+@router.get("/slot-index/check", response_model=SlotIndexCheckResponse)
+def check_slot_index(db: Session = Depends(get_session)):
+    """
+    Compares the in-memory free-slot index against the AVAILABLE slots in the database.
     """
-    query = select(ParkingSession)
-    if status:
-        query = query.where(ParkingSession.status == status)
-    if number_plate:
-        # Case-insensitive search
-        query = query.where(ParkingSession.vehicle_number_plate.ilike(f"%{number_plate}%"))
+    return slot_index.check_consistency(db)
 
-    sessions = db.exec(query).all()
-    return sessions
+@router.get("/reconciler", response_model=ReconcilerStatusResponse)
+def get_reconciler_status():
+    """
+    Returns the progress of the background reconciler: how far the current pass over the slots
+    got, how stale the oldest check is, the drifted slots it repaired and the sessions active
+    for longer than the overstay limit, oldest first. Only the maintenance worker runs it.
+    """
+    return session_reconciler.status()
+
+def _build_snapshot() -> dict:
+    with Session(get_engine()) as session:
+        return occupancy_stream.snapshot(session)
+
+@router.websocket("/stream")
+async def stream_occupancy(
+    websocket: WebSocket,
+    since: Optional[int] = Query(None, description="Last sequence number received, to resume without a snapshot")
+):
+    """
+    Pushes live slot status changes.
+    Sends a snapshot frame (all slots and summary) unless the client can resume from `since`,
+    followed by coalesced delta frames with increasing sequence numbers.
+    """
+    await websocket.accept()
+    queue = occupancy_stream.subscribe()
+    try:
+        frames = occupancy_stream.frames_since(since) if since is not None else None
+        if frames is None:
+            snapshot = await asyncio.to_thread(_build_snapshot)
+            last_seq = snapshot["seq"]
+            await websocket.send_json(snapshot)
+        else:
+            last_seq = since
+            for frame in frames:
+                await websocket.send_json(frame)
+                last_seq = frame["seq"]
 
+        while True:
+            frame = await queue.get()
+            if frame is None:
+                # Dropped for falling behind; the client reconnects with its last seq
+                await websocket.close(code=1013)
+                return
+            if frame["seq"] <= last_seq:
+                continue
+            await websocket.send_json(frame)
+            last_seq = frame["seq"]
+    except WebSocketDisconnect:
+        pass
+    finally:
+        occupancy_stream.unsubscribe(queue)
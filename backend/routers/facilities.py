@@ -0,0 +1,86 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Query
+from sqlmodel import Session
+
+from ..analytics import rollup_summary
+from ..database import get_engine
+from ..facilities import DEFAULT_FACILITY, FACILITY_IDS, for_each_facility
+from ..metrics import MetricsRoute
+from ..models import SlotType
+from ..schemas import (
+    AnalyticsTotals, CrossFacilityAnalyticsResponse, CrossFacilitySummaryResponse, DashboardSummaryResponse,
+    FacilityListResponse, SlotTypeSummary
+)
+from ..summary import summary_cache
+
+# Per-facility routes are the regular routers under /facilities/<id> (see FacilityMiddleware);
+# this router only holds the views that span every facility.
+router = APIRouter(prefix="/facilities", tags=["Facilities"], route_class=MetricsRoute)
+
+def _facility_summary() -> DashboardSummaryResponse:
+    with Session(get_engine()) as session:
+        return summary_cache.get(session)
+
+def _facility_analytics(start: datetime, end: datetime) -> dict:
+    with Session(get_engine()) as session:
+        return rollup_summary(session, start, end)
+
+def _add_totals(into: AnalyticsTotals, totals: dict):
+    into.occupancy_minutes += totals["occupancy_minutes"]
+    into.entries += totals["entries"]
+    into.exits += totals["exits"]
+    into.revenue += totals["revenue"]
+
+@router.get("", response_model=FacilityListResponse)
+def get_facilities():
+    """
+    Lists the facilities served by this process. Address one with a /facilities/<id> path prefix
+    (e.g. /facilities/mall-a/vehicles/entry) or an X-Facility-Id header; requests with neither
+    go to the default facility.
+    """
+    return FacilityListResponse(default_facility=DEFAULT_FACILITY, facilities=FACILITY_IDS)
+
+@router.get("/summary", response_model=CrossFacilitySummaryResponse)
+async def get_cross_facility_summary():
+    """
+    Returns the dashboard slot counts of every facility and their sum, reading the facility
+    shards in parallel. Each facility's counts come from its own summary cache.
+    """
+    by_facility = await for_each_facility(_facility_summary)
+    by_slot_type = {slot_type: SlotTypeSummary() for slot_type in SlotType}
+    for summary in by_facility.values():
+        for slot_type, counts in summary.by_slot_type.items():
+            total = by_slot_type[slot_type]
+            total.total += counts.total
+            total.available += counts.available
+            total.occupied += counts.occupied
+            total.maintenance += counts.maintenance
+    return CrossFacilitySummaryResponse(
+        total_slots=sum(summary.total_slots for summary in by_facility.values()),
+        available_slots=sum(summary.available_slots for summary in by_facility.values()),
+        occupied_slots=sum(summary.occupied_slots for summary in by_facility.values()),
+        maintenance_slots=sum(summary.maintenance_slots for summary in by_facility.values()),
+        by_slot_type=by_slot_type,
+        by_facility=by_facility
+    )
+
+@router.get("/analytics/summary", response_model=CrossFacilityAnalyticsResponse)
+async def get_cross_facility_analytics(
+    start: datetime = Query(..., description="First hour to include"),
+    end: datetime = Query(..., description="Include hours before this time"),
+):
+    """
+    Returns rollup totals for a time range summed over every facility, overall, per slot type,
+    per billing type and per facility, reading the facility shards in parallel.
+    """
+    by_facility = await for_each_facility(_facility_analytics, start, end)
+    response = CrossFacilityAnalyticsResponse(start=start, end=end, totals=AnalyticsTotals())
+    for facility_id, summary in by_facility.items():
+        _add_totals(response.totals, summary["totals"])
+        for slot_type, totals in summary["by_slot_type"].items():
+            _add_totals(response.by_slot_type.setdefault(slot_type, AnalyticsTotals()), totals)
+        for billing_type, totals in summary["by_billing_type"].items():
+            _add_totals(response.by_billing_type.setdefault(billing_type, AnalyticsTotals()), totals)
+        response.by_facility[facility_id] = AnalyticsTotals(**summary["totals"])
+    return response
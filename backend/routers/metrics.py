@@ -0,0 +1,60 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from typing import List
+
+from ..entity_cache import cache_stats, render_cache_metrics
+from ..metrics import metrics
+from ..reconciler import render_reconciler_metrics
+from ..schemas import EntityCacheStatsResponse, MetricsSettings, SlowRequestProfileResponse
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Returns request latency, queries per request, DB vs serialization time and in-flight
+    requests in the Prometheus text format. Empty series while collection is off, except the
+    vehicle and slot cache counters and the reconciler's progress, which are always kept.
+    """
+    return PlainTextResponse(
+        metrics.render() + render_cache_metrics() + render_reconciler_metrics(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+@router.get("/settings", response_model=MetricsSettings)
+def get_metrics_settings():
+    """
+    Returns whether metrics are collected and how the slow-request profiler samples.
+    """
+    return MetricsSettings(
+        enabled=metrics.enabled,
+        profile_sample_rate=metrics.profile_sample_rate,
+        slow_request_ms=metrics.slow_request_ms
+    )
+
+@router.put("/settings", response_model=MetricsSettings)
+def update_metrics_settings(settings: MetricsSettings):
+    """
+    Turns metrics collection on or off and sets the profiler's sample rate and slow-request
+    threshold, without a restart. The profiler only runs while collection is on.
+    """
+    metrics.enabled = settings.enabled
+    metrics.profile_sample_rate = settings.profile_sample_rate
+    metrics.slow_request_ms = settings.slow_request_ms
+    return settings
+
+@router.get("/caches", response_model=List[EntityCacheStatsResponse])
+def get_cache_stats():
+    """
+    Returns the size, hits, misses, evictions and hit rate of the vehicle and slot caches of
+    every facility served by this process.
+    """
+    return cache_stats()
+
+@router.get("/slow-requests", response_model=List[SlowRequestProfileResponse])
+def get_slow_requests():
+    """
+    Returns the most recent cProfile captures of sampled requests that exceeded the
+    slow-request threshold, newest first.
+    """
+    return list(reversed(metrics.slow_requests))
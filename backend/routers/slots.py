@@ -1,15 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
-from typing import List
+from typing import List, Union
 
 from ..database import get_session
-from ..models import ParkingSlot, SlotStatus, ParkingSession, SessionStatus
-from ..schemas import SlotStatusUpdateRequest, ParkingSlotResponse, SlotCreateRequest
+from ..entity_cache import slot_detail_cache
+from ..layout import LayoutSlot, expand_layout, provision_entrances, provision_slots
+from ..metrics import MetricsRoute
+from ..occupancy_map import occupancy_map
+from ..slot_cache import slot_listing_cache
+from ..slot_events import slots_changed
+from ..slot_index import slot_index
+from ..write_behind import write_behind
+from ..models import Entrance, ParkingSlot, SlotStatus, ParkingSession, SessionStatus
+from ..schemas import (
+    MAX_BULK_SLOTS, EntranceResponse, SlotBulkCreateRequest, SlotBulkCreateResponse, SlotStatusUpdateRequest,
+    ParkingSlotResponse, SlotCreateRequest
+)
 
-router = APIRouter(prefix="/slots", tags=["Parking Slots"])
+router = APIRouter(prefix="/slots", tags=["Parking Slots"], route_class=MetricsRoute)
 
 @router.post("/",response_model=ParkingSlotResponse, status_code=status.HTTP_201_CREATED)
-async def create_parking_slot(
+def create_parking_slot(
     request: SlotCreateRequest,
     db: Session = Depends(get_session)
 ):
@@ -17,11 +29,7 @@ async def create_parking_slot(
     Creates a new parking slot.
     """
     # Check if a slot with the same slot_number already exists
-    existing_slot = db.exec(
-        select(ParkingSlot).where(ParkingSlot.slot_number == request.slot_number)
-    ).first()
-
-    if existing_slot:
+    if slot_detail_cache.find_number(db, request.slot_number):
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=f"Parking slot with number '{request.slot_number}' already exists."
@@ -31,15 +39,87 @@ async def create_parking_slot(
         slot_number=request.slot_number,
         slot_type=request.slot_type,
         has_charger=request.has_charger,
-        status=SlotStatus.AVAILABLE # New slots are always available by default
+        status=SlotStatus.AVAILABLE, # New slots are always available by default
+        level=request.level,
+        x=request.x,
+        y=request.y
     )
     db.add(new_slot)
     db.commit()
     db.refresh(new_slot)
+    slots_changed(new_slot)
     return new_slot
 
+@router.post("/bulk", response_model=SlotBulkCreateResponse, status_code=status.HTTP_201_CREATED)
+def create_parking_slots_bulk(
+    request: SlotBulkCreateRequest,
+    db: Session = Depends(get_session)
+):
+    """
+    Creates many parking slots at once from a list of slots and/or a layout spec.
+    Idempotent: slot numbers that already exist are skipped rather than rejected.
+    """
+    try:
+        slots = request.slots + (expand_layout(request.layout) if request.layout else [])
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if len(slots) > MAX_BULK_SLOTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A bulk request may create at most {MAX_BULK_SLOTS} slots, got {len(slots)}."
+        )
+
+    # The allocator's heaps may be rebuilt from the database below, so commit pending entries first
+    with write_behind.exclusive():
+        return _create_parking_slots_bulk(request, slots, db)
+
+def _create_parking_slots_bulk(
+    request: SlotBulkCreateRequest, slots: List[Union[SlotCreateRequest, LayoutSlot]], db: Session
+) -> SlotBulkCreateResponse:
+    try:
+        result = provision_slots(db, slots)
+        entrances_created = provision_entrances(db, request.layout.entrances) if request.layout else 0
+        db.commit()
+    except IntegrityError:
+        # Another request created some of the same slot numbers first
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Some of the slots were created concurrently by another request; retry to create the rest."
+        )
+    if result.located or entrances_created:
+        # Distances from the entrances changed, so rebuild the allocator's heaps
+        slot_index.load(db)
+        slot_detail_cache.clear()
+        slot_listing_cache.invalidate()
+        occupancy_map.invalidate()
+
+    created = []
+    if result.created_ids:
+        # Read the new rows back with one range query; concurrent inserts in the range are filtered out
+        created_ids = result.created_ids
+        wanted = set(created_ids)
+        created = [
+            slot for slot in db.exec(
+                select(ParkingSlot).where(ParkingSlot.id.between(min(created_ids), max(created_ids))).order_by(ParkingSlot.id)
+            ).all()
+            if slot.id in wanted
+        ]
+        slots_changed(*created)
+    return SlotBulkCreateResponse(
+        created=len(created), skipped=result.skipped, entrances_created=entrances_created, slots=created
+    )
+
+@router.get("/entrances", response_model=List[EntranceResponse])
+def get_entrances(db: Session = Depends(get_session)):
+    """
+    Returns the entrances of the lot. Pass an entrance id to /vehicles/entry or
+    /vehicles/suggest-slot to be assigned the slot nearest that entrance.
+    """
+    return db.exec(select(Entrance).order_by(Entrance.id)).all()
+
 @router.put("/{slot_id}/status", response_model=ParkingSlotResponse)
-async def update_slot_status(
+def update_slot_status(
     slot_id: int,
     request: SlotStatusUpdateRequest,
     db: Session = Depends(get_session)
@@ -48,6 +128,10 @@ async def update_slot_status(
     Updates the status of a parking slot (e.g., to Maintenance or Available).
     Prevents setting an occupied slot to available if an active session exists.
     """
+    with write_behind.exclusive():
+        return _update_slot_status(slot_id, request, db)
+
+def _update_slot_status(slot_id: int, request: SlotStatusUpdateRequest, db: Session) -> ParkingSlot:
     slot = db.exec(select(ParkingSlot).where(ParkingSlot.id == slot_id)).first()
 
     if not slot:
@@ -74,5 +158,6 @@ async def update_slot_status(
     db.add(slot)
     db.commit()
     db.refresh(slot)
+    slots_changed(slot)
 
     return slot
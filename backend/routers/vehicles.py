@@ -1,31 +1,54 @@
+import threading
+from contextlib import ExitStack, contextmanager
+
+import numpy as np
+
 from fastapi import APIRouter, Depends, HTTPException, status, Query 
-from sqlmodel import Session, select
-from datetime import datetime, timedelta
-from typing import List, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, update
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
+from ..active_sessions import active_sessions
+from ..analytics import record_exits
+from ..billing import FALLBACK_SLOT_TYPE, price_batch, price_session, tariff_for
 from ..database import get_session
+from ..entity_cache import CachedVehicle, slot_detail_cache, slot_row, vehicle_cache
+from ..forecast import demand_forecast
+from ..metrics import MetricsRoute
+from ..plate_search import index_plate
+from ..slot_events import sessions_changed, slots_changed
+from ..slot_index import COMPATIBLE_SLOT_TYPES, IndexedSlot, slot_index
+from ..write_behind import write_behind
 from ..models import Vehicle, ParkingSlot, ParkingSession, VehicleType, SlotType, SlotStatus, BillingType, SessionStatus
-from ..schemas import VehicleEntryRequest, VehicleEntryResponse, VehicleExitResponse, ParkingSlotResponse 
+from ..schemas import (
+    BatchItemResult, BatchResponse, ParkingSlotResponse, VehicleEntryBatchItem, VehicleEntryBatchRequest,
+    VehicleEntryRequest, VehicleEntryResponse, VehicleExitBatchRequest, VehicleExitResponse
+)
 
-router = APIRouter(prefix="/vehicles", tags=["Vehicles"])
+router = APIRouter(prefix="/vehicles", tags=["Vehicles"], route_class=MetricsRoute)
 
-# Define parking rates
-HOURLY_RATE_FIRST_HOUR = 50.0  # Example: 50 INR for the first hour
-HOURLY_RATE_SUBSEQUENT = 30.0 # Example: 30 INR for subsequent hours
-DAY_PASS_RATE = 200.0         # Example: 200 INR for a day pass
+# Striped locks serializing entries per number plate
+PLATE_LOCK_STRIPES = 64
+_plate_locks = [threading.Lock() for _ in range(PLATE_LOCK_STRIPES)]
 
 # Helper functions for slot assignment 
 def _get_compatible_slot_types(vehicle_type: VehicleType) -> List[SlotType]:
     """Returns a prioritized list of compatible slot types for a given vehicle type."""
-    if vehicle_type == VehicleType.CAR:
-        return [SlotType.REGULAR, SlotType.COMPACT]
-    elif vehicle_type == VehicleType.BIKE:
-        return [SlotType.BIKE]
-    elif vehicle_type == VehicleType.EV:
-        return [SlotType.EV, SlotType.REGULAR, SlotType.COMPACT] # EV can use regular/compact if EV slot with charger isn't available
-    elif vehicle_type == VehicleType.HANDICAP:
-        return [SlotType.HANDICAP, SlotType.REGULAR, SlotType.COMPACT] # Handicap can use regular/compact if accessible isn't available
-    return []
+    return list(COMPATIBLE_SLOT_TYPES.get(vehicle_type, []))
+
+def _slot_type_order(vehicle_type: VehicleType) -> List[SlotType]:
+    """Compatible slot types in the order to try them, steering clear of slots the forecast reserves for other vehicle types."""
+    return demand_forecast.slot_type_order(vehicle_type, _get_compatible_slot_types(vehicle_type))
+
+def _claim_from_index(vehicle_type: VehicleType, entrance_id: Optional[int]) -> Optional[IndexedSlot]:
+    """Claims the nearest suitable free slot from the index and counts it against the vehicle type's reserve."""
+    candidate = slot_index.claim(
+        _slot_type_order(vehicle_type), require_charger=vehicle_type == VehicleType.EV, entrance_id=entrance_id
+    )
+    if candidate:
+        demand_forecast.consume(vehicle_type, candidate.slot_type)
+    return candidate
 
 def _is_slot_compatible(vehicle_type: VehicleType, slot_type: SlotType, has_charger: bool) -> bool:
     """Checks if a given slot type is compatible with a vehicle type."""
@@ -44,47 +67,73 @@ def _is_slot_compatible(vehicle_type: VehicleType, slot_type: SlotType, has_char
 @router.get("/suggest-slot", response_model=Optional[ParkingSlotResponse]) 
 async def suggest_parking_slot(
     vehicle_type: VehicleType = Query(..., description="Type of vehicle to find a slot for."),
-    db: Session = Depends(get_session)
+    entrance_id: Optional[int] = Query(None, description="Entrance the vehicle is at; defaults to slot number order.")
 ):
     """
     Suggests the nearest available parking slot based on vehicle type without reserving it.
     Returns None if no suitable slot is found.
     """
-    compatible_slot_types = _get_compatible_slot_types(vehicle_type)
-    
-    suggested_slot: Optional[ParkingSlot] = None
+    _check_entrance(entrance_id)
+    suggested_slot = slot_index.find(
+        _slot_type_order(vehicle_type),
+        require_charger=vehicle_type == VehicleType.EV,
+        entrance_id=entrance_id
+    )
+    if not suggested_slot:
+        return None
+
+    return ParkingSlotResponse(status=SlotStatus.AVAILABLE, **suggested_slot._asdict())
+
 
-    # Prioritize specific slot types first
-    for slot_type in compatible_slot_types:
-        query = select(ParkingSlot).where(
-            ParkingSlot.slot_type == slot_type,
-            ParkingSlot.status == SlotStatus.AVAILABLE
+def _check_entrance(entrance_id: Optional[int]):
+    if entrance_id is not None and not slot_index.has_entrance(entrance_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Entrance ID {entrance_id} does not exist."
         )
-        # Special handling for EV slots with chargers
-        if vehicle_type == VehicleType.EV:
-            query = query.where(ParkingSlot.has_charger == True)
 
-        suggested_slot = db.exec(query).first() # Simple first available
-        if suggested_slot:
-            break
-    
-    return suggested_slot # Returns None if no slot found, or ParkingSlotResponse if found
+def _claim_slot(db: Session, slot_id: int) -> bool:
+    """
+    Flips a slot from AVAILABLE to OCCUPIED with a conditional UPDATE inside the current
+    transaction. Returns False if the slot was not available, e.g. another gate took it first.
+    """
+    result = db.exec(
+        update(ParkingSlot)
+        .where(ParkingSlot.id == slot_id, ParkingSlot.status == SlotStatus.AVAILABLE)
+        .values(status=SlotStatus.OCCUPIED)
+    )
+    return result.rowcount == 1
 
+def _find_or_create_vehicle(db: Session, number_plate: str, vehicle_type: VehicleType) -> Optional[CachedVehicle]:
+    vehicle = vehicle_cache.get(db, number_plate)
+    if vehicle:
+        return vehicle
+    try:
+        new_vehicle = Vehicle(number_plate=number_plate, vehicle_type=vehicle_type)
+        db.add(new_vehicle)
+        index_plate(db, number_plate)
+        db.commit()
+    except IntegrityError:
+        # Created concurrently by another request
+        db.rollback()
+        return vehicle_cache.get(db, number_plate)
+    return vehicle_cache.add(new_vehicle)
 
 @router.post("/entry", response_model=VehicleEntryResponse, status_code=status.HTTP_201_CREATED)
-async def vehicle_entry(request: VehicleEntryRequest, db: Session = Depends(get_session)):
+def vehicle_entry(request: VehicleEntryRequest, db: Session = Depends(get_session)):
     """
     Handles vehicle entry, auto-assigns a slot, or allows manual override.
     Creates a new Vehicle record if the number plate is new.
     Creates an active ParkingSession.
+    Runs in the threadpool; slots are claimed atomically so parallel gates never share one.
     """
+    # Entries for the same plate are serialized so the active-session check below can't race
+    with _plate_locks[hash(request.number_plate) % PLATE_LOCK_STRIPES]:
+        return _vehicle_entry(request, db)
+
+def _vehicle_entry(request: VehicleEntryRequest, db: Session) -> VehicleEntryResponse:
     # 1. Check for existing active session for the number plate
-    existing_active_session = db.exec(
-        select(ParkingSession).where(
-            ParkingSession.vehicle_number_plate == request.number_plate,
-            ParkingSession.status == SessionStatus.ACTIVE
-        )
-    ).first()
+    existing_active_session = active_sessions.get(request.number_plate)
 
     if existing_active_session:
         raise HTTPException(
@@ -92,25 +141,20 @@ async def vehicle_entry(request: VehicleEntryRequest, db: Session = Depends(get_
             detail=f"Vehicle with number plate '{request.number_plate}' already has an active session (Session ID: {existing_active_session.id})."
         )
 
+    _check_entrance(request.entrance_id)
+
+    if write_behind.enabled:
+        return _vehicle_entry_write_behind(request)
+
     # 2. Find or create Vehicle record
-    vehicle = db.exec(select(Vehicle).where(Vehicle.number_plate == request.number_plate)).first()
-    if not vehicle:
-        vehicle = Vehicle(number_plate=request.number_plate, vehicle_type=request.vehicle_type)
-        db.add(vehicle)
-        db.commit()
-        db.refresh(vehicle)
+    _find_or_create_vehicle(db, request.number_plate, request.vehicle_type)
 
-    # 3. Determine slot assignment
-    assigned_slot: Optional[ParkingSlot] = None
+    # 3. Determine slot assignment and claim it
+    claimed_from_index = None
 
     if request.slot_id:
-        # Manual override
-        assigned_slot = db.exec(
-            select(ParkingSlot).where(
-                ParkingSlot.id == request.slot_id,
-                ParkingSlot.status == SlotStatus.AVAILABLE
-            )
-        ).first()
+        # Manual override. Availability is decided by the claim below, so the slot's columns can come from the cache.
+        assigned_slot = slot_detail_cache.get(db, request.slot_id)
         if not assigned_slot:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -122,49 +166,66 @@ async def vehicle_entry(request: VehicleEntryRequest, db: Session = Depends(get_
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Manual slot ID {request.slot_id} is not compatible with vehicle type {request.vehicle_type.value}."
             )
-    else:
-        # Auto-assignment (reusing the same logic as suggest-slot)
-        compatible_slot_types = _get_compatible_slot_types(request.vehicle_type)
-        
-        for slot_type in compatible_slot_types:
-            query = select(ParkingSlot).where(
-                ParkingSlot.slot_type == slot_type,
-                ParkingSlot.status == SlotStatus.AVAILABLE
-            )
-            if request.vehicle_type == VehicleType.EV:
-                query = query.where(ParkingSlot.has_charger == True)
-
-            assigned_slot = db.exec(query).first()
-            if assigned_slot:
-                break
-        
-        if not assigned_slot:
+        if not _claim_slot(db, assigned_slot.id):
+            db.rollback()
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"No available slot found for vehicle type {request.vehicle_type.value}."
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Manual slot ID {request.slot_id} is not available or does not exist."
             )
+    else:
+        # Auto-assignment from the free-slot index (same lookup as suggest-slot), nearest the entrance.
+        # claim() removes the candidate from the index so concurrent requests move on to the next one.
+        while claimed_from_index is None:
+            candidate = _claim_from_index(request.vehicle_type, request.entrance_id)
+            if not candidate:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"No available slot found for vehicle type {request.vehicle_type.value}."
+                )
+            try:
+                claimed = _claim_slot(db, candidate.id)
+            except Exception:
+                # The slot is still free in the database, so hand it back to the index
+                slot_index.add(candidate)
+                raise
+            # If the UPDATE matches nothing the index drifted from the database; try the next candidate
+            if claimed:
+                claimed_from_index = candidate
 
     # 4. Create Parking Session
     new_session = ParkingSession(
         vehicle_number_plate=request.number_plate,
-        slot_id=assigned_slot.id,
+        slot_id=request.slot_id or claimed_from_index.id,
         billing_type=request.billing_type,
         status=SessionStatus.ACTIVE
     )
 
-    # If Day Pass, set billing amount at entry
+    # If Day Pass, collect the first day at entry
     if request.billing_type == BillingType.DAY_PASS:
-        new_session.billing_amount = DAY_PASS_RATE
+        slot_type = claimed_from_index.slot_type if claimed_from_index else assigned_slot.slot_type
+        new_session.billing_amount = tariff_for(slot_type).day_pass_rate
 
     db.add(new_session)
 
-    # 5. Update Parking Slot status to Occupied
-    assigned_slot.status = SlotStatus.OCCUPIED
-    db.add(assigned_slot)
+    # 5. Commit the session together with the slot claim
+    try:
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        if claimed_from_index:
+            slot_index.add(claimed_from_index)
+        if isinstance(exc, IntegrityError):
+            # The plate entered through another worker process after the check above
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Vehicle with number plate '{request.number_plate}' already has an active session."
+            )
+        raise
 
-    db.commit()
     db.refresh(new_session)
-    db.refresh(assigned_slot)
+    assigned_slot = slot_row(claimed_from_index or assigned_slot, SlotStatus.OCCUPIED)
+    slots_changed(assigned_slot)
+    sessions_changed(new_session)
 
     return VehicleEntryResponse(
         message=f"Vehicle '{request.number_plate}' entered. Assigned to slot {assigned_slot.slot_number}.",
@@ -172,17 +233,99 @@ async def vehicle_entry(request: VehicleEntryRequest, db: Session = Depends(get_
         assigned_slot=assigned_slot
     )
 
+def _vehicle_entry_write_behind(request: VehicleEntryRequest) -> VehicleEntryResponse:
+    """
+    Entry in write-behind mode: the slot is claimed from the free-slot index, the event is
+    logged for the next group commit and the response goes out without touching the database.
+    """
+    with write_behind.transaction():
+        if request.slot_id:
+            assigned_slot = slot_index.take(request.slot_id)
+            if not assigned_slot:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Manual slot ID {request.slot_id} is not available or does not exist."
+                )
+            if not _is_slot_compatible(request.vehicle_type, assigned_slot.slot_type, assigned_slot.has_charger):
+                slot_index.add(assigned_slot)
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Manual slot ID {request.slot_id} is not compatible with vehicle type {request.vehicle_type.value}."
+                )
+        else:
+            assigned_slot = _claim_from_index(request.vehicle_type, request.entrance_id)
+            if not assigned_slot:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"No available slot found for vehicle type {request.vehicle_type.value}."
+                )
+
+        new_session = ParkingSession(
+            id=write_behind.next_session_id(),
+            vehicle_number_plate=request.number_plate,
+            slot_id=assigned_slot.id,
+            billing_type=request.billing_type,
+            status=SessionStatus.ACTIVE,
+            billing_amount=_day_pass_rate(request.billing_type, assigned_slot)
+        )
+        try:
+            write_behind.log_entry(new_session, request.vehicle_type)
+        except Exception:
+            slot_index.add(assigned_slot)
+            raise
+        write_behind.remember_slot(assigned_slot)
+        active_sessions.sync(new_session)
+
+    return VehicleEntryResponse(
+        message=f"Vehicle '{request.number_plate}' entered. Assigned to slot {assigned_slot.slot_number}.",
+        session=new_session,
+        assigned_slot=ParkingSlotResponse(status=SlotStatus.OCCUPIED, **assigned_slot._asdict())
+    )
+
 @router.put("/exit/{session_id}", response_model=VehicleExitResponse)
-async def vehicle_exit_by_session_id(session_id: int, db: Session = Depends(get_session)):
+def vehicle_exit_by_session_id(session_id: int, db: Session = Depends(get_session)):
     """
     Handles vehicle exit by session ID, calculates billing, and frees the slot.
     """
-    session_to_exit = db.exec(
-        select(ParkingSession).where(
-            ParkingSession.id == session_id,
+    return _exit_session(db, session_id)
+
+@router.put("/exit/by-plate/{number_plate}", response_model=VehicleExitResponse)
+def vehicle_exit_by_plate(number_plate: str, db: Session = Depends(get_session)):
+    """
+    Handles vehicle exit by number plate, for gates that read the plate but don't know the session.
+    The active session comes from the in-memory plate map, falling back to the plate/status index.
+    """
+    active = active_sessions.get(number_plate)
+    session_id = active.id if active else db.exec(
+        select(ParkingSession.id).where(
+            ParkingSession.vehicle_number_plate == number_plate,
             ParkingSession.status == SessionStatus.ACTIVE
         )
     ).first()
+    if session_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No active parking session found for vehicle '{number_plate}'."
+        )
+    return _exit_session(db, session_id)
+
+def _price_exit(parking_session: ParkingSession, parking_slot: Optional[IndexedSlot]) -> float:
+    """Prices an exit with the tariff of its slot type, or the fallback plan if the slot row is gone."""
+    slot_type = parking_slot.slot_type if parking_slot else FALLBACK_SLOT_TYPE
+    return price_session(tariff_for(slot_type), parking_session.billing_type, parking_session.entry_time, parking_session.exit_time)
+
+def _exit_message(parking_session: ParkingSession) -> str:
+    amount = parking_session.billing_amount
+    total = f"{amount:.2f} INR" if amount is not None else "not billed"
+    return f"Vehicle '{parking_session.vehicle_number_plate}' exited. Total amount: {total}."
+
+def _exit_session(db: Session, session_id: int) -> VehicleExitResponse:
+    if write_behind.enabled:
+        return _exit_session_write_behind(db, session_id)
+
+    session_to_exit = db.get(ParkingSession, session_id)
+    if session_to_exit and session_to_exit.status != SessionStatus.ACTIVE:
+        session_to_exit = None
 
     if not session_to_exit:
         raise HTTPException(
@@ -190,43 +333,330 @@ async def vehicle_exit_by_session_id(session_id: int, db: Session = Depends(get_
             detail=f"Active parking session with ID {session_id} not found."
         )
 
+    # Complete the session with a conditional UPDATE so a concurrent exit for it gets a 404
+    # instead of freeing the slot a second time after it may have been reassigned
+    completed = db.exec(
+        update(ParkingSession)
+        .where(ParkingSession.id == session_id, ParkingSession.status == SessionStatus.ACTIVE)
+        .values(status=SessionStatus.COMPLETED)
+    )
+    if completed.rowcount != 1:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Active parking session with ID {session_id} not found."
+        )
+
     # Set exit time
     session_to_exit.exit_time = datetime.now()
 
-    # Calculate billing amount
-    if session_to_exit.billing_type == BillingType.HOURLY:
-        duration: timedelta = session_to_exit.exit_time - session_to_exit.entry_time
-        total_minutes = duration.total_seconds() / 60
-        total_hours = total_minutes / 60
-
-        if total_hours <= 1:
-            session_to_exit.billing_amount = HOURLY_RATE_FIRST_HOUR
-        else:
-            # Calculate for subsequent hours, rounding up to the next full hour
-            # (e.g., 1.1 hours is 2 hours for billing purposes: 1st hour + 1 subsequent hour)
-            billed_hours = int(total_hours)
-            if total_minutes % 60 > 0: # If there's any fraction of an hour, count it as a full hour
-                billed_hours += 1
-            
-            session_to_exit.billing_amount = HOURLY_RATE_FIRST_HOUR + (max(0, billed_hours - 1) * HOURLY_RATE_SUBSEQUENT)
-            
-    # For DAY_PASS, billing_amount was already set at entry
+    # Calculate billing amount from the tariff of the slot type.
+    # Day passes were charged one day at entry and roll over to another day pass per started 24 hours.
+    parking_slot = slot_detail_cache.get(db, session_to_exit.slot_id)
+    session_to_exit.billing_amount = _price_exit(session_to_exit, parking_slot)
 
     session_to_exit.status = SessionStatus.COMPLETED
     db.add(session_to_exit)
 
-    # Free up the parking slot
-    parking_slot = db.exec(select(ParkingSlot).where(ParkingSlot.id == session_to_exit.slot_id)).first()
+    # Free up the parking slot and count the session in the hourly analytics
     if parking_slot:
-        parking_slot.status = SlotStatus.AVAILABLE
-        db.add(parking_slot)
+        db.exec(update(ParkingSlot).where(ParkingSlot.id == parking_slot.id).values(status=SlotStatus.AVAILABLE))
+        record_exits(db, [(session_to_exit, parking_slot.slot_type)])
 
     db.commit()
     db.refresh(session_to_exit)
     if parking_slot:
-        db.refresh(parking_slot)
+        slots_changed(slot_row(parking_slot, SlotStatus.AVAILABLE))
+    sessions_changed(session_to_exit)
 
     return VehicleExitResponse(
-        message=f"Vehicle '{session_to_exit.vehicle_number_plate}' exited. Total amount: {session_to_exit.billing_amount:.2f} INR.",
+        message=_exit_message(session_to_exit),
         session=session_to_exit
     )
+
+def _exit_session_write_behind(db: Session, session_id: int) -> VehicleExitResponse:
+    """
+    Exit in write-behind mode: the session leaves the active-session map, the priced exit is
+    logged and only then is the slot handed back to the free-slot index, so the log never
+    frees a slot after a later entry took it. The database is only read, for slots taken
+    before this process started.
+    """
+    with write_behind.transaction():
+        active = active_sessions.pop(session_id)
+        if not active:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Active parking session with ID {session_id} not found."
+            )
+
+        session_to_exit = ParkingSession(**active._asdict(), status=SessionStatus.COMPLETED, exit_time=datetime.now())
+        parking_slot = write_behind.slot(db, active.slot_id)
+        session_to_exit.billing_amount = _price_exit(session_to_exit, parking_slot)
+        try:
+            write_behind.log_exit(session_to_exit, parking_slot.slot_type if parking_slot else None)
+        except Exception:
+            active_sessions.sync(ParkingSession(**active._asdict(), status=SessionStatus.ACTIVE))
+            raise
+        if parking_slot:
+            slot_index.add(parking_slot)
+
+    return VehicleExitResponse(
+        message=_exit_message(session_to_exit),
+        session=session_to_exit
+    )
+
+# --- Batch endpoints for gate controllers replaying buffered events ---
+
+@contextmanager
+def _locked_plates(plates: Iterable[str]):
+    """Holds the plate lock stripes for every plate, taken in a fixed order to avoid deadlocks."""
+    stripes = sorted({hash(plate) % PLATE_LOCK_STRIPES for plate in plates})
+    with ExitStack() as stack:
+        for stripe in stripes:
+            stack.enter_context(_plate_locks[stripe])
+        yield
+
+def _claim_slots(db: Session, slot_ids: Set[int]) -> Set[int]:
+    """Set-based version of _claim_slot. Returns the ids that were AVAILABLE and are now OCCUPIED."""
+    result = db.exec(
+        update(ParkingSlot)
+        .where(ParkingSlot.id.in_(slot_ids), ParkingSlot.status == SlotStatus.AVAILABLE)
+        .values(status=SlotStatus.OCCUPIED)
+        .returning(ParkingSlot.id)
+        .execution_options(synchronize_session=False)
+    )
+    return set(result.scalars().all())
+
+def _day_pass_rate(billing_type: BillingType, slot) -> Optional[float]:
+    """Amount collected at entry: the first day for day passes, nothing for hourly billing."""
+    return tariff_for(slot.slot_type).day_pass_rate if billing_type == BillingType.DAY_PASS else None
+
+def _batch_response(results: List[BatchItemResult]) -> BatchResponse:
+    succeeded = sum(1 for result in results if result.status_code < 400)
+    return BatchResponse(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+@router.post("/entry/batch", response_model=BatchResponse)
+def vehicle_entry_batch(request: VehicleEntryBatchRequest, db: Session = Depends(get_session)):
+    """
+    Applies a batch of entry events in one transaction and returns a result per event.
+    Active sessions, vehicles and manual slots are resolved with one query each and all slots
+    are claimed with a single conditional UPDATE, so the cost per event is far below /entry.
+    Each result carries the status code /entry would have returned for that event.
+    """
+    with _locked_plates(event.number_plate for event in request.events), write_behind.exclusive():
+        return _vehicle_entry_batch(request.events, db)
+
+def _vehicle_entry_batch(events: List[VehicleEntryBatchItem], db: Session) -> BatchResponse:
+    results: Dict[int, BatchItemResult] = {}
+
+    def fail(index: int, status_code: int, detail: str):
+        results[index] = BatchItemResult(index=index, status_code=status_code, detail=detail)
+
+    plates = {event.number_plate for event in events}
+    active_plates = {plate: active.id for plate in plates if (active := active_sessions.get(plate))}
+    known_plates = vehicle_cache.known_plates(db, plates)
+    manual_ids = {event.slot_id for event in events if event.slot_id}
+    manual_slots = {
+        slot.id: slot for slot in db.exec(select(ParkingSlot).where(ParkingSlot.id.in_(manual_ids))).all()
+    } if manual_ids else {}
+
+    # 1. Validate every event and pick its slot. Manual slots go first so auto-assignment skips them.
+    pending: Dict[int, int] = {}
+    claimed: Dict[int, IndexedSlot] = {}
+    taken: Set[int] = set()
+    seen_plates: Set[str] = set()
+
+    def claim_next(index: int) -> bool:
+        vehicle_type = events[index].vehicle_type
+        while True:
+            candidate = _claim_from_index(vehicle_type, events[index].entrance_id)
+            if not candidate:
+                fail(index, status.HTTP_404_NOT_FOUND, f"No available slot found for vehicle type {vehicle_type.value}.")
+                return False
+            if candidate.id not in taken:
+                taken.add(candidate.id)
+                pending[index] = candidate.id
+                claimed[index] = candidate
+                return True
+
+    for index in sorted(range(len(events)), key=lambda i: not events[i].slot_id):
+        event = events[index]
+        if event.number_plate in active_plates:
+            fail(index, status.HTTP_409_CONFLICT, f"Vehicle with number plate '{event.number_plate}' already has an active session (Session ID: {active_plates[event.number_plate]}).")
+            continue
+        if event.number_plate in seen_plates:
+            fail(index, status.HTTP_409_CONFLICT, f"Vehicle with number plate '{event.number_plate}' appears more than once in this batch.")
+            continue
+        if event.entrance_id is not None and not slot_index.has_entrance(event.entrance_id):
+            fail(index, status.HTTP_400_BAD_REQUEST, f"Entrance ID {event.entrance_id} does not exist.")
+            continue
+        if event.slot_id:
+            slot = manual_slots.get(event.slot_id)
+            if not slot or slot.status != SlotStatus.AVAILABLE or slot.id in taken:
+                fail(index, status.HTTP_400_BAD_REQUEST, f"Manual slot ID {event.slot_id} is not available or does not exist.")
+                continue
+            if not _is_slot_compatible(event.vehicle_type, slot.slot_type, slot.has_charger):
+                fail(index, status.HTTP_400_BAD_REQUEST, f"Manual slot ID {event.slot_id} is not compatible with vehicle type {event.vehicle_type.value}.")
+                continue
+            taken.add(slot.id)
+            pending[index] = slot.id
+        elif not claim_next(index):
+            continue
+        seen_plates.add(event.number_plate)
+
+    # 2. Claim all chosen slots at once; auto-assigned events whose slot was lost retry with the next one
+    assigned: Dict[int, int] = {}
+    while pending:
+        try:
+            won = _claim_slots(db, set(pending.values()))
+        except Exception:
+            # The slots are still free in the database, so hand them back to the index
+            for candidate in claimed.values():
+                slot_index.add(candidate)
+            raise
+        retry, pending = pending, {}
+        for index, slot_id in retry.items():
+            if slot_id in won:
+                assigned[index] = slot_id
+            elif events[index].slot_id:
+                fail(index, status.HTTP_400_BAD_REQUEST, f"Manual slot ID {events[index].slot_id} is not available or does not exist.")
+            else:
+                claimed.pop(index)
+                claim_next(index)
+
+    # 3. Create missing vehicles and the sessions, then commit everything together
+    new_sessions: Dict[int, ParkingSession] = {}
+    for index, slot_id in assigned.items():
+        event = events[index]
+        if event.number_plate not in known_plates:
+            db.add(Vehicle(number_plate=event.number_plate, vehicle_type=event.vehicle_type))
+            index_plate(db, event.number_plate)
+            known_plates.add(event.number_plate)
+        new_session = ParkingSession(
+            # Write-behind mode hands out session ids ahead of the inserts
+            id=write_behind.next_session_id() if write_behind.enabled else None,
+            vehicle_number_plate=event.number_plate,
+            slot_id=slot_id,
+            entry_time=event.entry_time or datetime.now(),
+            billing_type=event.billing_type,
+            status=SessionStatus.ACTIVE,
+            billing_amount=_day_pass_rate(event.billing_type, manual_slots.get(event.slot_id) or claimed[index])
+        )
+        db.add(new_session)
+        new_sessions[index] = new_session
+
+    try:
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        for candidate in claimed.values():
+            slot_index.add(candidate)
+        if isinstance(exc, IntegrityError):
+            # Some plate entered through another worker process after the checks above
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Some of the vehicles entered concurrently through another request; retry to enter the rest."
+            )
+        raise
+
+    if assigned:
+        # Reload the committed rows with one query per table instead of a refresh per object
+        db.exec(select(ParkingSession).where(ParkingSession.id.in_([s.id for s in new_sessions.values()]))).all()
+        slots = {slot.id: slot for slot in db.exec(select(ParkingSlot).where(ParkingSlot.id.in_(assigned.values()))).all()}
+        slots_changed(*slots.values())
+        sessions_changed(*new_sessions.values())
+        for index, new_session in new_sessions.items():
+            results[index] = BatchItemResult(
+                index=index,
+                status_code=status.HTTP_201_CREATED,
+                detail=f"Vehicle '{new_session.vehicle_number_plate}' entered. Assigned to slot {slots[new_session.slot_id].slot_number}.",
+                session=new_session,
+                assigned_slot=slots[new_session.slot_id]
+            )
+
+    return _batch_response([results[index] for index in range(len(events))])
+
+@router.post("/exit/batch", response_model=BatchResponse)
+def vehicle_exit_batch(request: VehicleExitBatchRequest, db: Session = Depends(get_session)):
+    """
+    Applies a batch of exit events in one transaction and returns a result per event.
+    Sessions are completed and their slots freed with set-based statements.
+    """
+    with write_behind.exclusive():
+        return _vehicle_exit_batch(request, db)
+
+def _vehicle_exit_batch(request: VehicleExitBatchRequest, db: Session) -> BatchResponse:
+    results: Dict[int, BatchItemResult] = {}
+    session_ids = {event.session_id for event in request.events}
+    sessions = {
+        parking_session.id: parking_session
+        for parking_session in db.exec(
+            select(ParkingSession).where(ParkingSession.id.in_(session_ids), ParkingSession.status == SessionStatus.ACTIVE)
+        ).all()
+    }
+    chosen: Dict[int, Tuple[ParkingSession, datetime]] = {}
+    for index, event in enumerate(request.events):
+        parking_session = sessions.get(event.session_id)
+        if not parking_session or any(s is parking_session for s, _ in chosen.values()):
+            results[index] = BatchItemResult(index=index, status_code=status.HTTP_404_NOT_FOUND, detail=f"Active parking session with ID {event.session_id} not found.")
+            continue
+        exit_time = event.exit_time or datetime.now()
+        if exit_time < parking_session.entry_time:
+            results[index] = BatchItemResult(index=index, status_code=status.HTTP_400_BAD_REQUEST, detail=f"Exit time for session {event.session_id} is before its entry time.")
+            continue
+        chosen[index] = (parking_session, exit_time)
+
+    # Complete them conditionally so sessions exited concurrently elsewhere are reported as not found
+    completed = set(db.exec(
+        update(ParkingSession)
+        .where(ParkingSession.id.in_([s.id for s, _ in chosen.values()]), ParkingSession.status == SessionStatus.ACTIVE)
+        .values(status=SessionStatus.COMPLETED)
+        .returning(ParkingSession.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()) if chosen else set()
+
+    exited: Dict[int, ParkingSession] = {}
+    for index, (parking_session, exit_time) in chosen.items():
+        if parking_session.id not in completed:
+            results[index] = BatchItemResult(index=index, status_code=status.HTTP_404_NOT_FOUND, detail=f"Active parking session with ID {parking_session.id} not found.")
+            continue
+        parking_session.status = SessionStatus.COMPLETED
+        parking_session.exit_time = exit_time
+        exited[index] = parking_session
+
+    # Price every exit in one vectorized pass
+    slot_ids = {parking_session.slot_id for parking_session in exited.values()}
+    if exited:
+        slot_types = dict(db.exec(select(ParkingSlot.id, ParkingSlot.slot_type).where(ParkingSlot.id.in_(slot_ids))).all())
+        # Sessions whose slot row is gone are priced with the fallback plan rather than left unbilled
+        priced = list(exited.values())
+        amounts = price_batch(
+            np.array([slot_types.get(s.slot_id, FALLBACK_SLOT_TYPE).value for s in priced]),
+            np.array([s.billing_type == BillingType.DAY_PASS for s in priced]),
+            np.array([s.entry_time for s in priced], dtype="datetime64[us]"),
+            np.array([s.exit_time for s in priced], dtype="datetime64[us]")
+        )
+        for parking_session, amount in zip(priced, amounts.tolist()):
+            parking_session.billing_amount = amount
+        record_exits(db, [(parking_session, slot_types[parking_session.slot_id]) for parking_session in priced if parking_session.slot_id in slot_types])
+    if slot_ids:
+        db.exec(
+            update(ParkingSlot).where(ParkingSlot.id.in_(slot_ids)).values(status=SlotStatus.AVAILABLE)
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+
+    if exited:
+        db.exec(select(ParkingSession).where(ParkingSession.id.in_([s.id for s in exited.values()]))).all()
+        slots = db.exec(select(ParkingSlot).where(ParkingSlot.id.in_(slot_ids))).all()
+        slots_changed(*slots)
+        sessions_changed(*exited.values())
+        for index, parking_session in exited.items():
+            results[index] = BatchItemResult(
+                index=index,
+                status_code=status.HTTP_200_OK,
+                detail=_exit_message(parking_session),
+                session=parking_session
+            )
+
+    return _batch_response([results[index] for index in range(len(request.events))])
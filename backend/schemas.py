@@ -1,8 +1,21 @@
+from enum import Enum
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 from .models import VehicleType, SlotType, SlotStatus, BillingType, SessionStatus
 
+class ExportFormat(str, Enum):
+    """Output formats for list endpoints that support streaming exports."""
+    JSON = "json"
+    COLUMNAR = "columnar" # One JSON array per field instead of one object per row
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+class OccupancyEncoding(str, Enum):
+    """Encodings of the slot status vector served by /dashboard/occupancy."""
+    BITSET = "bitset"
+    RLE = "rle"
+
 # --- Request Schemas ---
 
 
@@ -12,12 +25,76 @@ class VehicleEntryRequest(BaseModel):
     vehicle_type: VehicleType
     billing_type: BillingType
     slot_id: Optional[int] = None
+    entrance_id: Optional[int] = None # Gate the vehicle came through; auto-assignment picks the slot nearest it
+
+# Largest number of events accepted by one batch entry or exit request
+MAX_BATCH_EVENTS = 1000
+
+class VehicleEntryBatchItem(VehicleEntryRequest):
+    """A buffered entry event; entry_time is when the gate saw the vehicle, defaulting to now."""
+    entry_time: Optional[datetime] = None
+
+class VehicleEntryBatchRequest(BaseModel):
+    """Schema for replaying buffered entry events from a gate controller."""
+    events: List[VehicleEntryBatchItem] = Field(..., min_length=1, max_length=MAX_BATCH_EVENTS)
+
+class VehicleExitBatchItem(BaseModel):
+    """A buffered exit event; exit_time is when the gate saw the vehicle, defaulting to now."""
+    session_id: int
+    exit_time: Optional[datetime] = None
+
+class VehicleExitBatchRequest(BaseModel):
+    """Schema for replaying buffered exit events from a gate controller."""
+    events: List[VehicleExitBatchItem] = Field(..., min_length=1, max_length=MAX_BATCH_EVENTS)
 
 class SlotCreateRequest(BaseModel): # <--- NEW
     """Schema for creating a new parking slot."""
     slot_number: str = Field(..., max_length=10)
     slot_type: SlotType
     has_charger: bool = False 
+    level: int = 0
+    x: Optional[float] = None
+    y: Optional[float] = None
+
+class LayoutRowSpec(BaseModel):
+    """
+    A row of numbered slots sharing a type, e.g. name "A" with 12 slots gives A1..A12.
+    Slots are placed along x starting at x, spacing apart; y defaults to the row's position in its level.
+    """
+    name: str = Field(..., min_length=1, max_length=5)
+    slots: int = Field(..., ge=1)
+    slot_type: SlotType
+    has_charger: bool = False
+    first_number: int = Field(1, ge=0)
+    x: float = 0.0
+    y: Optional[float] = None
+    spacing: float = 1.0
+
+class LayoutLevelSpec(BaseModel):
+    """A level of the lot; prefix is prepended to its slot numbers, e.g. "L2-" gives L2-A1."""
+    prefix: str = Field("", max_length=5)
+    level: Optional[int] = None # Defaults to the level's position in the layout
+    rows: List[LayoutRowSpec]
+
+class EntranceSpec(BaseModel):
+    """An entrance of the lot, in the same coordinates as the slots."""
+    name: str = Field(..., max_length=50)
+    level: int = 0
+    x: float = 0.0
+    y: float = 0.0
+
+class LayoutSpec(BaseModel):
+    """Declarative description of a parking lot layout."""
+    levels: List[LayoutLevelSpec]
+    entrances: List[EntranceSpec] = []
+
+# Largest number of slots accepted by one bulk create request
+MAX_BULK_SLOTS = 50000
+
+class SlotBulkCreateRequest(BaseModel):
+    """Schema for creating many slots at once, listed individually and/or as a layout."""
+    slots: List[SlotCreateRequest] = []
+    layout: Optional[LayoutSpec] = None
 
 class SlotStatusUpdateRequest(BaseModel):
     """Schema for updating a parking slot's status."""
@@ -32,10 +109,64 @@ class ParkingSlotResponse(BaseModel):
     slot_type: SlotType
     status: SlotStatus
     has_charger: bool
+    level: int = 0
+    x: Optional[float] = None
+    y: Optional[float] = None
 
     class Config:
         from_attributes = True # Allows Pydantic to read from ORM models
 
+
+class OccupancyLayoutSlot(BaseModel):
+    """Schema for the static fields of a slot in the occupancy layout manifest."""
+    id: int
+    slot_number: str
+    slot_type: SlotType
+    has_charger: bool
+    level: int
+    x: Optional[float]
+    y: Optional[float]
+
+    class Config:
+        from_attributes = True
+
+class OccupancyLayoutResponse(BaseModel):
+    """Schema for the slot layout manifest: the slots in ordinal order, versioned by a hash of their content."""
+    version: str
+    slots: List[OccupancyLayoutSlot]
+
+class OccupancyVectorResponse(BaseModel):
+    """
+    Schema for slot statuses by ordinal (position in the layout manifest).
+    bitset: occupied and maintenance are base64 bitsets, one bit per ordinal, most significant bit first.
+    rle: runs alternates status code (0 available, 1 occupied, 2 maintenance) and run length.
+    """
+    layout_version: str
+    generation: int
+    count: int
+    encoding: OccupancyEncoding
+    occupied: Optional[str] = None
+    maintenance: Optional[str] = None
+    runs: Optional[List[int]] = None
+
+class EntranceResponse(BaseModel):
+    """Schema for returning entrance details."""
+    id: int
+    name: str
+    level: int
+    x: float
+    y: float
+
+    class Config:
+        from_attributes = True
+
+class SlotBulkCreateResponse(BaseModel):
+    """Schema for the result of a bulk slot creation. Slot numbers that already exist are skipped."""
+    created: int
+    skipped: int
+    entrances_created: int = 0
+    slots: List[ParkingSlotResponse]
+
 class ParkingSessionResponse(BaseModel):
     """Schema for returning parking session details."""
     id: int
@@ -61,10 +192,187 @@ class VehicleExitResponse(BaseModel):
     message: str
     session: ParkingSessionResponse
 
+class BatchItemResult(BaseModel):
+    """Outcome of one event in a batch, with the status code the single-item endpoint would return."""
+    index: int
+    status_code: int
+    detail: Optional[str] = None
+    session: Optional[ParkingSessionResponse] = None
+    assigned_slot: Optional[ParkingSlotResponse] = None
+
+class BatchResponse(BaseModel):
+    """Schema for the per-event results of a batch entry or exit."""
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
+
+
+class SlotTypeSummary(BaseModel):
+    """Schema for slot counts of a single slot type."""
+    total: int = 0
+    available: int = 0
+    occupied: int = 0
+    maintenance: int = 0
 
 class DashboardSummaryResponse(BaseModel):
     """Schema for dashboard summary counts."""
     total_slots: int
     available_slots: int
     occupied_slots: int
-    maintenance_slots: int
\ No newline at end of file
+    maintenance_slots: int
+    by_slot_type: Dict[SlotType, SlotTypeSummary] = {}
+
+class BillingReconciliationResponse(BaseModel):
+    """Schema for re-pricing stored sessions under the current tariffs."""
+    sessions: int
+    billed_amount: float
+    repriced_amount: float
+    difference: float
+    by_slot_type: Dict[SlotType, float] = {}
+
+class HourlyRollupResponse(BaseModel):
+    """Schema for one hour of completed-session analytics for a slot type and billing type."""
+    hour: datetime
+    slot_type: SlotType
+    billing_type: BillingType
+    occupancy_minutes: float
+    entries: int
+    exits: int
+    revenue: float
+
+    class Config:
+        from_attributes = True
+
+class AnalyticsTotals(BaseModel):
+    """Schema for analytics totals over a time range."""
+    occupancy_minutes: float = 0.0
+    entries: int = 0
+    exits: int = 0
+    revenue: float = 0.0
+
+class AnalyticsSummaryResponse(BaseModel):
+    """Schema for analytics totals over a time range, overall and broken down."""
+    start: datetime
+    end: datetime
+    totals: AnalyticsTotals
+    by_slot_type: Dict[SlotType, AnalyticsTotals] = {}
+    by_billing_type: Dict[BillingType, AnalyticsTotals] = {}
+
+class FacilityListResponse(BaseModel):
+    """Schema for the facilities served by this process."""
+    default_facility: str
+    facilities: List[str]
+
+class CrossFacilitySummaryResponse(DashboardSummaryResponse):
+    """Schema for slot counts summed over every facility, with each facility's own counts."""
+    by_facility: Dict[str, DashboardSummaryResponse] = {}
+
+class CrossFacilityAnalyticsResponse(AnalyticsSummaryResponse):
+    """Schema for analytics totals summed over every facility, with each facility's totals."""
+    by_facility: Dict[str, AnalyticsTotals] = {}
+
+class RollupStatusResponse(BaseModel):
+    """Schema for the progress of the analytics rollups."""
+    live_since: datetime
+    backfill_cursor: int
+    backfilled_sessions: int
+    backfill_completed_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+class SlotIndexCheckResponse(BaseModel):
+    """Schema for the free-slot index consistency check."""
+    consistent: bool
+    indexed_slots: int
+    available_slots: int
+    missing_slot_ids: List[int]
+    stale_slot_ids: List[int]
+
+class ForecastHourResponse(BaseModel):
+    """Schema for the expected arrivals and departures of one hour, per vehicle type."""
+    hour: datetime
+    arrivals: Dict[VehicleType, float] = {}
+    departures: Dict[VehicleType, float] = {}
+
+class ForecastWarningResponse(BaseModel):
+    """Schema for a vehicle type expected to run out of slots within the forecast horizon."""
+    vehicle_type: VehicleType
+    expected_demand: int
+    available_slots: int
+    runs_out_at: datetime
+    message: str
+
+class DemandForecastResponse(BaseModel):
+    """Schema for the arrival/departure forecast, the slot reserves planned from it and its warnings."""
+    generated_at: datetime
+    learned_until: Optional[datetime] = None
+    hours_learned: int
+    horizon_hours: int
+    pools_enabled: bool
+    hours: List[ForecastHourResponse]
+    free_slots: Dict[SlotType, int] = {}
+    expected_demand: Dict[VehicleType, int] = {}
+    reserves: Dict[VehicleType, Dict[SlotType, int]] = {}
+    warnings: List[ForecastWarningResponse] = []
+
+class OverstayResponse(BaseModel):
+    """Schema for a session active for longer than the overstay limit, with what it costs if closed now."""
+    session_id: int
+    vehicle_number_plate: str
+    slot_id: int
+    entry_time: datetime
+    hours_parked: float
+    billing_type: BillingType
+    amount_due: Optional[float] = None
+
+class ReconcilerStatusResponse(BaseModel):
+    """
+    Schema for the progress and findings of the slot/session reconciler.
+    lag_seconds is how long ago the oldest slot check was: since the last completed pass started.
+    """
+    overstay_action: str
+    overstay_hours: float
+    passes: int
+    pass_running: bool
+    pass_started_at: Optional[datetime] = None
+    cursor: int
+    slots_checked: int
+    slots_in_last_pass: int
+    last_pass_started_at: Optional[datetime] = None
+    last_pass_completed_at: Optional[datetime] = None
+    last_pass_seconds: Optional[float] = None
+    lag_seconds: Optional[float] = None
+    last_chunk_ms: float
+    occupied_slots_freed: int
+    available_slots_occupied: int
+    maintenance_slots_in_use: int
+    overstay_count: int
+    overstays_closed: int
+    overstays: List[OverstayResponse] = []
+    last_error: Optional[str] = None
+
+class MetricsSettings(BaseModel):
+    """Schema for turning metrics collection and the slow-request profiler on and off."""
+    enabled: bool
+    profile_sample_rate: float = Field(0.0, ge=0, le=1, description="Fraction of requests to profile; 0 turns the profiler off")
+    slow_request_ms: float = Field(500.0, ge=0, description="Keep profiles of requests at least this slow")
+
+class EntityCacheStatsResponse(BaseModel):
+    """Schema for the counters of one vehicle or slot cache of a facility."""
+    facility: str
+    cache: str
+    size: int
+    capacity: int
+    hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+
+class SlowRequestProfileResponse(BaseModel):
+    """Schema for a profile captured from a slow request."""
+    method: str
+    route: str
+    duration_ms: float
+    captured_at: datetime
+    profile: str
@@ -0,0 +1,80 @@
+import secrets
+import threading
+from typing import Dict, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from .facilities import FacilityLocal
+from .models import ParkingSlot, SlotStatus, SlotType
+from .row_json import RowEncoder, model_columns
+from .schemas import ExportFormat, ParkingSlotResponse
+
+SlotFilter = Tuple[Optional[SlotType], Optional[SlotStatus], ExportFormat]
+
+slot_encoder = RowEncoder(ParkingSlotResponse)
+
+
+class SlotListingCache:
+    """
+    Pre-serialized bodies of /dashboard/slots, one per (slot_type, status) filter and format.
+    A miss selects just the response columns and encodes the rows with slot_encoder, without
+    loading ORM objects or validating response models.
+
+    Every committed slot change bumps the generation (see slot_events.slots_changed), which
+    drops the cached bodies. The ETag is derived from the generation, so clients that send it
+    back in If-None-Match get a 304 without the database being touched. The boot id keeps
+    ETags from one process from matching after a restart.
+    """
+
+    def __init__(self):
+        self.generation = 0
+        self._boot_id = secrets.token_hex(4)
+        self._bodies: Dict[SlotFilter, Tuple[int, bytes]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def etag(self) -> str:
+        return f'"{self._boot_id}-{self.generation}"'
+
+    def invalidate(self):
+        """Bumps the generation after a slot change has been committed."""
+        with self._lock:
+            self.generation += 1
+            self._bodies.clear()
+
+    def lookup(
+        self, slot_type: Optional[SlotType], status: Optional[SlotStatus], export_format: ExportFormat = ExportFormat.JSON
+    ) -> Optional[Tuple[bytes, str]]:
+        """Returns the cached body and its ETag for a filter, or None if it must be rebuilt."""
+        with self._lock:
+            cached = self._bodies.get((slot_type, status, export_format))
+            if cached and cached[0] == self.generation:
+                return cached[1], self.etag
+        return None
+
+    def get(
+        self, db: Session, slot_type: Optional[SlotType], status: Optional[SlotStatus],
+        export_format: ExportFormat = ExportFormat.JSON
+    ) -> Tuple[bytes, str]:
+        """Returns the body and ETag for a filter, querying and serializing the slots on a miss."""
+        cached = self.lookup(slot_type, status, export_format)
+        if cached:
+            return cached
+
+        # Read the generation first: if a change lands while we query, the body is not stored
+        generation = self.generation
+        query = select(*model_columns(ParkingSlot, slot_encoder)).order_by(ParkingSlot.id)
+        if slot_type:
+            query = query.where(ParkingSlot.slot_type == slot_type)
+        if status:
+            query = query.where(ParkingSlot.status == status)
+        body = slot_encoder.encode(db.exec(query).all(), export_format)
+
+        with self._lock:
+            if generation == self.generation:
+                self._bodies[(slot_type, status, export_format)] = (generation, body)
+        return body, f'"{self._boot_id}-{generation}"'
+
+
+# One instance per facility, invalidated by the slot mutation handlers
+slot_listing_cache = FacilityLocal(SlotListingCache)
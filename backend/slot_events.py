@@ -0,0 +1,41 @@
+from .active_sessions import active_sessions
+from .entity_cache import slot_detail_cache
+from .live import occupancy_stream
+from .models import ParkingSession, ParkingSlot
+from .occupancy_map import occupancy_map
+from .slot_cache import slot_listing_cache
+from .slot_index import slot_index
+from .summary import summary_cache
+
+
+def slots_changed(*slots: ParkingSlot):
+    """
+    Propagates committed slot changes to the in-memory state derived from the slot table.
+    Call after the transaction that changed the slots has been committed and refreshed.
+    """
+    for slot in slots:
+        slot_index.sync(slot)
+        slot_detail_cache.sync(slot)
+    slot_views_changed(*slots)
+
+
+def slot_views_changed(*slots: ParkingSlot):
+    """
+    Refreshes the cached views of the slot table (summary, listing, occupancy map, live stream)
+    but not the free-slot index. Used by write-behind group commits, whose changes reached the
+    index when they were applied in memory and may since have been superseded there. Without
+    slots, the views are rebuilt from the database.
+    """
+    summary_cache.invalidate()
+    slot_listing_cache.invalidate()
+    if slots:
+        occupancy_map.update(slots)
+    else:
+        occupancy_map.invalidate()
+    occupancy_stream.publish(slots)
+
+
+def sessions_changed(*sessions: ParkingSession):
+    """Same as slots_changed, for committed session entries and exits."""
+    for parking_session in sessions:
+        active_sessions.sync(parking_session)
@@ -0,0 +1,278 @@
+import heapq
+import math
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from sqlmodel import Session, select
+
+from .facilities import FacilityLocal
+from .models import Entrance, ParkingSlot, SlotStatus, SlotType, VehicleType
+
+SLOT_NUMBER_PART = re.compile(r"\d+|[A-Za-z]+")
+
+# Walking cost of changing level, in the same units as slot coordinates
+LEVEL_CHANGE_COST = float(os.getenv("LEVEL_CHANGE_COST", "50"))
+
+# Slot types each vehicle type can park in, in order of preference
+COMPATIBLE_SLOT_TYPES: Dict[VehicleType, List[SlotType]] = {
+    VehicleType.CAR: [SlotType.REGULAR, SlotType.COMPACT],
+    VehicleType.BIKE: [SlotType.BIKE],
+    # EV can use regular/compact if EV slot with charger isn't available
+    VehicleType.EV: [SlotType.EV, SlotType.REGULAR, SlotType.COMPACT],
+    # Handicap can use regular/compact if accessible isn't available
+    VehicleType.HANDICAP: [SlotType.HANDICAP, SlotType.REGULAR, SlotType.COMPACT],
+}
+
+
+class IndexedSlot(NamedTuple):
+    """Lightweight copy of the slot columns needed to answer an assignment."""
+    id: int
+    slot_number: str
+    slot_type: SlotType
+    has_charger: bool
+    level: int = 0
+    x: Optional[float] = None
+    y: Optional[float] = None
+
+
+class IndexedEntrance(NamedTuple):
+    """Lightweight copy of an entrance's position."""
+    id: int
+    name: str
+    level: int
+    x: float
+    y: float
+
+
+def slot_proximity_key(slot_number: str) -> Tuple:
+    """
+    Natural sort key for a slot number so that A2 comes before A10 and B1-3 before B1-12.
+    Lower keys are treated as closer to the entrance when no entrance is given, and break
+    ties between slots at the same distance from one.
+    """
+    return tuple(int(part) if part.isdigit() else part.upper() for part in SLOT_NUMBER_PART.findall(slot_number))
+
+
+def slot_distance(entrance: IndexedEntrance, slot: IndexedSlot) -> float:
+    """Walking distance from an entrance to a slot: Manhattan distance plus a cost per level changed."""
+    if slot.x is None or slot.y is None:
+        return math.inf
+    return abs(slot.x - entrance.x) + abs(slot.y - entrance.y) + LEVEL_CHANGE_COST * abs(slot.level - entrance.level)
+
+
+# Heap entry: (distance, proximity key, slot id, version)
+HeapEntry = Tuple[float, Tuple, int, int]
+Bucket = Tuple[SlotType, bool]
+
+
+class FreeSlotIndex:
+    """
+    Per-facility index of AVAILABLE parking slots.
+
+    Slots are bucketed by (slot_type, has_charger). Every bucket keeps one min-heap per
+    entrance ordered by distance from that entrance, plus one ordered by slot number for
+    requests that don't name an entrance, so the nearest free slot is always at the top.
+    Removal is lazy: entries of slots that left the index are dropped when they reach the
+    top of a heap, and each re-add gets a new version so older entries for it are ignored.
+    Finds and claims are O(log n) amortized; adds are O(log n) per entrance.
+    The index mirrors the database; callers update it only after their commit succeeds.
+    All methods are thread-safe, since synchronous handlers run in FastAPI's threadpool.
+    """
+
+    def __init__(self):
+        self._slots: Dict[int, IndexedSlot] = {}
+        self._free_counts: Dict[SlotType, int] = {}
+        self._versions: Dict[int, int] = {}
+        self._proximity_keys: Dict[int, Tuple] = {}
+        self._entrances: Dict[int, IndexedEntrance] = {}
+        # Heaps per entrance id, None being slot-number order
+        self._heaps: Dict[Optional[int], Dict[Bucket, List[HeapEntry]]] = {None: {}}
+        self._stale_entries = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, slot_id: int) -> bool:
+        return slot_id in self._slots
+
+    def clear(self):
+        with self._lock:
+            self._slots.clear()
+            self._free_counts.clear()
+            self._versions.clear()
+            self._proximity_keys.clear()
+            self._entrances.clear()
+            self._heaps = {None: {}}
+            self._stale_entries = 0
+
+    def _entry(self, entrance_id: Optional[int], slot: IndexedSlot, version: int) -> HeapEntry:
+        distance = 0.0 if entrance_id is None else slot_distance(self._entrances[entrance_id], slot)
+        return (distance, self._proximity_keys[slot.id], slot.id, version)
+
+    def _rebuild(self):
+        """Rebuilds every heap from the indexed slots, discarding stale entries."""
+        heaps: Dict[Optional[int], Dict[Bucket, List[HeapEntry]]] = {}
+        for entrance_id in [None, *self._entrances]:
+            buckets: Dict[Bucket, List[HeapEntry]] = {}
+            for slot in self._slots.values():
+                buckets.setdefault((slot.slot_type, slot.has_charger), []).append(
+                    self._entry(entrance_id, slot, self._versions[slot.id])
+                )
+            for bucket in buckets.values():
+                heapq.heapify(bucket)
+            heaps[entrance_id] = buckets
+        self._heaps = heaps
+        self._stale_entries = 0
+
+    def load(self, db: Session):
+        """Rebuilds the index from every AVAILABLE slot and every entrance in the database."""
+        rows = db.exec(
+            select(ParkingSlot.id, ParkingSlot.slot_number, ParkingSlot.slot_type, ParkingSlot.has_charger,
+                   ParkingSlot.level, ParkingSlot.x, ParkingSlot.y)
+            .where(ParkingSlot.status == SlotStatus.AVAILABLE)
+        ).all()
+        self.restore((IndexedSlot(*row) for row in rows), db)
+
+    def restore(self, free_slots: Iterable[IndexedSlot], db: Session):
+        """Rebuilds the index from the given free slots, e.g. from a state snapshot, and the entrances in the database."""
+        entrances = db.exec(select(Entrance.id, Entrance.name, Entrance.level, Entrance.x, Entrance.y)).all()
+        with self._lock:
+            self._slots = {slot.id: slot for slot in free_slots}
+            self._free_counts = {}
+            for slot in self._slots.values():
+                self._free_counts[slot.slot_type] = self._free_counts.get(slot.slot_type, 0) + 1
+            self._versions = dict.fromkeys(self._slots, 0)
+            self._proximity_keys = {slot.id: slot_proximity_key(slot.slot_number) for slot in self._slots.values()}
+            self._entrances = {row[0]: IndexedEntrance(*row) for row in entrances}
+            self._rebuild()
+
+    def free_count(self, slot_type: SlotType) -> int:
+        """Number of free slots of a type, kept up to date by every add and discard."""
+        return self._free_counts.get(slot_type, 0)
+
+    def has_entrance(self, entrance_id: int) -> bool:
+        return entrance_id in self._entrances
+
+    def add(self, slot: Union[ParkingSlot, IndexedSlot]):
+        """Marks a slot as free. Adding a slot that is already indexed is a no-op."""
+        indexed = IndexedSlot(slot.id, slot.slot_number, slot.slot_type, slot.has_charger, slot.level, slot.x, slot.y)
+        with self._lock:
+            if slot.id in self._slots:
+                return
+            version = self._versions.get(slot.id, -1) + 1
+            self._slots[slot.id] = indexed
+            self._free_counts[indexed.slot_type] = self._free_counts.get(indexed.slot_type, 0) + 1
+            self._versions[slot.id] = version
+            if slot.id not in self._proximity_keys:
+                self._proximity_keys[slot.id] = slot_proximity_key(slot.slot_number)
+            for entrance_id, buckets in self._heaps.items():
+                heapq.heappush(buckets.setdefault((indexed.slot_type, indexed.has_charger), []),
+                               self._entry(entrance_id, indexed, version))
+
+    def discard(self, slot_id: int):
+        """Removes a slot from the index if present. Its heap entries are dropped lazily."""
+        with self._lock:
+            slot = self._slots.pop(slot_id, None)
+            if slot is None:
+                return
+            self._free_counts[slot.slot_type] -= 1
+            self._stale_entries += len(self._heaps)
+            # Keep the heaps from filling up with entries of slots that went away
+            if self._stale_entries > 2 * len(self._slots) * len(self._heaps) + 1024:
+                self._rebuild()
+
+    def take(self, slot_id: int) -> Optional[IndexedSlot]:
+        """Atomically removes a specific free slot from the index. Returns None if it is not free."""
+        with self._lock:
+            slot = self._slots.get(slot_id)
+            if slot is not None:
+                self.discard(slot_id)
+            return slot
+
+    def sync(self, slot: ParkingSlot):
+        """Adds or removes a slot depending on its current status."""
+        if slot.status == SlotStatus.AVAILABLE:
+            self.add(slot)
+        else:
+            self.discard(slot.id)
+
+    def get(self, slot_id: int) -> Optional[IndexedSlot]:
+        return self._slots.get(slot_id)
+
+    def _head(self, heap: Optional[List[HeapEntry]]) -> Optional[HeapEntry]:
+        """Top live entry of a heap, popping stale entries above it."""
+        while heap:
+            _, _, slot_id, version = heap[0]
+            if slot_id in self._slots and self._versions[slot_id] == version:
+                return heap[0]
+            heapq.heappop(heap)
+            self._stale_entries -= 1
+        return None
+
+    def find(
+        self,
+        slot_types: Iterable[SlotType],
+        require_charger: bool = False,
+        entrance_id: Optional[int] = None
+    ) -> Optional[IndexedSlot]:
+        """
+        Returns the free slot nearest the entrance (lowest slot number without one), trying slot
+        types in priority order. Within a slot type, charger and non-charger slots are compared.
+        Raises KeyError for an unknown entrance.
+        """
+        with self._lock:
+            if entrance_id is not None and entrance_id not in self._entrances:
+                raise KeyError(entrance_id)
+            buckets = self._heaps[entrance_id]
+            for slot_type in slot_types:
+                heads = [self._head(buckets.get((slot_type, True)))]
+                if not require_charger:
+                    heads.append(self._head(buckets.get((slot_type, False))))
+                best = min((head for head in heads if head), default=None)
+                if best is not None:
+                    return self._slots[best[2]]
+            return None
+
+    def claim(
+        self,
+        slot_types: Iterable[SlotType],
+        require_charger: bool = False,
+        entrance_id: Optional[int] = None
+    ) -> Optional[IndexedSlot]:
+        """
+        Atomically finds the nearest free slot and removes it from the index, so no other
+        caller in this process can be handed the same slot. Give it back with add() if the
+        claim is not committed.
+        """
+        with self._lock:
+            slot = self.find(slot_types, require_charger=require_charger, entrance_id=entrance_id)
+            if slot is not None:
+                self.discard(slot.id)
+            return slot
+
+    def check_consistency(self, db: Session) -> dict:
+        """
+        Compares the index against the AVAILABLE slots in the database.
+        Returns the ids missing from the index and the ids indexed but no longer available.
+        """
+        available_ids = set(db.exec(
+            select(ParkingSlot.id).where(ParkingSlot.status == SlotStatus.AVAILABLE)
+        ).all())
+        with self._lock:
+            indexed_ids = set(self._slots)
+        missing = sorted(available_ids - indexed_ids)
+        stale = sorted(indexed_ids - available_ids)
+        return {
+            "consistent": not missing and not stale,
+            "indexed_slots": len(indexed_ids),
+            "available_slots": len(available_ids),
+            "missing_slot_ids": missing,
+            "stale_slot_ids": stale,
+        }
+
+
+# One instance per facility, loaded during application startup
+slot_index = FacilityLocal(FreeSlotIndex)
@@ -0,0 +1,330 @@
+import asyncio
+import mmap
+import os
+import secrets
+import struct
+import time
+import zlib
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import String, insert, text, type_coerce, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from .active_sessions import ActiveSession, active_sessions
+from .facilities import FacilityLocal, facility_file
+from .models import BillingType, ParkingSession, ParkingSlot, SessionStatus, SlotStatus, SlotType, StateVersion
+from .slot_index import IndexedSlot, slot_index
+
+# Warm restarts from a snapshot of the slots and active sessions. On by default; SQLite only,
+# since the database counts its changes with triggers.
+STATE_SNAPSHOT = os.getenv("STATE_SNAPSHOT", "true").lower() in ("1", "true", "yes")
+STATE_SNAPSHOT_FILE = os.getenv("STATE_SNAPSHOT_FILE", "./parking-state.snapshot")
+
+# How often the maintenance worker rewrites the snapshot, if anything changed; also written on shutdown
+STATE_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("STATE_SNAPSHOT_INTERVAL_SECONDS", "60"))
+
+# Times a snapshot read is retried when a change commits while it reads, before waiting for the next interval
+SNAPSHOT_READ_ATTEMPTS = 5
+
+STATE_VERSION_ID = 1
+
+_TRIGGERS = {
+    "stateversion_slot_insert": "AFTER INSERT ON parkingslot",
+    "stateversion_slot_update": "AFTER UPDATE ON parkingslot",
+    "stateversion_slot_delete": "AFTER DELETE ON parkingslot",
+    "stateversion_session_insert": "AFTER INSERT ON parkingsession",
+    "stateversion_session_update": (
+        "AFTER UPDATE OF vehicle_number_plate, slot_id, entry_time, status, billing_type, billing_amount ON parkingsession"
+    ),
+    # Archived and deleted completed sessions don't change the state
+    "stateversion_session_delete": "AFTER DELETE ON parkingsession WHEN OLD.status = 'ACTIVE'",
+}
+
+SLOT_TYPES = list(SlotType)
+SLOT_STATUSES = list(SlotStatus)
+BILLING_TYPES = list(BillingType)
+# Codes by member name, the way enum columns are stored
+_SLOT_TYPE_CODES = {slot_type.name: code for code, slot_type in enumerate(SLOT_TYPES)}
+_SLOT_STATUS_CODES = {slot_status.name: code for code, slot_status in enumerate(SLOT_STATUSES)}
+_BILLING_TYPE_CODES = {billing_type.name: code for code, billing_type in enumerate(BILLING_TYPES)}
+
+# Fixed-size records; slot numbers and plates follow each table as character offsets into one UTF-8 string
+_SLOT_RECORD = np.dtype([
+    ("id", "<i8"), ("slot_type", "u1"), ("status", "u1"), ("has_charger", "u1"), ("level", "<i4"), ("x", "<f8"), ("y", "<f8"),
+])
+_SESSION_RECORD = np.dtype([
+    ("id", "<i8"), ("slot_id", "<i8"), ("entry_time", "<M8[us]"), ("billing_type", "u1"), ("billing_amount", "<f8"),
+])
+
+# magic, format, epoch, version, written at, slots, sessions, slot number bytes, plate bytes, CRC-32 of the rest
+_HEADER = struct.Struct("<8sI32sqdIIIII")
+_MAGIC = b"PARKSNAP"
+# Changes with the record layouts and the enums, so a snapshot from another build is ignored instead of misread
+_FORMAT = zlib.crc32(repr((_SLOT_RECORD.descr, _SESSION_RECORD.descr, SLOT_TYPES, SLOT_STATUSES, BILLING_TYPES)).encode())
+
+StateMark = Tuple[str, int]
+
+
+def install_state_version(engine: Engine, enabled: bool) -> bool:
+    """
+    Creates the state version row and, with enabled, the triggers counting changes to the slots
+    and sessions. Without them (enabled False) the triggers are dropped and the epoch renewed,
+    since changes made meanwhile go uncounted. Returns whether snapshots can be used.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.begin() as connection:
+        epoch = secrets.token_hex(16)
+        exists = connection.execute(select(StateVersion.id).where(StateVersion.id == STATE_VERSION_ID)).first()
+        if exists is None:
+            connection.execute(insert(StateVersion).values(id=STATE_VERSION_ID, epoch=epoch, version=0))
+        for name, event in _TRIGGERS.items():
+            if enabled:
+                # Never dropped while enabled, so a worker starting up can't miss another worker's writes
+                connection.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS {name} {event} "
+                    f"BEGIN UPDATE stateversion SET version = version + 1 WHERE id = {STATE_VERSION_ID}; END"
+                ))
+            else:
+                connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        if not enabled:
+            connection.execute(update(StateVersion).where(StateVersion.id == STATE_VERSION_ID).values(epoch=epoch))
+    return enabled
+
+
+def _state_mark(db: Session) -> StateMark:
+    epoch, version = db.exec(select(StateVersion.epoch, StateVersion.version).where(StateVersion.id == STATE_VERSION_ID)).one()
+    return epoch, version
+
+
+def _pack_strings(values: Sequence[str]) -> Tuple[np.ndarray, bytes]:
+    offsets = np.zeros(len(values) + 1, dtype="<i8")
+    offsets[1:] = np.cumsum([len(value) for value in values])
+    return offsets, "".join(values).encode()
+
+
+def _unpack_strings(offsets: np.ndarray, blob: bytes) -> List[str]:
+    joined = blob.decode()
+    bounds = offsets.tolist()
+    return [joined[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def _optional_floats(values: np.ndarray) -> List[Optional[float]]:
+    return [None if value != value else value for value in values.tolist()]
+
+
+def encode_snapshot(mark: StateMark, slots: Sequence[tuple], sessions: Sequence[tuple]) -> bytes:
+    """
+    The snapshot of the given slot rows (id, slot_number, slot_type, status, has_charger, level,
+    x, y) and active session rows (ActiveSession fields), taken at the state mark. Enums are
+    given by member name and entry times as datetimes or ISO text, as SQLite stores them.
+    """
+    slot_records = np.zeros(len(slots), dtype=_SLOT_RECORD)
+    session_records = np.zeros(len(sessions), dtype=_SESSION_RECORD)
+    slot_numbers: Sequence[str] = ()
+    plates: Sequence[str] = ()
+    if slots:
+        ids, slot_numbers, slot_types, statuses, chargers, levels, xs, ys = zip(*slots)
+        slot_records["id"] = ids
+        slot_records["slot_type"] = [_SLOT_TYPE_CODES[slot_type] for slot_type in slot_types]
+        slot_records["status"] = [_SLOT_STATUS_CODES[slot_status] for slot_status in statuses]
+        slot_records["has_charger"] = chargers
+        slot_records["level"] = levels
+        slot_records["x"] = [np.nan if x is None else x for x in xs]
+        slot_records["y"] = [np.nan if y is None else y for y in ys]
+    if sessions:
+        ids, plates, slot_ids, entry_times, billing_types, amounts = zip(*sessions)
+        session_records["id"] = ids
+        session_records["slot_id"] = slot_ids
+        session_records["entry_time"] = np.array(entry_times, dtype="datetime64[us]")
+        session_records["billing_type"] = [_BILLING_TYPE_CODES[billing_type] for billing_type in billing_types]
+        session_records["billing_amount"] = [np.nan if amount is None else amount for amount in amounts]
+    number_offsets, number_blob = _pack_strings(slot_numbers)
+    plate_offsets, plate_blob = _pack_strings(plates)
+
+    body = b"".join((
+        slot_records.tobytes(), number_offsets.tobytes(), number_blob,
+        session_records.tobytes(), plate_offsets.tobytes(), plate_blob,
+    ))
+    header = _HEADER.pack(
+        _MAGIC, _FORMAT, mark[0].encode(), mark[1], time.time(), len(slots), len(sessions),
+        len(number_blob), len(plate_blob), zlib.crc32(body)
+    )
+    return header + body
+
+
+def decode_snapshot(buffer, mark: StateMark) -> Optional[Tuple[List[IndexedSlot], List[ActiveSession], int]]:
+    """
+    The free slots and active sessions of a snapshot, plus its slot count, or None if it was
+    taken at another state mark. Raises ValueError if the snapshot is not readable.
+    The arrays only view the buffer while decoding, so a memory map can be closed afterwards.
+    """
+    if len(buffer) < _HEADER.size:
+        raise ValueError("truncated header")
+    magic, file_format, epoch, version, _, slot_count, session_count, number_bytes, plate_bytes, checksum = _HEADER.unpack_from(buffer)
+    if magic != _MAGIC or file_format != _FORMAT:
+        raise ValueError("written by another version")
+    if (epoch.decode(), version) != mark:
+        return None
+    size = (_HEADER.size + slot_count * _SLOT_RECORD.itemsize + (slot_count + 1) * 8 + number_bytes
+            + session_count * _SESSION_RECORD.itemsize + (session_count + 1) * 8 + plate_bytes)
+    if len(buffer) != size:
+        raise ValueError(f"{len(buffer)} bytes instead of {size}")
+    with memoryview(buffer) as view:
+        if zlib.crc32(view[_HEADER.size:]) != checksum:
+            raise ValueError("checksum mismatch")
+
+    offset = _HEADER.size
+    slot_records = np.frombuffer(buffer, _SLOT_RECORD, slot_count, offset)
+    offset += slot_records.nbytes
+    number_offsets = np.frombuffer(buffer, "<i8", slot_count + 1, offset)
+    offset += number_offsets.nbytes
+    slot_numbers = _unpack_strings(number_offsets, buffer[offset:offset + number_bytes])
+    offset += number_bytes
+    session_records = np.frombuffer(buffer, _SESSION_RECORD, session_count, offset)
+    offset += session_records.nbytes
+    plate_offsets = np.frombuffer(buffer, "<i8", session_count + 1, offset)
+    offset += plate_offsets.nbytes
+    plates = _unpack_strings(plate_offsets, buffer[offset:offset + plate_bytes])
+
+    free = np.flatnonzero(slot_records["status"] == _SLOT_STATUS_CODES[SlotStatus.AVAILABLE.name])
+    free_records = slot_records[free]
+    free_slots = [
+        IndexedSlot(slot_id, slot_numbers[ordinal], SLOT_TYPES[slot_type], bool(charger), level, x, y)
+        for slot_id, ordinal, slot_type, charger, level, x, y in zip(
+            free_records["id"].tolist(), free.tolist(), free_records["slot_type"].tolist(),
+            free_records["has_charger"].tolist(), free_records["level"].tolist(),
+            _optional_floats(free_records["x"]), _optional_floats(free_records["y"]),
+        )
+    ]
+    sessions = [
+        ActiveSession(session_id, plate, slot_id, entry_time, BILLING_TYPES[billing_type], amount)
+        for session_id, plate, slot_id, entry_time, billing_type, amount in zip(
+            session_records["id"].tolist(), plates, session_records["slot_id"].tolist(),
+            session_records["entry_time"].tolist(), session_records["billing_type"].tolist(),
+            _optional_floats(session_records["billing_amount"]),
+        )
+    ]
+    return free_slots, sessions, slot_count
+
+
+class StateSnapshot:
+    """
+    Binary snapshot of a facility's slots (layout and status) and active sessions, so a restart
+    restores the free-slot index and the active-session map without scanning the tables.
+
+    The file holds fixed-size numpy records plus the slot numbers and plates as one string each,
+    and is memory-mapped and decoded in bulk at startup. It is tagged with the state mark it was
+    read at: the epoch and version of the stateversion row, which triggers bump on every change
+    to the slots and sessions. If the database has moved on since (writes after the last
+    snapshot, write-behind events replayed at startup, another worker's writes, a restored
+    backup) or the file is damaged, startup loads from the database as before.
+
+    The maintenance worker rewrites the snapshot every STATE_SNAPSHOT_INTERVAL_SECONDS when the
+    version moved, and once more on shutdown. The slots and sessions are read between two
+    reads of the version and retried if it changed, so the file is always consistent with its
+    mark. Files are written to a temporary name and renamed into place.
+    """
+
+    def __init__(self):
+        self.enabled = STATE_SNAPSHOT
+        self.path = facility_file(STATE_SNAPSHOT_FILE)
+        self.interval = STATE_SNAPSHOT_INTERVAL_SECONDS
+        self.written_mark: Optional[StateMark] = None
+        self.writes = 0
+        self.last_write_ms: Optional[float] = None
+        self.last_size = 0
+        self.last_restore_ms: Optional[float] = None
+
+    def start(self, engine: Engine):
+        """Installs the change counting triggers. Runs at startup inside startup_lock, before the state is loaded."""
+        self.enabled = install_state_version(engine, self.enabled)
+
+    def restore(self, db: Session) -> Optional[Tuple[int, int]]:
+        """
+        Loads the free-slot index and the active-session map from the snapshot if it matches the
+        database. Returns the numbers of slots and active sessions restored, or None to load
+        from the database instead.
+        """
+        if not self.enabled or not os.path.exists(self.path):
+            return None
+        start = time.perf_counter()
+        mark = _state_mark(db)
+        try:
+            with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                decoded = decode_snapshot(buffer, mark)
+        except (OSError, ValueError, BufferError) as exc:
+            print(f"State snapshot {self.path} is unusable ({exc}); loading from the database.")
+            return None
+        if decoded is None:
+            print(f"State snapshot {self.path} is older than the database; loading from the database.")
+            return None
+        free_slots, sessions, slot_count = decoded
+        slot_index.restore(free_slots, db)
+        active_sessions.restore(sessions)
+        self.written_mark = mark
+        self.last_restore_ms = (time.perf_counter() - start) * 1000
+        return slot_count, len(sessions)
+
+    def _read(self, engine: Engine) -> Optional[Tuple[StateMark, list, list]]:
+        # Enum and datetime columns are read as stored, skipping their conversion to Python objects
+        slot_query = select(
+            ParkingSlot.id, ParkingSlot.slot_number, type_coerce(ParkingSlot.slot_type, String),
+            type_coerce(ParkingSlot.status, String), ParkingSlot.has_charger, ParkingSlot.level, ParkingSlot.x, ParkingSlot.y
+        ).order_by(ParkingSlot.id)
+        session_query = select(
+            ParkingSession.id, ParkingSession.vehicle_number_plate, ParkingSession.slot_id,
+            type_coerce(ParkingSession.entry_time, String), type_coerce(ParkingSession.billing_type, String),
+            ParkingSession.billing_amount
+        ).where(ParkingSession.status == SessionStatus.ACTIVE)
+        with Session(engine) as db:
+            for _ in range(SNAPSHOT_READ_ATTEMPTS):
+                mark = _state_mark(db)
+                if mark == self.written_mark:
+                    return None
+                connection = db.connection()
+                slots = connection.execute(slot_query).all()
+                sessions = connection.execute(session_query).all()
+                if _state_mark(db) == mark:
+                    return mark, slots, sessions
+                db.rollback()
+        print("State snapshot skipped: the database kept changing while it was read.")
+        return None
+
+    def write(self, engine: Engine) -> bool:
+        """Writes a snapshot if the database changed since the last one. Returns whether it did."""
+        if not self.enabled:
+            return False
+        start = time.perf_counter()
+        read = self._read(engine)
+        if read is None:
+            return False
+        mark, slots, sessions = read
+        data = encode_snapshot(mark, slots, sessions)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        self.written_mark = mark
+        self.writes += 1
+        self.last_size = len(data)
+        self.last_write_ms = (time.perf_counter() - start) * 1000
+        return True
+
+    async def run(self, engine: Engine):
+        """Rewrites the snapshot every interval while the database changes. Started from the application lifespan."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.write, engine)
+            except Exception as exc:
+                # Typically a busy database or a full disk; the previous snapshot stays in place
+                print(f"State snapshot failed: {exc}")
+
+
+# One instance per facility, writing its own file
+state_snapshot = FacilityLocal(StateSnapshot)
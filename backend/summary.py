@@ -0,0 +1,71 @@
+import threading
+import time
+from typing import Optional
+
+from sqlmodel import Session, func, select
+
+from .facilities import FacilityLocal
+from .models import ParkingSlot, SlotStatus, SlotType
+from .schemas import DashboardSummaryResponse, SlotTypeSummary
+
+# How long a computed summary may be served before it is recomputed
+SUMMARY_CACHE_TTL_SECONDS = 2.0
+
+
+def compute_summary(db: Session) -> DashboardSummaryResponse:
+    """Computes slot counts overall and per slot type with a single GROUP BY query."""
+    rows = db.exec(
+        select(ParkingSlot.slot_type, ParkingSlot.status, func.count())
+        .group_by(ParkingSlot.slot_type, ParkingSlot.status)
+    ).all()
+
+    by_slot_type = {slot_type: SlotTypeSummary() for slot_type in SlotType}
+    for slot_type, slot_status, count in rows:
+        breakdown = by_slot_type[slot_type]
+        breakdown.total += count
+        if slot_status == SlotStatus.AVAILABLE:
+            breakdown.available += count
+        elif slot_status == SlotStatus.OCCUPIED:
+            breakdown.occupied += count
+        elif slot_status == SlotStatus.MAINTENANCE:
+            breakdown.maintenance += count
+
+    return DashboardSummaryResponse(
+        total_slots=sum(b.total for b in by_slot_type.values()),
+        available_slots=sum(b.available for b in by_slot_type.values()),
+        occupied_slots=sum(b.occupied for b in by_slot_type.values()),
+        maintenance_slots=sum(b.maintenance for b in by_slot_type.values()),
+        by_slot_type=by_slot_type
+    )
+
+
+class SummaryCache:
+    """
+    Short-TTL cache for the dashboard summary.
+    Every dashboard polling within the TTL shares one aggregation; slot mutations invalidate it.
+    """
+
+    def __init__(self, ttl_seconds: float = SUMMARY_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._summary: Optional[DashboardSummaryResponse] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> DashboardSummaryResponse:
+        summary = self._summary
+        if summary is not None and time.monotonic() < self._expires_at:
+            return summary
+        with self._lock:
+            # Another caller may have refreshed the summary while we waited
+            if self._summary is not None and time.monotonic() < self._expires_at:
+                return self._summary
+            self._summary = compute_summary(db)
+            self._expires_at = time.monotonic() + self.ttl_seconds
+            return self._summary
+
+    def invalidate(self):
+        self._expires_at = 0.0
+
+
+# One instance per facility, used by the dashboard and invalidated by slot mutations
+summary_cache = FacilityLocal(SummaryCache)
@@ -0,0 +1,78 @@
+"""Fixtures running the app against a throwaway SQLite database."""
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel
+
+from ..active_sessions import active_sessions
+from ..database import create_db_engine, get_session
+from ..entity_cache import slot_detail_cache
+from ..main import app
+from ..models import ParkingSlot, SlotType
+from ..slot_index import slot_index
+from ..write_behind import write_behind
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A new SQLite database with the app's schema and engine settings."""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def seed_slots(engine):
+    """Adds Regular slots numbered A1, A2, ... to the database."""
+    def seed(count: int):
+        with Session(engine) as session:
+            for i in range(count):
+                session.add(ParkingSlot(slot_number=f"A{i + 1}", slot_type=SlotType.REGULAR))
+            session.commit()
+    return seed
+
+
+@pytest.fixture
+def write_behind_log(engine, tmp_path):
+    """
+    Enables write-behind with a long flush interval, so logged events stay pending until a
+    handler flushes them. Call it after seeding; the previous configuration is restored after the test.
+    """
+    previous = (write_behind.enabled, write_behind.path, write_behind.flush_interval, write_behind.log_sync)
+
+    def enable():
+        write_behind.configure(enabled=True, path=os.path.join(tmp_path, "events.log"), flush_interval=5.0, log_sync="group")
+        write_behind.start(engine)
+
+    try:
+        yield enable
+    finally:
+        write_behind.close()
+        write_behind.configure(*previous)
+
+
+@pytest.fixture
+def app_client(engine):
+    """
+    A client whose requests use the test database. The in-memory indexes are loaded when the
+    client is created, so seed the database and configure write-behind first. Slot details
+    cached from earlier tests' databases are dropped.
+    """
+    def connect() -> TestClient:
+        slot_detail_cache.clear()
+        with Session(engine) as session:
+            slot_index.load(session)
+            active_sessions.load(session)
+        return TestClient(app)
+
+    async def _test_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = _test_session
+    try:
+        yield connect
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,39 @@
+"""A failed slot claim hands the slot back to the free-slot index."""
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from ..routers import vehicles
+
+ENTRY = {"number_plate": "P1", "vehicle_type": "Car", "billing_type": "Hourly"}
+
+
+def test_claim_error_returns_slot_to_index(seed_slots, app_client, monkeypatch):
+    seed_slots(1)
+    client = app_client()
+
+    def locked(db, slot_id):
+        raise OperationalError("UPDATE parkingslot", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(vehicles, "_claim_slot", locked)
+    with pytest.raises(OperationalError):
+        client.post("/vehicles/entry", json=ENTRY)
+    monkeypatch.undo()
+
+    response = client.post("/vehicles/entry", json=ENTRY)
+    assert response.status_code == 201, response.text
+
+
+def test_batch_claim_error_returns_slots_to_index(seed_slots, app_client, monkeypatch):
+    seed_slots(1)
+    client = app_client()
+
+    def locked(db, slot_ids):
+        raise OperationalError("UPDATE parkingslot", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(vehicles, "_claim_slots", locked)
+    with pytest.raises(OperationalError):
+        client.post("/vehicles/entry/batch", json={"events": [ENTRY]})
+    monkeypatch.undo()
+
+    response = client.post("/vehicles/entry", json=ENTRY)
+    assert response.status_code == 201, response.text
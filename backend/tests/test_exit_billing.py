@@ -0,0 +1,46 @@
+"""Exits of sessions whose slot row no longer exists are still charged."""
+from sqlalchemy import delete
+from sqlmodel import Session
+
+from ..billing import DEFAULT_TARIFF
+from ..entity_cache import slot_detail_cache
+from ..models import ParkingSlot
+
+
+def _park_on_deleted_slot(engine, client) -> int:
+    response = client.post("/vehicles/entry", json={"number_plate": "P1", "vehicle_type": "Car", "billing_type": "Hourly"})
+    assert response.status_code == 201, response.text
+    parked = response.json()["session"]
+    with Session(engine) as db:
+        db.exec(delete(ParkingSlot).where(ParkingSlot.id == parked["slot_id"]))
+        db.commit()
+    slot_detail_cache.clear()
+    return parked["id"]
+
+
+def test_exit_from_deleted_slot_is_billed(engine, seed_slots, app_client):
+    seed_slots(1)
+    client = app_client()
+    session_id = _park_on_deleted_slot(engine, client)
+    response = client.put(f"/vehicles/exit/{session_id}")
+    assert response.status_code == 200, response.text
+    assert response.json()["session"]["billing_amount"] == DEFAULT_TARIFF.first_hour_rate
+
+
+def test_write_behind_exit_from_deleted_slot_is_billed(engine, seed_slots, write_behind_log, app_client):
+    seed_slots(1)
+    session_id = _park_on_deleted_slot(engine, app_client())
+    write_behind_log()
+    response = app_client().put(f"/vehicles/exit/{session_id}")
+    assert response.status_code == 200, response.text
+    assert response.json()["session"]["billing_amount"] == DEFAULT_TARIFF.first_hour_rate
+
+
+def test_batch_exit_from_deleted_slot_is_billed(engine, seed_slots, app_client):
+    seed_slots(1)
+    client = app_client()
+    session_id = _park_on_deleted_slot(engine, client)
+    response = client.post("/vehicles/exit/batch", json={"events": [{"session_id": session_id}]})
+    assert response.status_code == 200, response.text
+    [result] = response.json()["results"]
+    assert result["status_code"] == 200 and result["session"]["billing_amount"] == DEFAULT_TARIFF.first_hour_rate
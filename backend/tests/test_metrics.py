@@ -0,0 +1,19 @@
+"""Query metrics account for statements that raise."""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from ..metrics import metrics
+
+
+def test_failed_statement_is_counted_and_releases_its_start(engine, monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", True)
+    metrics.reset()
+    with engine.connect() as connection:
+        connection.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY)"))
+        connection.execute(text("INSERT INTO t VALUES (1)"))
+        with pytest.raises(IntegrityError):
+            connection.execute(text("INSERT INTO t VALUES (1)"))
+        assert connection.info["metrics_query_start"] == []
+    assert metrics.queries_total == 3
+    assert metrics.query_errors_total == 1
@@ -0,0 +1,33 @@
+"""RowEncoder output decodes to the same values as the response model's serialization."""
+import json
+from datetime import datetime
+
+from ..models import BillingType, SessionStatus
+from ..row_json import RowEncoder
+from ..schemas import ExportFormat, ParkingSessionResponse
+
+ROWS = [
+    (1, 'KA01 "É"\n', 3, datetime(2026, 1, 2, 3, 4, 5, 678), None, SessionStatus.ACTIVE, BillingType.HOURLY, None),
+    (2, "TN02", 4, datetime(2026, 1, 2), datetime(2026, 1, 3, 12), SessionStatus.COMPLETED, BillingType.DAY_PASS, 200.0),
+    (3, "X", 5, datetime(2026, 1, 2), datetime(2026, 1, 2, 1), SessionStatus.COMPLETED, BillingType.HOURLY, float("inf")),
+]
+
+
+def _expected():
+    encoder = RowEncoder(ParkingSessionResponse)
+    return encoder, [
+        json.loads(ParkingSessionResponse(**dict(zip(encoder.columns, row))).model_dump_json()) for row in ROWS
+    ]
+
+
+def test_json_and_ndjson_match_pydantic():
+    encoder, expected = _expected()
+    assert json.loads(encoder.encode(ROWS, ExportFormat.JSON)) == expected
+    assert [json.loads(line) for line in encoder.ndjson(ROWS).splitlines()] == expected
+
+
+def test_columnar_matches_pydantic():
+    encoder, expected = _expected()
+    columns = json.loads(encoder.encode(ROWS, ExportFormat.COLUMNAR))
+    assert columns == {name: [row[name] for row in expected] for name in encoder.columns}
+    assert json.loads(encoder.columnar([])) == {name: [] for name in encoder.columns}
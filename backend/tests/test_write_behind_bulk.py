@@ -0,0 +1,19 @@
+"""Bulk slot provisioning while entries are still pending in the write-behind log."""
+from fastapi.testclient import TestClient
+
+
+def _enter(client: TestClient, number_plate: str) -> int:
+    response = client.post("/vehicles/entry", json={"number_plate": number_plate, "vehicle_type": "Car", "billing_type": "Hourly"})
+    assert response.status_code == 201, response.text
+    return response.json()["session"]["slot_id"]
+
+
+def test_bulk_entrance_keeps_pending_entry_slot_claimed(seed_slots, write_behind_log, app_client):
+    seed_slots(2)
+    write_behind_log()
+    client = app_client()
+    first_slot = _enter(client, "P1")
+    response = client.post("/slots/bulk", json={"layout": {"levels": [], "entrances": [{"name": "North"}]}})
+    assert response.status_code == 201, response.text
+    assert response.json()["entrances_created"] == 1
+    assert _enter(client, "P2") != first_slot
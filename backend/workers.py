@@ -0,0 +1,209 @@
+import asyncio
+import os
+from contextlib import contextmanager
+from typing import Iterator, Set
+
+from sqlalchemy import delete, text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, func, select
+
+from .active_sessions import active_sessions
+from .entity_cache import slot_detail_cache
+from .facilities import FacilityLocal, facility_file
+from .models import ParkingSession, ParkingSlot, StateChange
+from .slot_events import sessions_changed, slot_views_changed, slots_changed
+from .slot_index import slot_index
+
+# Multi-worker mode, for running several processes (e.g. uvicorn --workers N) on one database.
+# Every worker keeps its own in-memory state; database triggers record each committed slot and
+# session change in the statechange table and every worker polls it to catch up. Off by default.
+MULTI_WORKER = os.getenv("MULTI_WORKER", "false").lower() in ("1", "true", "yes")
+
+# How often a worker polls the change log, i.e. how stale another worker's view may be.
+# Slot claims and session exits are conditional UPDATEs, so staleness never double-books a slot.
+WORKER_SYNC_INTERVAL_MS = float(os.getenv("WORKER_SYNC_INTERVAL_MS", "20"))
+
+# Lock files serializing worker startup and electing the worker that runs the maintenance tasks
+WORKER_LOCK_DIR = os.getenv("WORKER_LOCK_DIR", ".")
+
+# Changes read per poll, changes kept in the log, and how often the maintenance worker trims it.
+# A worker that falls further behind than the log reaches reloads its state from the tables.
+STATE_CHANGE_BATCH = 5000
+STATE_CHANGE_KEEP = 100_000
+STATE_CHANGE_TRIM_SECONDS = 10.0
+
+# How often the other workers try to take over maintenance, e.g. after its worker exited
+MAINTENANCE_RETRY_SECONDS = 5.0
+
+_TRIGGERS = {
+    "statechange_slot_insert": "AFTER INSERT ON parkingslot BEGIN INSERT INTO statechange (slot_id) VALUES (NEW.id); END",
+    "statechange_slot_update": "AFTER UPDATE ON parkingslot BEGIN INSERT INTO statechange (slot_id) VALUES (NEW.id); END",
+    "statechange_session_insert": "AFTER INSERT ON parkingsession BEGIN INSERT INTO statechange (session_id) VALUES (NEW.id); END",
+    "statechange_session_update": "AFTER UPDATE OF status ON parkingsession BEGIN INSERT INTO statechange (session_id) VALUES (NEW.id); END",
+    "statechange_entrance_insert": "AFTER INSERT ON entrance BEGIN INSERT INTO statechange (slot_id) VALUES (NULL); END",
+    "statechange_entrance_update": "AFTER UPDATE ON entrance BEGIN INSERT INTO statechange (slot_id) VALUES (NULL); END",
+}
+
+
+def install_change_log(engine: Engine, enabled: bool):
+    """
+    Creates (or, with enabled False, drops) the triggers feeding the statechange table. Triggers
+    catch ORM and Core writes alike, in the writing transaction, so no handler has to log its
+    changes and a change is visible to the other workers exactly when it commits.
+    """
+    if engine.dialect.name != "sqlite":
+        if enabled:
+            raise RuntimeError("MULTI_WORKER needs a SQLite database; other databases are not supported yet")
+        return
+    with engine.begin() as connection:
+        for name, body in _TRIGGERS.items():
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+            if enabled:
+                connection.execute(text(f"CREATE TRIGGER {name} {body}"))
+        if not enabled:
+            connection.execute(delete(StateChange))
+
+
+def _open_lock(name: str):
+    return open(facility_file(os.path.join(WORKER_LOCK_DIR, name)), "a")
+
+
+@contextmanager
+def startup_lock(enabled: bool = MULTI_WORKER) -> Iterator[None]:
+    """Lets one worker at a time create tables, provision slots and replay logs. A no-op with a single worker."""
+    if not enabled:
+        yield
+        return
+    import fcntl
+    with _open_lock("parking-startup.lock") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class WorkerSync:
+    """
+    Keeps this worker's free-slot index, active-session map and cached views in step with the
+    changes other workers commit, by polling the statechange log.
+
+    Each poll re-reads the current rows of the slots and sessions named in the log since the
+    last poll and hands them to the same post-commit hooks the handlers use, so re-reading a
+    change this worker made itself is harmless. One worker, the holder of the maintenance lock,
+    also runs the analytics backfill and the archiver and trims the log.
+    """
+
+    def __init__(self):
+        self.enabled = MULTI_WORKER
+        self.sync_interval = WORKER_SYNC_INTERVAL_MS / 1000
+        self.last_seq = 0
+        self.polls = 0
+        self.changes_applied = 0
+        self.reloads = 0
+        self._maintenance_lock = None
+
+    def start(self, engine: Engine):
+        """
+        Installs or removes the change log triggers and notes the log position. Runs at startup
+        inside startup_lock, before the in-memory state is loaded, so no change is missed.
+        """
+        install_change_log(engine, self.enabled)
+        with Session(engine) as db:
+            self.last_seq = db.exec(select(func.max(StateChange.seq))).one() or 0
+
+    @property
+    def is_maintenance_worker(self) -> bool:
+        """Whether this worker runs the maintenance tasks; always true with a single worker."""
+        if not self.enabled:
+            return True
+        if self._maintenance_lock is None:
+            import fcntl
+            lock_file = _open_lock("parking-maintenance.lock")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            # Held until the process exits
+            self._maintenance_lock = lock_file
+        return True
+
+    async def wait_for_maintenance(self):
+        """Returns once this worker holds the maintenance lock."""
+        while not self.is_maintenance_worker:
+            await asyncio.sleep(MAINTENANCE_RETRY_SECONDS)
+
+    def reload(self, db: Session):
+        """Rebuilds the in-memory state from the tables, after entrance changes or a gap in the log."""
+        slot_index.load(db)
+        active_sessions.load(db)
+        slot_detail_cache.clear()
+        slot_views_changed()
+        self.reloads += 1
+
+    def poll(self, db: Session) -> int:
+        """Applies the changes logged since the last poll. Returns how many log rows were read."""
+        changes = db.exec(
+            select(StateChange).where(StateChange.seq > self.last_seq).order_by(StateChange.seq).limit(STATE_CHANGE_BATCH)
+        ).all()
+        self.polls += 1
+        if not changes:
+            return 0
+
+        # Commits are serialized, so seqs are visible in order; a gap means the log was trimmed past us
+        trimmed = changes[0].seq != self.last_seq + 1
+        slot_ids: Set[int] = {change.slot_id for change in changes if change.slot_id is not None}
+        session_ids: Set[int] = {change.session_id for change in changes if change.session_id is not None}
+        if trimmed or any(change.slot_id is None and change.session_id is None for change in changes):
+            self.reload(db)
+        else:
+            if slot_ids:
+                slots_changed(*db.exec(select(ParkingSlot).where(ParkingSlot.id.in_(slot_ids))).all())
+            if session_ids:
+                sessions = db.exec(select(ParkingSession).where(ParkingSession.id.in_(session_ids))).all()
+                sessions_changed(*sessions)
+                # Sessions archived since the change are no longer active anywhere
+                for missing_id in session_ids - {parking_session.id for parking_session in sessions}:
+                    active_sessions.pop(missing_id)
+        self.last_seq = changes[-1].seq
+        self.changes_applied += len(changes)
+        return len(changes)
+
+    def trim(self, db: Session) -> int:
+        """Deletes log rows older than the newest STATE_CHANGE_KEEP. Run by the maintenance worker."""
+        newest = db.exec(select(func.max(StateChange.seq))).one()
+        if newest is None or newest <= STATE_CHANGE_KEEP:
+            return 0
+        result = db.exec(delete(StateChange).where(StateChange.seq <= newest - STATE_CHANGE_KEEP))
+        db.commit()
+        return result.rowcount
+
+    def _poll(self, engine: Engine) -> int:
+        with Session(engine) as db:
+            return self.poll(db)
+
+    def _trim(self, engine: Engine) -> int:
+        with Session(engine) as db:
+            return self.trim(db)
+
+    async def run(self, engine: Engine):
+        """Polls the change log forever, trimming it from the maintenance worker. Started from the application lifespan."""
+        loop = asyncio.get_running_loop()
+        next_trim = loop.time() + STATE_CHANGE_TRIM_SECONDS
+        while True:
+            try:
+                # Catch up in full batches before sleeping
+                while await asyncio.to_thread(self._poll, engine) == STATE_CHANGE_BATCH:
+                    pass
+                if loop.time() >= next_trim and self.is_maintenance_worker:
+                    next_trim = loop.time() + STATE_CHANGE_TRIM_SECONDS
+                    await asyncio.to_thread(self._trim, engine)
+            except Exception as exc:
+                # Typically a busy database; the next poll picks up from last_seq
+                print(f"Worker sync failed: {exc}")
+            await asyncio.sleep(self.sync_interval)
+
+
+# One instance per facility, started during application startup
+worker_sync = FacilityLocal(WorkerSync)
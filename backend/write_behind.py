@@ -0,0 +1,339 @@
+import asyncio
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, func, select
+
+from .analytics import record_exits
+from .entity_cache import slot_detail_cache
+from .facilities import FacilityLocal, facility_file
+from .models import (
+    BillingType, ParkingSession, ParkingSlot, SessionStatus, SlotStatus, SlotType, Vehicle, VehicleType, WriteBehindState
+)
+from .plate_search import index_plate
+from .slot_events import slot_views_changed
+from .slot_index import IndexedSlot
+
+# Write-behind mode: entries and exits are applied to the in-memory slot index and session map,
+# appended to an event log and written to the database in group commits. Off by default.
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_LOG = os.getenv("WRITE_BEHIND_LOG", "./parking-events.log")
+WRITE_BEHIND_FLUSH_MS = float(os.getenv("WRITE_BEHIND_FLUSH_MS", "5"))
+
+# How much a crash can lose:
+#   always  fsync the log before answering each request; nothing acknowledged is lost
+#   group   write each event to the OS at once and fsync once per group commit; a process crash
+#           loses nothing, a power loss up to one flush interval
+#   none    buffer events in the process until the group commit; a crash loses up to one interval
+WRITE_BEHIND_LOG_SYNC = os.getenv("WRITE_BEHIND_LOG_SYNC", "group")
+LOG_SYNC_MODES = ("always", "group", "none")
+
+# The log is truncated once everything in it has been committed and it has grown past this size
+WRITE_BEHIND_LOG_ROTATE_BYTES = 1024 * 1024
+
+WRITE_BEHIND_STATE_ID = 1
+
+
+def _read_log(path: str) -> List[dict]:
+    """Reads the logged events. A torn last line, left by a crash mid-write, is ignored."""
+    if not os.path.exists(path):
+        return []
+    events = []
+    with open(path, "rb") as f:
+        for line_number, line in enumerate(f, start=1):
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                print(f"Write-behind log {path}: ignoring unreadable event at line {line_number} and after.")
+                break
+    return events
+
+
+def _get_state(db: Session) -> WriteBehindState:
+    state = db.get(WriteBehindState, WRITE_BEHIND_STATE_ID)
+    if state is None:
+        state = WriteBehindState(id=WRITE_BEHIND_STATE_ID)
+        db.add(state)
+    return state
+
+
+def apply_events(db: Session, events: List[dict]):
+    """
+    Writes a group of logged entries and exits to the database inside the caller's transaction:
+    one insert for new vehicles and one for new sessions, one executemany for completed
+    sessions and one UPDATE per slot status. A session entered and exited within the group is
+    inserted completed, and each slot gets the status of the last event that touched it.
+    """
+    vehicles: Dict[str, VehicleType] = {}
+    new_sessions: Dict[int, dict] = {}
+    completed: List[dict] = []
+    slot_statuses: Dict[int, SlotStatus] = {}
+    exits = []
+
+    for event in events:
+        if event["type"] == "entry":
+            vehicles.setdefault(event["number_plate"], VehicleType(event["vehicle_type"]))
+            new_sessions[event["session_id"]] = {
+                "id": event["session_id"],
+                "vehicle_number_plate": event["number_plate"],
+                "slot_id": event["slot_id"],
+                "entry_time": datetime.fromisoformat(event["entry_time"]),
+                "exit_time": None,
+                "status": SessionStatus.ACTIVE,
+                "billing_type": BillingType(event["billing_type"]),
+                "billing_amount": event["billing_amount"],
+                "rolled_up": False,
+            }
+            slot_statuses[event["slot_id"]] = SlotStatus.OCCUPIED
+            continue
+
+        exit_time = datetime.fromisoformat(event["exit_time"])
+        row = new_sessions.get(event["session_id"])
+        if row is not None:
+            row.update(status=SessionStatus.COMPLETED, exit_time=exit_time, billing_amount=event["billing_amount"], rolled_up=True)
+        else:
+            completed.append({"b_id": event["session_id"], "b_exit_time": exit_time, "b_billing_amount": event["billing_amount"]})
+        slot_statuses[event["slot_id"]] = SlotStatus.AVAILABLE
+        if event["slot_type"]:
+            exits.append((ParkingSession(
+                billing_type=BillingType(event["billing_type"]),
+                entry_time=datetime.fromisoformat(event["entry_time"]),
+                exit_time=exit_time,
+                billing_amount=event["billing_amount"]
+            ), SlotType(event["slot_type"])))
+
+    connection = db.connection()
+    if vehicles:
+        known = set(db.exec(select(Vehicle.number_plate).where(Vehicle.number_plate.in_(vehicles))).all())
+        missing = [{"number_plate": plate, "vehicle_type": vehicle_type} for plate, vehicle_type in vehicles.items() if plate not in known]
+        if missing:
+            connection.execute(insert(Vehicle.__table__), missing)
+            for row in missing:
+                index_plate(db, row["number_plate"])
+    if new_sessions:
+        connection.execute(insert(ParkingSession.__table__), list(new_sessions.values()))
+    if completed:
+        table = ParkingSession.__table__
+        connection.execute(
+            update(table).where(table.c.id == bindparam("b_id"))
+            .values(status=SessionStatus.COMPLETED, exit_time=bindparam("b_exit_time"),
+                    billing_amount=bindparam("b_billing_amount"), rolled_up=True),
+            completed
+        )
+    for slot_status in (SlotStatus.OCCUPIED, SlotStatus.AVAILABLE):
+        slot_ids = [slot_id for slot_id, value in slot_statuses.items() if value == slot_status]
+        if slot_ids:
+            connection.execute(
+                update(ParkingSlot.__table__).where(ParkingSlot.__table__.c.id.in_(slot_ids)).values(status=slot_status)
+            )
+    record_exits(db, exits)
+    _get_state(db).applied_seq = events[-1]["seq"]
+
+
+class WriteBehindLog:
+    """
+    Append-only event log of entries and exits with group commit to the database.
+
+    In write-behind mode the entry and exit handlers decide everything in memory (the free-slot
+    index and the active-session map are authoritative), log the event and answer; the run()
+    task writes the logged events to the database every flush interval in one transaction.
+    Each group commit also advances a watermark in the database, so replaying the log at
+    startup applies exactly the events that had not been committed when the process stopped.
+
+    Session ids are allocated here so a session can be exited before its row exists. Handlers
+    that write to the database directly in this mode run inside exclusive(), which drains the
+    log first and holds off in-memory entries and exits until they have committed.
+    """
+
+    def __init__(self):
+        self.enabled = WRITE_BEHIND
+        self.path = facility_file(WRITE_BEHIND_LOG)
+        self.flush_interval = WRITE_BEHIND_FLUSH_MS / 1000
+        self.log_sync = WRITE_BEHIND_LOG_SYNC
+        self.group_commits = 0
+        self.committed_events = 0
+        self._engine: Optional[Engine] = None
+        self._file = None
+        self._seq = 0
+        self._next_session_id = 1
+        self._pending: List[dict] = []
+        self._slots: Dict[int, IndexedSlot] = {}
+        # Lock order: _apply_lock, then _flush_lock, then _lock
+        self._apply_lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: bool, path: str, flush_interval: float, log_sync: str):
+        """Overrides the environment settings; call before start()."""
+        if log_sync not in LOG_SYNC_MODES:
+            raise ValueError(f"log_sync must be one of {', '.join(LOG_SYNC_MODES)}")
+        self.enabled, self.path, self.flush_interval, self.log_sync = enabled, path, flush_interval, log_sync
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def start(self, engine: Engine) -> int:
+        """
+        Replays logged events the database has not seen, then opens the log for appending if
+        write-behind is enabled. Runs at startup, before the in-memory indexes are loaded.
+        Replay happens even with write-behind disabled, so turning it off never loses events.
+        Returns the number of events replayed.
+        """
+        self._engine = engine
+        events = _read_log(self.path)
+        with Session(engine) as db:
+            applied_seq = _get_state(db).applied_seq
+            replay = [event for event in events if event["seq"] > applied_seq]
+            if replay:
+                apply_events(db, replay)
+            db.commit()
+            self._seq = max([applied_seq] + [event["seq"] for event in events])
+            self._next_session_id = (db.exec(select(func.max(ParkingSession.id))).one() or 0) + 1
+        if events:
+            # Everything in the log is now in the database
+            open(self.path, "wb").close()
+        self._pending = []
+        self._slots = {}
+        if self.enabled:
+            self._file = open(self.path, "ab")
+        return len(replay)
+
+    def close(self):
+        """Commits whatever is still pending and closes the log. Called on shutdown."""
+        if self._file is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._file.close()
+            self._file = None
+
+    def next_session_id(self) -> int:
+        with self._lock:
+            session_id = self._next_session_id
+            self._next_session_id += 1
+            return session_id
+
+    def remember_slot(self, slot: IndexedSlot):
+        """Keeps the columns of a slot taken by a logged entry, for pricing and freeing it at exit."""
+        self._slots[slot.id] = slot
+
+    def slot(self, db: Session, slot_id: int) -> Optional[IndexedSlot]:
+        """Columns of an occupied slot, read from the database if it was taken before this process started."""
+        slot = self._slots.get(slot_id)
+        if slot is None:
+            slot = slot_detail_cache.get(db, slot_id)
+            if slot is not None:
+                self._slots[slot_id] = slot
+        return slot
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Serializes an in-memory entry or exit with handlers running in exclusive()."""
+        with self._apply_lock:
+            yield
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """
+        Runs a handler that writes to the database directly: commits the pending events first
+        and keeps in-memory entries and exits from interleaving until the block ends.
+        A no-op while write-behind is disabled.
+        """
+        if not self.enabled:
+            yield
+            return
+        with self._apply_lock:
+            self.flush()
+            yield
+
+    def _append(self, event: dict):
+        with self._lock:
+            self._seq += 1
+            event["seq"] = self._seq
+            self._file.write(json.dumps(event, separators=(",", ":")).encode() + b"\n")
+            if self.log_sync == "always":
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            elif self.log_sync == "group":
+                self._file.flush()
+            self._pending.append(event)
+
+    def log_entry(self, parking_session: ParkingSession, vehicle_type: VehicleType):
+        self._append({
+            "type": "entry",
+            "session_id": parking_session.id,
+            "number_plate": parking_session.vehicle_number_plate,
+            "vehicle_type": vehicle_type.value,
+            "slot_id": parking_session.slot_id,
+            "entry_time": parking_session.entry_time.isoformat(),
+            "billing_type": parking_session.billing_type.value,
+            "billing_amount": parking_session.billing_amount,
+        })
+
+    def log_exit(self, parking_session: ParkingSession, slot_type: Optional[SlotType]):
+        self._append({
+            "type": "exit",
+            "session_id": parking_session.id,
+            "slot_id": parking_session.slot_id,
+            "slot_type": slot_type.value if slot_type else None,
+            "entry_time": parking_session.entry_time.isoformat(),
+            "exit_time": parking_session.exit_time.isoformat(),
+            "billing_type": parking_session.billing_type.value,
+            "billing_amount": parking_session.billing_amount,
+        })
+
+    def flush(self) -> int:
+        """Writes every pending event to the database in one transaction. Returns the number written."""
+        with self._flush_lock:
+            with self._lock:
+                events, self._pending = self._pending, []
+                if events and self.log_sync != "always":
+                    self._file.flush()
+                    if self.log_sync == "group":
+                        os.fsync(self._file.fileno())
+            if not events:
+                return 0
+
+            try:
+                with Session(self._engine) as db:
+                    apply_events(db, events)
+                    db.commit()
+                    slot_ids = {event["slot_id"] for event in events}
+                    slots = db.exec(select(ParkingSlot).where(ParkingSlot.id.in_(slot_ids))).all()
+            except Exception:
+                # Keep the events, in order, for the next attempt; they are still in the log
+                with self._lock:
+                    self._pending = events + self._pending
+                raise
+
+            self.group_commits += 1
+            self.committed_events += len(events)
+            slot_views_changed(*slots)
+
+            with self._lock:
+                if not self._pending and self._file.tell() > WRITE_BEHIND_LOG_ROTATE_BYTES:
+                    self._file.truncate(0)
+            return len(events)
+
+    async def run(self):
+        """Group commit loop, started from the application lifespan in write-behind mode."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if not self._pending:
+                continue
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as exc:
+                print(f"Write-behind group commit failed, retrying: {exc}")
+
+
+# One instance per facility, started during application startup
+write_behind = FacilityLocal(WriteBehindLog)
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from "react";
 import "./DashboardData.css"; // Import the dedicated CSS file
+import { subscribeOccupancy } from "../services/occupancyStream";
 
 function DashboardData() {
     // State to hold the summary data fetched from the API
@@ -61,13 +62,15 @@ function DashboardData() {
 
         fetchSummaryData(); // Call the fetch function once on component mount
 
-        // Set up an interval to refresh data every 5 seconds for real-time updates
-        const intervalId = setInterval(() => {
-            fetchSummaryData();
-        }, 5000); // Refresh every 5 seconds
+        // Live updates are pushed by the occupancy stream instead of polling
+        const unsubscribe = subscribeOccupancy((state) => {
+            setSummaryData(state.summary);
+            setLoading(false);
+            setError(null);
+        });
 
-        // Cleanup function: Clear the interval when the component unmounts
-        return () => clearInterval(intervalId);
+        // Cleanup function: Stop listening when the component unmounts
+        return unsubscribe;
     }, []); // Empty dependency array means this effect runs only once on mount and cleans up on unmount
 
     // Render loading state
@@ -1,5 +1,6 @@
 import React, { useState, useEffect, useCallback } from "react";
 import "./Grid.css";
+import { subscribeOccupancy } from "../services/occupancyStream";
 
 // It's good practice to define the API URL in one place
 const API_BASE_URL = "http://127.0.0.1:8000";
@@ -83,6 +84,20 @@ function Grid({ currentFilter, refreshKey }) {
         fetchParkingSlots();
     }, [fetchParkingSlots, refreshKey]); // Re-run when the fetch function changes or refreshKey is updated.
 
+    // Apply live status changes from the occupancy stream to the slots already shown
+    useEffect(() => {
+        return subscribeOccupancy((state) => {
+            setParkingSlots((prev) => {
+                const next = { ...prev };
+                Object.entries(prev).forEach(([key, slot]) => {
+                    const live = state.slots[slot.id];
+                    if (live) next[key] = live;
+                });
+                return next;
+            });
+        });
+    }, []);
+
     // --- Render Logic ---
 
     if (loading) {
@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useCallback } from "react";
 import SlotModal from "../components/slotsmodal"; // We will create this component next
 import "./SlotsPage.css"; // We will also create the CSS file
+import { subscribeOccupancy } from "../services/occupancyStream";
 
 const API_BASE_URL = "http://127.0.0.1:8000";
 
@@ -39,6 +40,13 @@ function SlotsPage() {
         fetchSlots();
     }, [fetchSlots]);
 
+    // Keep rows in sync with live status changes from the occupancy stream
+    useEffect(() => {
+        return subscribeOccupancy((state) => {
+            setSlots((prev) => prev.map((slot) => state.slots[slot.id] || slot));
+        });
+    }, []);
+
     // --- Modal Handlers ---
     const handleOpenModal = (slot) => {
         setSelectedSlot(slot);
@@ -0,0 +1,84 @@
+// Shared live occupancy stream. One WebSocket per tab feeds every subscribed component.
+
+const STREAM_URL = "ws://127.0.0.1:8000/dashboard/stream";
+const MAX_RECONNECT_DELAY = 16000;
+
+const listeners = new Set();
+let socket = null;
+let lastSeq = null; // Sequence number of the last frame applied, used to resume after a reconnect
+let reconnectAttempts = 0;
+let reconnectTimer = null;
+let state = null; // { slots: { [id]: slot }, summary }
+
+function notify() {
+    listeners.forEach((listener) => listener(state));
+}
+
+function applyFrame(frame) {
+    if (frame.type === "snapshot") {
+        const slots = {};
+        frame.slots.forEach((slot) => {
+            slots[slot.id] = slot;
+        });
+        state = { slots, summary: frame.summary };
+    } else if (frame.type === "delta" && state) {
+        const slots = { ...state.slots };
+        frame.slots.forEach((slot) => {
+            slots[slot.id] = slot;
+        });
+        state = { slots, summary: frame.summary };
+    }
+    lastSeq = frame.seq;
+    notify();
+}
+
+function connect() {
+    if (socket) return;
+
+    // Resume from the last applied frame; the server falls back to a snapshot if it can't
+    const url = lastSeq !== null && state ? `${STREAM_URL}?since=${lastSeq}` : STREAM_URL;
+    socket = new WebSocket(url);
+
+    socket.onopen = () => {
+        reconnectAttempts = 0;
+    };
+    socket.onmessage = (event) => applyFrame(JSON.parse(event.data));
+    socket.onclose = () => {
+        socket = null;
+        if (listeners.size === 0) return;
+        // Exponential backoff: 1s, 2s, 4s, ... capped at MAX_RECONNECT_DELAY
+        const delay = Math.min(Math.pow(2, reconnectAttempts) * 1000, MAX_RECONNECT_DELAY);
+        reconnectAttempts += 1;
+        reconnectTimer = setTimeout(() => {
+            reconnectTimer = null;
+            connect();
+        }, delay);
+    };
+}
+
+function disconnect() {
+    clearTimeout(reconnectTimer);
+    reconnectTimer = null;
+    if (socket) {
+        socket.onclose = null;
+        socket.close();
+        socket = null;
+    }
+}
+
+/**
+ * Subscribes to live occupancy updates.
+ *
+ * @param {function} listener - Called with { slots, summary } after every snapshot or delta frame.
+ * @returns {function} Unsubscribe function.
+ */
+export function subscribeOccupancy(listener) {
+    listeners.add(listener);
+    if (state) listener(state);
+    connect();
+
+    return () => {
+        listeners.delete(listener);
+        if (listeners.size === 0) disconnect();
+    };
+}